@@ -0,0 +1,26 @@
+"""O app do Streamlit com as rotas que gravam e apagam o cookie da sessão.
+
+    streamlit run asgi.py
+    uvicorn asgi:app --workers 4
+
+O login (em streamlit_app.py) emite um código de uso único; o navegador o
+troca pelo cookie HttpOnly em POST /api/sessao (ver ecoenergy.sessions).
+"""
+import functools
+
+import streamlit as st
+
+from ecoenergy.auth import Authenticator
+from ecoenergy.sessions import MAX_AGE, SessionStore, session_routes, shared_secret
+from ecoenergy.storage import UserStore
+
+
+@functools.lru_cache(maxsize=None)
+def get_sessions():
+    store = UserStore()
+    # mesmo segredo do script: o cookie gravado aqui é validado por ele
+    authenticator = Authenticator(max_workers=1, secret=shared_secret(store), token_ttl=MAX_AGE)
+    return SessionStore(store, authenticator)
+
+
+app = st.App("streamlit_app.py", routes=session_routes(get_sessions))
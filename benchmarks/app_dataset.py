@@ -0,0 +1,34 @@
+"""Base sintética de usuários dos cenários do app (tests/test_app.py e bench_app.py)."""
+from ecoenergy import aggregates
+from ecoenergy.analytics import FleetStatsStore
+from ecoenergy.auth import hash_password
+from ecoenergy.catalog import load_catalog
+from ecoenergy.storage import UserStore
+from ecoenergy.tariffs import load_tariffs
+
+USERNAME = "bench"
+PASSWORD = "bench-senha"
+
+
+def synthetic_records(n_users, rng):
+    """O usuário USERNAME (sem aparelhos) e n_users - 1 usuários com 3 a 20 aparelhos."""
+    models = load_catalog().models
+    states = load_tariffs().states
+    yield USERNAME, {"password": hash_password(PASSWORD), "aparelhos": []}
+    for i in range(n_users - 1):
+        record = {"password": "0" * 64, "estado": rng.choice(states), "aparelhos": []}
+        for _ in range(rng.randint(3, 20)):
+            model = rng.choice(models)
+            record["aparelhos"].append({"nome": model.nome, "area": model.area,
+                                        "potencia": model.potencia,
+                                        "horas": round(rng.uniform(0, 8), 1), "quantidade": 1})
+        aggregates.rebuild(record)
+        yield f"user{i}", record
+
+
+def build_dataset(n_users, rng):
+    """Grava a base no user_data.db do diretório atual, onde o app o abre."""
+    store = UserStore()
+    store.put_many(synthetic_records(n_users, rng))
+    FleetStatsStore(store).refresh()
+    store.close()
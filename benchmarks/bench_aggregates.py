@@ -0,0 +1,82 @@
+"""Totais incrementais x recálculo completo numa conta com milhares de aparelhos.
+
+Aplica uma sequência aleatória de inclusões, remoções e edições, mede o
+tempo de cada atualização incremental e confere os totais guardados com um
+recálculo completo (verify) ao longo da sequência.
+
+Uso: python benchmarks/bench_aggregates.py [--devices 5000] [--operations 5000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy import aggregates
+from ecoenergy.catalog import load_catalog
+from ecoenergy.consumption import calculate_consumption
+from ecoenergy.tariffs import load_tariffs, price_monthly
+
+
+def random_appliance(rng, models):
+    model = rng.choice(models)
+    return {"nome": model.nome, "area": model.area,
+            "potencia": model.potencia * rng.uniform(0.5, 1.5),
+            "horas": round(rng.uniform(0, 24), 2), "quantidade": rng.randint(1, 5)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=5_000)
+    parser.add_argument("--operations", type=int, default=5_000)
+    parser.add_argument("--verify-every", type=int, default=500)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    models = load_catalog().models
+    record = {"password": "", "aparelhos": [random_appliance(rng, models)
+                                            for _ in range(args.devices)]}
+    aggregates.rebuild(record)
+
+    timings = {"incluir": [], "remover": [], "editar": []}
+    checks = 0
+    for step in range(1, args.operations + 1):
+        operation = rng.choice(list(timings)) if record["aparelhos"] else "incluir"
+        start = time.perf_counter()
+        if operation == "incluir":
+            aggregates.add_appliance(record, random_appliance(rng, models))
+        elif operation == "remover":
+            aggregates.remove_appliance(record, rng.randrange(len(record["aparelhos"])))
+        else:
+            index = rng.randrange(len(record["aparelhos"]))
+            aggregates.update_appliance(record, index, random_appliance(rng, models))
+        timings[operation].append(time.perf_counter() - start)
+        if step % args.verify_every == 0:
+            problems = aggregates.verify(record)
+            if problems:
+                raise SystemExit(f"totais divergentes após {step} operações: {problems[:3]}")
+            checks += 1
+
+    for operation, values in timings.items():
+        if values:
+            print(f"{operation}: {len(values):,} operações, média {sum(values) / len(values) * 1e6:.0f} µs")
+
+    start = time.perf_counter()
+    total, _ = aggregates.consumption(record)
+    aggregates.bill(record, "São Paulo", "amarela")
+    print(f"leitura dos totais guardados: {(time.perf_counter() - start) * 1e6:.0f} µs")
+
+    table = load_tariffs()
+    start = time.perf_counter()
+    full_total, _ = calculate_consumption(record["aparelhos"])
+    price_monthly(full_total, table.state_codes(["São Paulo"]), "amarela")
+    print(f"recálculo completo ({len(record['aparelhos']):,} aparelhos): "
+          f"{(time.perf_counter() - start) * 1e6:.0f} µs")
+    print(f"{checks} conferências com o recálculo completo, todas iguais "
+          f"(total {total:.4f} x {full_total:.4f} kWh)")
+
+
+if __name__ == "__main__":
+    main()
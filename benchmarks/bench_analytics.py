@@ -0,0 +1,81 @@
+"""Estatísticas de todas as residências: tempo do cálculo em lotes e erro dos percentis.
+
+Uso: python benchmarks/bench_analytics.py [--users 50000] [--lookups 100000]
+
+Compara os percentis do t-digest com os exatos (np.quantile) de cada estado
+e mede a consulta do percentil de um consumo, feita a cada página.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.analytics import ALL_STATES, FleetStatsStore
+from ecoenergy.catalog import load_catalog
+from ecoenergy.consumption import recompute_all
+from ecoenergy.storage import UserStore
+from ecoenergy.tariffs import load_tariffs
+
+
+def make_record(rng, models, states):
+    appliances = []
+    for _ in range(rng.randint(3, 25)):
+        model = rng.choice(models)
+        appliances.append({"nome": model.nome, "area": model.area, "potencia": model.potencia,
+                           "horas": round(rng.expovariate(1 / 3), 1) % 24,
+                           "quantidade": rng.randint(1, 3)})
+    return {"password": "", "estado": rng.choice(states), "aparelhos": appliances}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    models = load_catalog().models
+    states = load_tariffs().states
+    with tempfile.TemporaryDirectory() as tmpdir:
+        store = UserStore(os.path.join(tmpdir, "bench.db"))
+        store.put_many((f"user{i}", make_record(rng, models, states)) for i in range(args.users))
+
+        start = time.perf_counter()
+        stats = FleetStatsStore(store).refresh()
+        elapsed = time.perf_counter() - start
+        print(f"cálculo: {stats.households:,} residências em {elapsed:.2f} s "
+              f"({stats.households / elapsed:,.0f} residências/s)")
+
+        totals = recompute_all(store)
+        by_state = {ALL_STATES: np.array(list(totals.values()))}
+        for username, record in store.iter_records():
+            by_state.setdefault(record["estado"], []).append(totals[username])
+        qs = np.array([0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99])
+        worst = 0.0
+        for state, values in by_state.items():
+            values = np.sort(np.asarray(values))
+            estimate = stats.digests[state].quantile(qs)
+            # erro em posição: fração dos valores exatos abaixo da estimativa, menos q
+            ranks = np.searchsorted(values, estimate) / len(values)
+            worst = max(worst, float(np.abs(ranks - qs).max()))
+        print(f"erro máximo de posição dos percentis (p1 a p99, {len(by_state)} grupos): "
+              f"{worst * 100:.2f} pontos percentuais")
+
+        loaded = FleetStatsStore(store).load()
+        queries = [(rng.uniform(0, 800), rng.choice(states)) for _ in range(args.lookups)]
+        start = time.perf_counter()
+        for consumption, state in queries:
+            loaded.percentile(consumption, state)
+        elapsed = time.perf_counter() - start
+        print(f"consulta do percentil: {elapsed / args.lookups * 1e6:.1f} µs")
+        print("maiores categorias:", ", ".join(f"{area} ({kwh:,.0f} kWh)" for area, kwh in stats.top_areas()[:3]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Tempo das execuções do script do Streamlit, dirigido sem navegador (AppTest).
+
+Para cada tamanho de base sintética (usuários), mede login, abertura da
+calculadora, reexecução, inclusão de aparelho e a página de estatísticas,
+com os tempos por etapa registrados pelo Tracer do app.
+
+Uso: python benchmarks/bench_app.py [--users 10000 100000] [--repeat 5]
+
+A detecção de regressões fica em tests/test_app.py (pytest-benchmark, com
+--benchmark-autosave e --benchmark-compare-fail); este script serve para
+bases grandes e para ver quais etapas dominam cada cenário.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.app_dataset import PASSWORD, USERNAME, build_dataset
+from ecoenergy.timing import default_tracer
+
+APP = os.path.join(ROOT, "streamlit_app.py")
+
+
+def timed_run(action):
+    start = time.perf_counter()
+    action()
+    elapsed = time.perf_counter() - start
+    runs = default_tracer().runs()
+    return elapsed, runs[-1]["etapas_ms"] if runs else {}
+
+
+def scenario_runs(repeat):
+    """Executa os cenários repeat vezes; devolve {cenário: [(segundos, etapas), ...]}."""
+    results = {}
+    for _ in range(repeat):
+        at = AppTest.from_file(APP, default_timeout=120)
+        at.run()
+        at.sidebar.selectbox[0].set_value("Login").run()
+        at.text_input[0].input(USERNAME)
+        at.text_input[1].input(PASSWORD)
+        results.setdefault("login", []).append(timed_run(lambda: at.button[0].click().run()))
+        results.setdefault("calculadora", []).append(
+            timed_run(lambda: at.sidebar.selectbox[0].set_value("Calculadora Energética").run()))
+        results.setdefault("reexecucao", []).append(timed_run(at.run))
+        at.number_input[0].set_value(100)
+        at.number_input[1].set_value(3.0)
+        results.setdefault("incluir_aparelho", []).append(timed_run(lambda: at.button[0].click().run()))
+        results.setdefault("estatisticas", []).append(
+            timed_run(lambda: at.sidebar.selectbox[0].set_value("Estatísticas Gerais").run()))
+        if at.exception:
+            raise SystemExit(f"o script falhou: {at.exception[0].value}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for n_users in args.users:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.chdir(tmpdir)
+            start = time.perf_counter()
+            build_dataset(n_users, rng)
+            print(f"{n_users:,} usuários: base criada em {time.perf_counter() - start:.1f} s")
+            st.cache_resource.clear()
+            for name, samples in scenario_runs(args.repeat).items():
+                median = statistics.median(seconds for seconds, _ in samples)
+                phases = samples[-1][1]
+                slowest = sorted(((ms, phase) for phase, ms in phases.items() if phase != "total"),
+                                 reverse=True)[:3]
+                print(f"  {name}: mediana {median * 1e3:.0f} ms (script {phases.get('total', 0):.0f} ms; "
+                      + ", ".join(f"{phase} {ms:.1f} ms" for ms, phase in slowest) + ")")
+            st.cache_resource.clear()
+            os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Vazão de logins com scrypt: logins por segundo por núcleo.
+
+Uso: python benchmarks/bench_auth.py [--logins 50]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.auth import Authenticator, hash_password, verify_password
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    args = parser.parse_args()
+
+    stored = hash_password("senha")
+    start = time.perf_counter()
+    for _ in range(args.logins):
+        assert verify_password("senha", stored)[0]
+    single = args.logins / (time.perf_counter() - start)
+    print(f"1 thread: {single:.1f} logins/s ({1000 / single:.1f} ms por verificação)")
+
+    cores = os.cpu_count()
+    auth = Authenticator(max_workers=cores, max_attempts=10 ** 9)
+    with ThreadPoolExecutor(max_workers=cores * 2) as clients:
+        start = time.perf_counter()
+        list(clients.map(lambda i: auth.verify(f"user{i}", "senha", stored),
+                         range(args.logins * cores)))
+        pooled = args.logins * cores / (time.perf_counter() - start)
+    auth.shutdown()
+    print(f"{cores} núcleos: {pooled:.1f} logins/s ({pooled / cores:.1f} por núcleo)")
+
+    start = time.perf_counter()
+    token = auth.issue_token("user0")
+    for _ in range(10_000):
+        auth.validate_token(token)
+    per_rerun = (time.perf_counter() - start) / 10_000
+    print(f"validação do token por reexecução: {per_rerun * 1e6:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
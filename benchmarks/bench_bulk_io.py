@@ -0,0 +1,62 @@
+"""Vazão da importação e exportação em massa (linhas por segundo).
+
+Uso: python benchmarks/bench_bulk_io.py [--rows 200000] [--users 2000]
+"""
+import argparse
+import csv
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.bulk_io import APPLIANCE_FIELDS, export_appliances, import_appliances
+from ecoenergy.catalog import APPLIANCE_OPTIONS
+from ecoenergy.storage import UserStore
+
+
+def write_csv(path, rows, users, rng):
+    catalog = [(area, nome) for area, names in APPLIANCE_OPTIONS.items() for nome in names]
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(APPLIANCE_FIELDS)
+        for _ in range(rows):
+            area, nome = rng.choice(catalog)
+            writer.writerow([f"user{rng.randrange(users)}", nome, area, rng.randint(5, 3000),
+                             round(rng.uniform(0, 24), 2), rng.randint(1, 4), ""])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, "aparelhos.csv")
+        write_csv(source, args.rows, args.users, rng)
+        store = UserStore(os.path.join(tmpdir, "bench.db"))
+        store.put_many((f"user{i}", {"password": "", "aparelhos": []}) for i in range(args.users))
+
+        report = import_appliances(store, source)
+        print(f"importação CSV: {report['importadas']:,} linhas em {report['segundos']:.2f} s "
+              f"({report['linhas_por_segundo']:,.0f} linhas/s)")
+
+        for ext in ("csv", "parquet"):
+            target = os.path.join(tmpdir, f"exportados.{ext}")
+            start = time.perf_counter()
+            count = export_appliances(store, target)
+            elapsed = time.perf_counter() - start
+            print(f"exportação {ext}: {count:,} linhas em {elapsed:.2f} s ({count / elapsed:,.0f} linhas/s)")
+
+        store.put_many((f"user{i}", {"password": "", "aparelhos": []}) for i in range(args.users))
+        report = import_appliances(store, os.path.join(tmpdir, "exportados.parquet"))
+        print(f"importação Parquet: {report['importadas']:,} linhas em {report['segundos']:.2f} s "
+              f"({report['linhas_por_segundo']:,.0f} linhas/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Memória e tempo de busca de um catálogo sintético de aparelhos.
+
+Uso: python benchmarks/bench_catalog.py [--models 50000] [--lookups 200000] [--searches 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.catalog import build_catalog, load_catalog
+
+BRANDS = ["Brastemp", "Electrolux", "Consul", "Philco", "Mondial", "Arno", "Britânia",
+          "Samsung", "LG", "Midea", "Fischer", "Lorenzetti", "Oster", "Cadence", "Mallory"]
+
+
+def synthetic_catalog(models, rng):
+    """Variações de marca e modelo de cada aparelho do catálogo real."""
+    base = [(model.area, model.nome, model.potencia) for model in load_catalog().models]
+    areas = {}
+    for i in range(models):
+        area, nome, potencia = base[i % len(base)]
+        areas.setdefault(area, []).append({
+            "nome": f"{nome} {rng.choice(BRANDS)} {i:05d}",
+            "potencia": round(potencia * rng.uniform(0.5, 1.5)),
+        })
+    return areas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--models", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--searches", type=int, default=2_000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    areas = synthetic_catalog(args.models, rng)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    catalog = build_catalog(areas)
+    elapsed = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"montagem: {len(catalog):,} modelos em {elapsed:.2f} s, "
+          f"{memory / 2**20:.1f} MiB ({memory / len(catalog):.0f} bytes por modelo)")
+
+    names = [rng.choice(catalog.models).nome for _ in range(args.lookups)]
+    start = time.perf_counter()
+    for name in names:
+        catalog.default_power(name)
+    elapsed = time.perf_counter() - start
+    print(f"potência padrão: {elapsed / args.lookups * 1e6:.2f} µs por busca")
+
+    start = time.perf_counter()
+    for area in catalog.areas:
+        sum(model.potencia for model in catalog.iter_area(area))
+    print(f"iteração por área: {(time.perf_counter() - start) * 1e3:.1f} ms para todo o catálogo")
+
+    queries = ["lamp", "lampada led", "maq lav", "geladeira brast", "chuveiro lorenzetti",
+               "ar-cond", "tv", "secador", "forno eletrico", "carregador"]
+    for area in (None, catalog.areas[0]):
+        latencies = []
+        for i in range(args.searches):
+            query = queries[i % len(queries)]
+            start = time.perf_counter()
+            catalog.search(query, area=area)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        print(f"busca ({area or 'todas as áreas'}): p50 {latencies[len(latencies) // 2] * 1e3:.2f} ms, "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Série temporal do histórico: gravação, consulta por intervalo e gráfico.
+
+Uso: python benchmarks/bench_history.py [--points 100000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.history import HistoryStore
+from ecoenergy.storage import UserStore
+
+
+START = 1_262_304_000  # 2010-01-01 UTC
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    step = 3600  # um ponto por hora
+    values = rng.gamma(2.0, 100.0, args.points).tolist()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        history = HistoryStore(UserStore(os.path.join(tmpdir, "bench.db")))
+        latencies = []
+        for i, value in enumerate(values):
+            start = time.perf_counter()
+            history.record("bench", value, ts=START + i * step)
+            latencies.append(time.perf_counter() - start)
+        first, last = latencies[:1000], latencies[-1000:]
+        print(f"gravação: mediana {statistics.median(first) * 1e6:.0f} µs nos primeiros "
+              f"1000 pontos, {statistics.median(last) * 1e6:.0f} µs nos últimos 1000")
+
+        middle = START + args.points // 2 * step
+        start = time.perf_counter()
+        ts, _ = history.range("bench", middle, middle + 30 * 24 * step)
+        print(f"consulta de 30 dias: {len(ts)} pontos em {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+        start = time.perf_counter()
+        series = history.chart_series("bench")
+        print(f"série do gráfico: {len(series)} pontos em {(time.perf_counter() - start) * 1e3:.2f} ms")
+
+        buckets, monthly = history.rollup("bench")
+        ts, raw = history.range("bench")
+        _, month = np.unique(ts.astype("datetime64[s]").astype("datetime64[M]"), return_inverse=True)
+        expected = np.bincount(month, raw) / np.bincount(month)
+        assert np.allclose(monthly, expected)
+        print(f"agregação mensal: {len(buckets)} meses, confere com a série completa")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Importação de leituras do medidor (15 minutos) em blocos, com memória limitada.
+
+Gera um CSV sintético com --rows leituras de --users usuários (cada usuário
+com os aparelhos simulados e uma parte do consumo desconhecida), importa o
+arquivo para o histórico de um banco temporário e informa a vazão, o pico de
+memória do processo e a conciliação do primeiro usuário. O pico de memória
+deve depender do tamanho do bloco, não do tamanho do arquivo.
+
+Uso: python benchmarks/bench_metering.py [--rows 10000000] [--users 100]
+     [--chunk-rows 1000000] [--csv leituras.csv]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.history import HistoryStore
+from ecoenergy.metering import INTERVAL_MINUTES, appliance_profiles, ingest, reconcile
+from ecoenergy.storage import UserStore
+
+APPLIANCES = [
+    {"nome": "Geladeira", "area": "Eletrodomésticos", "potencia": 150, "horas": 24, "quantidade": 1},
+    {"nome": "Chuveiro Elétrico", "area": "Eletrodomésticos", "potencia": 5500, "horas": 0.5, "quantidade": 1},
+    {"nome": "Televisão", "area": "Entretenimento e Eletrônicos", "potencia": 100, "horas": 4, "quantidade": 1},
+    {"nome": "Ar Condicionado", "area": "Eletrodomésticos", "potencia": 1400, "horas": 3, "quantidade": 1},
+]
+WRITE_ROWS = 500_000
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def write_csv(path, n_rows, n_users, rng):
+    """Leituras de cada usuário em sequência; o chuveiro usa o dobro das horas cadastradas."""
+    real = [dict(appliance) for appliance in APPLIANCES]
+    real[1]["horas"] *= 2
+    _, profiles = appliance_profiles(real)
+    load = profiles.sum(axis=0) * INTERVAL_MINUTES / 60          # kWh por leitura, (2, 24)
+    per_user = n_rows // n_users
+    start = np.datetime64("2023-01-01T00:00", "m")
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("usuario,inicio,kwh\n")
+        for user in range(n_users):
+            for offset in range(0, per_user, WRITE_ROWS):
+                count = min(WRITE_ROWS, per_user - offset)
+                moments = start + (offset + np.arange(count)) * INTERVAL_MINUTES
+                minutes = moments.astype(np.int64)
+                hours = (minutes // 60) % 24
+                day_types = ((minutes // 1440 + 3) % 7 >= 5).astype(np.int64)
+                kwh = load[day_types, hours] * rng.uniform(0.8, 1.2, count) + rng.exponential(0.01, count)
+                text = np.char.add(np.char.add(f"u{user},", np.datetime_as_string(moments)),
+                                   np.char.add(",", np.char.mod("%.4f", kwh)))
+                file.write("\n".join(text.tolist()))
+                file.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument("--csv", help="reaproveita (ou grava) o arquivo sintético neste caminho")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        path = args.csv or os.path.join(tmpdir, "leituras.csv")
+        if not os.path.exists(path):
+            start = time.perf_counter()
+            write_csv(path, args.rows, args.users, np.random.default_rng(42))
+            print(f"arquivo gerado em {time.perf_counter() - start:.1f} s "
+                  f"({os.path.getsize(path) / 2**20:.0f} MB)")
+        print(f"memória antes da importação: {peak_rss_mb():.0f} MB")
+
+        store = UserStore(os.path.join(tmpdir, "bench.db"))
+        history = HistoryStore(store)
+        start = time.perf_counter()
+        summaries = ingest(path, history, chunk_rows=args.chunk_rows)
+        elapsed = time.perf_counter() - start
+        rows = sum(summary.rows for summary in summaries.values())
+        print(f"{rows:,} leituras de {len(summaries)} usuários em {elapsed:.1f} s "
+              f"({rows / elapsed:,.0f} linhas/s); pico de memória {peak_rss_mb():.0f} MB")
+
+        username = next(iter(summaries))
+        months = history.rollup(username)
+        print(f"{username}: {len(months[0])} meses no histórico")
+        start = time.perf_counter()
+        result = reconcile(summaries[username], APPLIANCES)
+        print(f"conciliação em {(time.perf_counter() - start) * 1e3:.1f} ms: medido "
+              f"{result.measured_kwh:.1f} kWh/mês, estimado {result.estimated_kwh:.1f} kWh/mês, "
+              f"não explicado {result.unexplained_kwh:.1f} kWh/mês")
+        for name, factor in result.flagged:
+            print(f"  {name}: fator {factor:.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""Vários processos sobre o mesmo banco: resultados corretos e vazão por processo.
+
+Cada processo simula um servidor do app: retoma sessões pelo token (criado
+por outro processo), lê registros pelo CachedUserStore e, em parte das
+operações, inclui um aparelho com gravação condicional (update, que repete
+em caso de conflito). Ao final confere que nenhuma inclusão se perdeu, que
+os totais guardados batem com um recálculo e que cada processo foi avisado
+(ChangeListener) das gravações dos outros.
+
+Uso: python benchmarks/bench_multiprocess.py [--workers 1 2 4] [--operations 20000]
+     [--users 200] [--write-ratio 0.05]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy import aggregates
+from ecoenergy.auth import SECRET_ENV, Authenticator
+from ecoenergy.catalog import load_catalog
+from ecoenergy.sessions import SessionStore
+from ecoenergy.storage import CachedUserStore, ChangeListener, UserStore
+
+
+def build_dataset(path, n_users, rng):
+    models = load_catalog().models
+    store = UserStore(path)
+
+    def records():
+        for i in range(n_users):
+            record = {"password": "", "aparelhos": []}
+            for _ in range(rng.randint(3, 10)):
+                model = rng.choice(models)
+                record["aparelhos"].append({"nome": model.nome, "area": model.area,
+                                            "potencia": model.potencia, "horas": 2.0, "quantidade": 1})
+            aggregates.rebuild(record)
+            yield f"user{i}", record
+
+    store.put_many(records())
+    sessions = SessionStore(store, Authenticator())
+    tokens = [sessions.open(f"user{i}") for i in range(n_users)]
+    counts = {username: len(record["aparelhos"]) for username, record in store.iter_records()}
+    store.close()
+    return tokens, counts
+
+
+def worker(path, tokens, operations, write_ratio, seed, start_event, results):
+    rng = random.Random(seed)
+    store = CachedUserStore(path)
+    sessions = SessionStore(store, Authenticator())
+    notified = set()
+    listener = ChangeListener(store, interval=0.05)
+    listener.subscribe(store.forget)
+    listener.subscribe(lambda username, version: notified.add((username, version)))
+    models = load_catalog().models
+    added = {}
+    writes = 0
+    start_event.wait()
+    start = time.perf_counter()
+    for _ in range(operations):
+        username = sessions.resume(rng.choice(tokens))
+        if rng.random() < write_ratio:
+            model = rng.choice(models)
+            appliance = {"nome": model.nome, "area": model.area, "potencia": model.potencia,
+                         "horas": 1.0, "quantidade": 1}
+            version = store.update(username, lambda record: aggregates.add_appliance(record, appliance))
+            added[username] = added.get(username, 0) + 1
+            writes += 1
+            # a versão gravada por este processo não precisa de aviso
+            notified.add((username, version))
+        else:
+            aggregates.consumption(store.get(username))
+    elapsed = time.perf_counter() - start
+    time.sleep(0.5)  # últimos avisos das gravações dos outros processos
+    listener.shutdown()
+    results.put({"added": added, "writes": writes, "elapsed": elapsed, "notified": notified})
+
+
+def run(path, tokens, n_workers, operations, write_ratio):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    start_event = context.Event()
+    processes = [context.Process(target=worker, args=(path, tokens, operations, write_ratio,
+                                                      seed, start_event, results))
+                 for seed in range(n_workers)]
+    for process in processes:
+        process.start()
+    time.sleep(1.0)  # processos carregados antes de medir
+    wall = time.perf_counter()
+    start_event.set()
+    outputs = [results.get() for _ in processes]
+    wall = time.perf_counter() - wall
+    for process in processes:
+        process.join()
+    return outputs, wall
+
+
+def check(path, counts, outputs):
+    store = UserStore(path)
+    added = {}
+    for output in outputs:
+        for username, count in output["added"].items():
+            added[username] = added.get(username, 0) + count
+    problems = []
+    written = set()
+    for username, record in store.iter_records():
+        expected = counts[username] + added.get(username, 0)
+        if len(record["aparelhos"]) != expected:
+            problems.append(f"{username}: {len(record['aparelhos'])} aparelhos, esperados {expected}")
+        problems.extend(f"{username}: {problem}" for problem in aggregates.verify(record))
+        version = store.get_version(username)
+        written.update((username, v) for v in range(version - added.get(username, 0) + 1, version + 1))
+    for i, output in enumerate(outputs):
+        missing = written - output["notified"]
+        if missing:
+            problems.append(f"processo {i}: {len(missing)} gravações sem aviso")
+    store.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--operations", type=int, default=20_000, help="operações por processo")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    # o segredo compartilhado chega aos processos pelo ambiente
+    os.environ.setdefault(SECRET_ENV, "segredo-do-benchmark")
+    print(f"{os.cpu_count()} núcleos disponíveis")
+    baseline = None
+    for n_workers in args.workers:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "bench.db")
+            tokens, counts = build_dataset(path, args.users, random.Random(42))
+            outputs, wall = run(path, tokens, n_workers, args.operations, args.write_ratio)
+            problems = check(path, counts, outputs)
+        throughput = n_workers * args.operations / wall
+        baseline = baseline or throughput / n_workers
+        writes = sum(output["writes"] for output in outputs)
+        print(f"{n_workers} processos: {throughput:,.0f} operações/s "
+              f"({throughput / n_workers:,.0f} por processo, eficiência "
+              f"{throughput / (baseline * n_workers):.0%}), {writes} gravações, "
+              + ("resultados corretos" if not problems else f"{len(problems)} problemas"))
+        for problem in problems[:10]:
+            print("  ", problem)
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Geração de relatórios em PDF: um relatório grande e o modo em lote.
+
+Uso: python benchmarks/bench_reports.py [--users 200] [--appliances 25] [--workers N]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.consumption import calculate_consumption
+from ecoenergy.reports import chart_pool, generate_pdf_report, generate_reports_batch
+
+
+def make_record(rng, n_appliances):
+    return {"aparelhos": [
+        {"nome": f"Aparelho {i}", "potencia": rng.randint(5, 3000),
+         "horas": rng.uniform(0, 12), "quantidade": rng.randint(1, 3),
+         "area": "Eletrodomésticos"}
+        for i in range(n_appliances)
+    ]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--appliances", type=int, default=25)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    rng = random.Random(42)
+
+    total, by_name = calculate_consumption(make_record(rng, 100)["aparelhos"])
+    start = time.perf_counter()
+    generate_pdf_report("bench", total, by_name)
+    serial = time.perf_counter() - start
+    with chart_pool(args.workers) as pool:
+        generate_pdf_report("aquecimento", total, by_name, executor=pool)
+        start = time.perf_counter()
+        generate_pdf_report("bench", total, by_name, executor=pool)
+        parallel = time.perf_counter() - start
+    print(f"relatório com 10 páginas de gráfico: {serial * 1e3:.0f} ms em série, "
+          f"{parallel * 1e3:.0f} ms com {args.workers} processos")
+
+    records = [(f"user{i}", make_record(rng, args.appliances)) for i in range(args.users)]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stats = generate_reports_batch(records, os.path.join(tmpdir, "relatorios.zip"), args.workers)
+    print(f"lote: {stats['reports']} relatórios em {stats['seconds']:.1f} s "
+          f"({stats['reports_per_second']:.1f} relatórios/s com {args.workers} processos)")
+
+
+if __name__ == "__main__":
+    main()
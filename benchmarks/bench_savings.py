@@ -0,0 +1,92 @@
+"""Tempo das recomendações de economia em casas com muitos aparelhos, e qualidade do plano.
+
+Gera casas com --devices aparelhos (nomes com o cômodo, p.ex. "Lâmpada
+Incandescente (Comum) - cômodo 12", para que haja muitas ações distintas)
+e mede rank_actions e savings_plan. Depois compara o plano com orçamento
+com a melhor combinação encontrada por busca exaustiva em instâncias
+pequenas (todas as 2^n escolhas de ações), informando a diferença média de
+economia.
+
+Uso: python benchmarks/bench_savings.py [--devices 100 1000 10000] [--repeat 5]
+     [--exhaustive 200]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.catalog import load_catalog
+from ecoenergy.consumption import calculate_consumption
+from ecoenergy.savings import rank_actions, savings_plan
+from ecoenergy.tariffs import load_tariffs, price_monthly
+
+STATE = "São Paulo"
+
+
+def random_house(n_devices, rng):
+    models = load_catalog().models
+    rooms = max(1, n_devices // 10)
+    return [{"nome": f"{model.nome} - cômodo {rng.randrange(rooms)}", "area": model.area,
+             "potencia": model.potencia, "horas": round(rng.uniform(0.2, 8), 1),
+             "quantidade": rng.randint(1, 4)}
+            for model in (rng.choice(models) for _ in range(n_devices))]
+
+
+def best_subset(actions, consumption, budget, table):
+    """Maior economia (R$) entre todas as combinações que cabem no orçamento."""
+    n = len(actions)
+    choice = (np.arange(2 ** n)[:, None] >> np.arange(n)) & 1
+    kwh = choice @ np.array([item.kwh for item in actions])
+    cost = choice @ np.array([item.cost for item in actions])
+    codes = table.state_codes([STATE])
+    money = price_monthly([consumption], codes, table=table)[0] - price_monthly(consumption - kwh, codes, table=table)
+    return money[cost <= budget].max()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--exhaustive", type=int, default=200, help="instâncias da busca exaustiva")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    for n_devices in args.devices:
+        house = random_house(n_devices, rng)
+        consumption, _ = calculate_consumption(house)
+        rank_times, plan_times = [], []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            actions = rank_actions(house, STATE)
+            rank_times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            plan = savings_plan(actions, consumption, STATE, budget=10_000)
+            plan_times.append(time.perf_counter() - start)
+        print(f"{n_devices:,} aparelhos: {len(actions)} ações; ranking {statistics.median(rank_times) * 1e3:.1f} ms, "
+              f"plano {statistics.median(plan_times) * 1e3:.1f} ms "
+              f"({len(plan.actions)} ações, R$ {plan.money:.2f}/mês, retorno {plan.payback_months:.0f} meses)")
+
+    table = load_tariffs()
+    gaps = []
+    for _ in range(args.exhaustive):
+        house = random_house(rng.randint(10, 40), rng)
+        consumption, _ = calculate_consumption(house)
+        actions = rank_actions(house, STATE, solar=False)[:14]
+        if not actions:
+            continue
+        budget = rng.uniform(0, sum(item.cost for item in actions))
+        plan = savings_plan(actions, consumption, STATE, budget=budget)
+        best = best_subset(actions, consumption, budget, table)
+        gaps.append((best - plan.money) / best if best > 0 else 0.0)
+    print(f"busca exaustiva em {len(gaps)} casas: o plano fica em média {np.mean(gaps):.2%} "
+          f"(no pior caso {np.max(gaps):.2%}) abaixo da melhor combinação dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
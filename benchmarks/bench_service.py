@@ -0,0 +1,140 @@
+"""Teste de carga do serviço HTTP: latência p50/p99 e requisições por segundo.
+
+Sobe python -m ecoenergy.service num subprocesso e dispara requisições de
+consumo e de conta em lote por conexões keep-alive concorrentes.
+
+Uso: python benchmarks/bench_service.py [--connections 32] [--seconds 10] [--batch 100]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import ecoenergy.service  # noqa: F401  (confere que o núcleo carrega sem o Streamlit)
+from ecoenergy.catalog import APPLIANCE_OPTIONS
+from ecoenergy.tariffs import load_tariffs
+
+
+async def _request(reader, writer, path, body):
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def _worker(port, path, bodies, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await _request(reader, writer, path, random.choice(bodies))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def _load(port, path, bodies, connections, seconds):
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(*(_worker(port, path, bodies, deadline, latencies, errors)
+                           for _ in range(connections)))
+    return np.array(latencies), errors, time.perf_counter() - start
+
+
+def _consumption_bodies(rng, batch, count=50):
+    catalog = [(area, nome) for area, names in APPLIANCE_OPTIONS.items() for nome in names]
+    bodies = []
+    for _ in range(count):
+        households = []
+        for _ in range(batch):
+            appliances = []
+            for _ in range(rng.randint(5, 20)):
+                area, nome = rng.choice(catalog)
+                appliances.append({"nome": nome, "area": area, "potencia": rng.randint(5, 3000),
+                                   "horas": round(rng.uniform(0, 12), 1),
+                                   "quantidade": rng.randint(1, 3)})
+            households.append({"aparelhos": appliances})
+        bodies.append(json.dumps({"residencias": households}).encode())
+    return bodies
+
+
+def _bill_bodies(rng, batch, count=50):
+    states = load_tariffs().states
+    return [json.dumps({"itens": [{"consumo_kwh": rng.uniform(30, 900), "estado": rng.choice(states)}
+                                  for _ in range(batch)], "bandeira": "amarela"}).encode()
+            for _ in range(count)]
+
+
+def _wait_ready(port, process, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("o serviço terminou antes de ficar pronto")
+        try:
+            async def probe():
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                writer.write(b"GET /saude HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                await writer.drain()
+                await reader.readuntil(b"\r\n\r\n")
+                writer.close()
+            asyncio.run(probe())
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("o serviço não respondeu a tempo")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=100, help="residências ou contas por requisição")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    print("núcleo importado sem o Streamlit:", "streamlit" not in sys.modules)
+    rng = random.Random(42)
+    scenarios = [("/consumo", _consumption_bodies(rng, args.batch)),
+                 ("/conta", _bill_bodies(rng, args.batch))]
+
+    root = os.path.join(os.path.dirname(__file__), "..")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "ecoenergy.service", "--port", str(args.port),
+         "--workers", str(args.workers)], cwd=root)
+    try:
+        _wait_ready(args.port, process)
+        for path, bodies in scenarios:
+            latencies, errors, elapsed = asyncio.run(
+                _load(args.port, path, bodies, args.connections, args.seconds))
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+            rps = len(latencies) / elapsed
+            print(f"{path}: {len(latencies):,} requisições, {rps:,.0f} req/s "
+                  f"({rps * args.batch:,.0f} itens/s), p50 {p50:.1f} ms, p99 {p99:.1f} ms, "
+                  f"{len(errors)} erros")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Simulação de um ano de carga horária para 10 mil residências.
+
+Uso: python benchmarks/bench_simulation.py [--households 10000] [--appliances 15]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.simulation import SCHEDULES, simulate_records
+from ecoenergy.tariffs import load_tariffs
+
+
+NAMES = ["Geladeira/Freezer", "Chuveiro Elétrico", "Lâmpada LED", "Televisão",
+         "Aparelho de Ar-condicionado", "Micro-ondas", "Máquina de lavar roupas",
+         "Computador (Desktop/Notebook)", "Roteador de Internet", "Ventilador"]
+
+
+def make_records(rng, households, appliances):
+    schedules = [None] * 4 + list(SCHEDULES)
+    for i in range(households):
+        yield f"user{i}", {"aparelhos": [
+            {"nome": rng.choice(NAMES), "potencia": rng.randint(5, 5500),
+             "horas": rng.choice([0.5, 1, 2, 4, 8, 24]), "quantidade": rng.randint(1, 4),
+             "horario": rng.choice(schedules)}
+            for _ in range(appliances)
+        ]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--households", type=int, default=10_000)
+    parser.add_argument("--appliances", type=int, default=15)
+    args = parser.parse_args()
+
+    records = list(make_records(random.Random(42), args.households, args.appliances))
+    start = time.perf_counter()
+    profile = simulate_records(records, days=365)
+    peak = profile.peak_kw()
+    load_factor = profile.load_factor()
+    hourly = profile.hourly_kwh()
+    codes = load_tariffs().state_codes(["São Paulo"] * args.households)
+    bills = profile.monthly_bill(codes)
+    elapsed = time.perf_counter() - start
+    print(f"{args.households:,} residências x {args.appliances} aparelhos x 365 dias "
+          f"em {elapsed:.2f} s")
+    print(f"pico médio {peak.mean():.2f} kW, fator de carga médio {load_factor.mean():.2f}, "
+          f"hora de maior consumo {hourly.sum(axis=0).argmax()}h, "
+          f"conta média na tarifa branca R$ {bills.mean():.2f}")
+
+    start = time.perf_counter()
+    matrix = profile.matrix(0)
+    print(f"matriz horária de uma residência {matrix.shape} em "
+          f"{(time.perf_counter() - start) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
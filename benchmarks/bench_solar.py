@@ -0,0 +1,42 @@
+"""Varredura de cenários solares: precisa responder a um slider (< 100 ms).
+
+Uso: python benchmarks/bench_solar.py [--panels 80] [--costs 61]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.solar import optimal, sweep
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--panels", type=int, default=80)
+    parser.add_argument("--costs", type=int, default=61)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    panels = np.arange(args.panels + 1)
+    costs = np.linspace(2000, 8000, args.costs)
+    timings = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        result = sweep(350.0, "Minas Gerais", panels, costs)
+        timings.append(time.perf_counter() - start)
+    scenarios = len(panels) * len(costs)
+    print(f"{scenarios:,} cenários x 300 meses: mediana {statistics.median(timings) * 1e3:.1f} ms, "
+          f"máximo {max(timings) * 1e3:.1f} ms")
+    middle = len(costs) // 2
+    best = optimal(result, middle)
+    print(f"a R$ {costs[middle]:.0f}/kWp: melhor com {panels[best]} painéis, "
+          f"VPL R$ {result.npv[middle, best]:.0f}, retorno em {result.payback_months[middle, best]:.0f} meses")
+
+
+if __name__ == "__main__":
+    main()
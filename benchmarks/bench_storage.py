@@ -0,0 +1,91 @@
+"""Latência de gravação de um usuário conforme o total de usuários cresce.
+
+Uso: python benchmarks/bench_storage.py [--writes 500] [--legacy]
+
+Com --legacy também mede o antigo json.dump do arquivo inteiro, para
+comparação (limitado a 10 mil usuários, pois cresce linearmente).
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.storage import UserStore
+
+
+SIZES = [100, 1_000, 10_000, 100_000]
+
+
+def make_record(rng):
+    return {
+        "password": "0" * 64,
+        "aparelhos": [
+            {"nome": "Televisão", "potencia": rng.randint(50, 300),
+             "horas": rng.uniform(0, 8), "quantidade": 1,
+             "area": "Entretenimento e Eletrônicos"}
+            for _ in range(10)
+        ],
+    }
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def bench_store(n_users, writes, rng, tmpdir):
+    store = UserStore(os.path.join(tmpdir, f"bench_{n_users}.db"))
+    store.put_many((f"user{i}", make_record(rng)) for i in range(n_users))
+    samples = []
+    for _ in range(writes):
+        username = f"user{rng.randrange(n_users)}"
+        record = make_record(rng)
+        start = time.perf_counter()
+        store.put(username, record)
+        samples.append(time.perf_counter() - start)
+    store.close()
+    return samples
+
+
+def bench_legacy(n_users, writes, rng, tmpdir):
+    path = os.path.join(tmpdir, f"bench_{n_users}.json")
+    data = {f"user{i}": make_record(rng) for i in range(n_users)}
+    samples = []
+    for _ in range(writes):
+        data[f"user{rng.randrange(n_users)}"] = make_record(rng)
+        start = time.perf_counter()
+        with open(path, "w") as file:
+            json.dump(data, file)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def report(label, n_users, samples):
+    print(f"{label:<8} {n_users:>8} usuários  "
+          f"mediana {statistics.median(samples) * 1e3:8.3f} ms  "
+          f"p99 {percentile(samples, 0.99) * 1e3:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for n_users in SIZES:
+            report("sqlite", n_users, bench_store(n_users, args.writes, rng, tmpdir))
+            if args.legacy and n_users <= 10_000:
+                writes = max(5, args.writes // max(1, n_users // 100))
+                report("json", n_users, bench_legacy(n_users, writes, rng, tmpdir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Precificação em lote: contas mensais e horárias de muitos usuários.
+
+Uso: python benchmarks/bench_tariffs.py [--users 100000] [--hourly-users 10000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from ecoenergy.tariffs import load_tariffs, price_hourly, price_monthly
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--hourly-users", type=int, default=10_000)
+    args = parser.parse_args()
+
+    table = load_tariffs()
+    rng = np.random.default_rng(42)
+
+    states = rng.integers(0, len(table.states), args.users)
+    totals = rng.gamma(2.0, 100.0, args.users)
+    start = time.perf_counter()
+    bills = price_monthly(totals, states, flag="amarela", tier_set="social")
+    elapsed = time.perf_counter() - start
+    print(f"mensal: {args.users:,} contas em {elapsed * 1e3:.1f} ms "
+          f"(média R$ {bills.mean():.2f})")
+
+    hours = 30 * 24
+    states = states[:args.hourly_users]
+    consumption = rng.gamma(1.5, 0.3, (args.hourly_users, hours))
+    start = time.perf_counter()
+    bills = price_hourly(consumption, states, flag="amarela")
+    elapsed = time.perf_counter() - start
+    flat = price_hourly(consumption, states, flag="amarela", time_of_use=False)
+    print(f"horária: {args.hourly_users:,} usuários x {hours} h em {elapsed * 1e3:.1f} ms "
+          f"(tarifa branca/convencional: {bills.sum() / flat.sum():.3f})")
+
+
+if __name__ == "__main__":
+    main()
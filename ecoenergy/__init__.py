@@ -0,0 +1 @@
+"""Núcleo do EcoEnergy: módulos sem dependência do Streamlit."""
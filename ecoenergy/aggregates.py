@@ -0,0 +1,161 @@
+"""Totais de consumo materializados no registro do usuário.
+
+O registro guarda, em "totais", o consumo mensal total, o consumo e a
+quantidade de aparelhos por nome e por área e a conta (bandeira verde) em
+cada estado. Incluir, remover ou editar um aparelho ajusta só as parcelas
+desse aparelho, sem percorrer a lista inteira; a conta dos estados é
+recalculada a partir do total, em tempo constante. rebuild() refaz tudo do
+zero e verify() compara os totais guardados com um recálculo completo.
+"""
+import math
+
+from ecoenergy.consumption import calculate_consumption
+from ecoenergy.tariffs import load_tariffs, price_monthly
+
+
+KEY = "totais"
+BASE_FLAG = "verde"
+
+
+def appliance_consumption(appliance):
+    """Consumo mensal (kWh) de um aparelho, na mesma conta de calculate_consumption."""
+    daily_consumption = appliance["potencia"] * appliance["horas"] * appliance["quantidade"] / 1000
+    return daily_consumption * 30
+
+
+def _state_bills(total, table):
+    codes = range(len(table.states))
+    bills = price_monthly([total] * len(table.states), list(codes), BASE_FLAG, table=table)
+    return dict(zip(table.states, bills.tolist()))
+
+
+def _refresh_bills(totals, table=None):
+    table = table or load_tariffs()
+    totals["conta_por_estado"] = _state_bills(totals["consumo_kwh"], table)
+    totals["tarifas"] = table.version
+
+
+def _adjust(groups, key, kwh, count):
+    value, n = groups.get(key, (0.0, 0))
+    n += count
+    if n <= 0:
+        groups.pop(key, None)
+    else:
+        groups[key] = [value + kwh, n]
+
+
+def _apply(totals, appliance, sign):
+    kwh = appliance_consumption(appliance)
+    totals["consumo_kwh"] += sign * kwh
+    _adjust(totals["por_aparelho"], appliance["nome"], sign * kwh, sign)
+    _adjust(totals["por_area"], appliance.get("area", ""), sign * kwh, sign)
+    if not totals["por_aparelho"]:
+        # sem aparelhos o total é exatamente zero, sem resíduo de arredondamento
+        totals["consumo_kwh"] = 0.0
+
+
+def rebuild(record, table=None):
+    """Recalcula os totais a partir da lista de aparelhos e os guarda no registro."""
+    totals = {"consumo_kwh": 0.0, "por_aparelho": {}, "por_area": {}}
+    for appliance in record.get("aparelhos", []):
+        _apply(totals, appliance, 1)
+    _refresh_bills(totals, table)
+    record[KEY] = totals
+    return totals
+
+
+def ensure(record):
+    """Totais do registro; devolve (totais, alterado) e os refaz se faltarem ou
+    se a tabela de tarifas mudou desde o último cálculo."""
+    totals = record.get(KEY)
+    if totals is None:
+        return rebuild(record), True
+    table = load_tariffs()
+    if totals.get("tarifas") != table.version:
+        _refresh_bills(totals, table)
+        return totals, True
+    return totals, False
+
+
+def add_appliances(record, appliances):
+    totals, _ = ensure(record)
+    for appliance in appliances:
+        record.setdefault("aparelhos", []).append(appliance)
+        _apply(totals, appliance, 1)
+    _refresh_bills(totals)
+
+
+def add_appliance(record, appliance):
+    add_appliances(record, [appliance])
+
+
+def remove_appliance(record, index):
+    """Remove o aparelho na posição index e devolve o aparelho removido."""
+    totals, _ = ensure(record)
+    appliance = record["aparelhos"].pop(index)
+    _apply(totals, appliance, -1)
+    _refresh_bills(totals)
+    return appliance
+
+
+def update_appliance(record, index, appliance):
+    totals, _ = ensure(record)
+    _apply(totals, record["aparelhos"][index], -1)
+    record["aparelhos"][index] = appliance
+    _apply(totals, appliance, 1)
+    _refresh_bills(totals)
+
+
+def clear_appliances(record):
+    record["aparelhos"] = []
+    rebuild(record)
+
+
+def consumption(record):
+    """(total, {nome: kWh}), como calculate_consumption, lidos dos totais guardados."""
+    totals, _ = ensure(record)
+    return totals["consumo_kwh"], {name: kwh for name, (kwh, _) in totals["por_aparelho"].items()}
+
+
+def consumption_by_area(record):
+    totals, _ = ensure(record)
+    return {area: kwh for area, (kwh, _) in totals["por_area"].items()}
+
+
+def bill(record, state, flag=BASE_FLAG):
+    """Conta mensal (R$) no estado; outras bandeiras somam o acréscimo sobre o total."""
+    totals, _ = ensure(record)
+    table = load_tariffs()
+    base = totals["conta_por_estado"].get(state)
+    if base is None:
+        base = float(price_monthly(totals["consumo_kwh"], table.state_codes([state]), BASE_FLAG,
+                                   table=table)[0])
+    return base + totals["consumo_kwh"] * (table.flags[flag] - table.flags[BASE_FLAG])
+
+
+def verify(record, rel_tol=1e-9, abs_tol=1e-6):
+    """Diferenças entre os totais guardados e um recálculo completo (lista vazia se conferem)."""
+    stored = record.get(KEY)
+    if stored is None:
+        return ["registro sem totais"]
+    expected = rebuild({"aparelhos": record.get("aparelhos", [])})
+    total, _ = calculate_consumption(record.get("aparelhos", []))
+    problems = []
+
+    def close(a, b):
+        return math.isclose(a, b, rel_tol=rel_tol, abs_tol=abs_tol)
+
+    if not close(stored["consumo_kwh"], total):
+        problems.append(f"consumo total: {stored['consumo_kwh']} != {total}")
+    for group in ("por_aparelho", "por_area"):
+        if stored[group].keys() != expected[group].keys():
+            problems.append(f"{group}: chaves diferentes")
+            continue
+        for key, (kwh, count) in expected[group].items():
+            stored_kwh, stored_count = stored[group][key]
+            if stored_count != count or not close(stored_kwh, kwh):
+                problems.append(f"{group}[{key!r}]: {stored[group][key]} != {[kwh, count]}")
+    for state, value in expected["conta_por_estado"].items():
+        if not close(stored["conta_por_estado"].get(state, math.nan), value):
+            problems.append(f"conta_por_estado[{state!r}]: {stored['conta_por_estado'].get(state)} != {value}")
+    return problems
@@ -0,0 +1,315 @@
+"""Estatísticas de todas as residências: percentis por estado e maiores consumos.
+
+O cálculo percorre o UserStore em lotes e usa o cálculo de consumo em
+colunas (consumption_from_columns) em cada lote. A distribuição do consumo
+de cada estado é resumida num t-digest: cerca de cem centroides
+(média, peso) que aproximam qualquer percentil com erro pequeno nas caudas.
+Os digests dos lotes são combinados, então a memória não depende do número
+de usuários.
+
+O resultado é gravado na tabela fleet_stats e recalculado periodicamente
+por FleetStatsScheduler (ou pela linha de comando, p.ex. num cron):
+
+    python -m ecoenergy.analytics --db user_data.db
+
+Consultar o percentil de um consumo é uma interpolação sobre os centroides,
+sem tocar nos registros dos usuários.
+"""
+import argparse
+import json
+import threading
+import time
+from itertools import islice
+
+import numpy as np
+
+from ecoenergy.consumption import columns_from_records, consumption_from_columns
+from ecoenergy.storage import DEFAULT_DB_PATH, UserStore
+
+
+DEFAULT_COMPRESSION = 200
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_INTERVAL = 3600
+# abaixo disso o estado usa a distribuição de todas as residências
+MIN_SIMILAR_HOUSEHOLDS = 30
+ALL_STATES = ""
+TOP_APPLIANCES = 10
+
+
+class TDigest:
+    """Resumo aproximado de uma distribuição (t-digest com função de escala k1)."""
+
+    def __init__(self, means=(), weights=(), minimum=np.inf, maximum=-np.inf,
+                 compression=DEFAULT_COMPRESSION):
+        self.means = np.asarray(means, dtype=np.float64)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.compression = compression
+        self._cumulative = None
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return cls(compression=compression)
+        digest = cls(values, np.ones_like(values), values.min(), values.max(), compression)
+        digest._compress()
+        return digest
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def __len__(self):
+        return len(self.means)
+
+    def _compress(self):
+        order = np.argsort(self.means, kind="stable")
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+        # posição (0..1) do início de cada centroide na distribuição
+        left = (np.cumsum(weights) - weights) / total
+        # k1: os grupos são estreitos nas caudas e largos perto da mediana
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * left - 1)
+        group = np.floor(k - k[0]).astype(np.int64)
+        _, group = np.unique(group, return_inverse=True)
+        merged_weights = np.bincount(group, weights=weights)
+        self.means = np.bincount(group, weights=means * weights) / merged_weights
+        self.weights = merged_weights
+        self._cumulative = None
+
+    def merge(self, other):
+        """Digest com os pontos dos dois (nenhum dos dois é alterado)."""
+        if not len(other):
+            return self
+        if not len(self):
+            return other
+        merged = TDigest(np.concatenate([self.means, other.means]),
+                         np.concatenate([self.weights, other.weights]),
+                         min(self.minimum, other.minimum), max(self.maximum, other.maximum),
+                         self.compression)
+        merged._compress()
+        return merged
+
+    def _positions(self):
+        # posição do centro de cada centroide, com os extremos exatos nas pontas
+        if self._cumulative is None:
+            total = self.weights.sum()
+            centers = (np.cumsum(self.weights) - self.weights / 2) / total
+            self._cumulative = (np.concatenate([[0.0], centers, [1.0]]),
+                                np.concatenate([[self.minimum], self.means, [self.maximum]]))
+        return self._cumulative
+
+    def quantile(self, q):
+        """Valor do quantil q (0..1); q pode ser um array."""
+        if not len(self):
+            return np.nan
+        positions, values = self._positions()
+        return np.interp(q, positions, values)
+
+    def cdf(self, value):
+        """Fração (0..1) dos pontos menores ou iguais a value."""
+        if not len(self):
+            return np.nan
+        positions, values = self._positions()
+        return np.interp(value, values, positions)
+
+    def to_dict(self):
+        return {"medias": self.means.tolist(), "pesos": self.weights.tolist(),
+                "minimo": self.minimum, "maximo": self.maximum, "compressao": self.compression}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["medias"], data["pesos"], data["minimo"], data["maximo"], data["compressao"])
+
+
+class FleetStats:
+    """Fotografia das estatísticas de todas as residências."""
+
+    def __init__(self, computed_at, households, digests, areas, appliances):
+        self.computed_at = computed_at
+        self.households = households
+        self.digests = digests          # estado -> TDigest ("" = todas as residências)
+        self.areas = areas              # área -> kWh somados
+        self.appliances = appliances    # nome -> (kWh somados, residências que têm)
+
+    def digest_for(self, state=None):
+        """Digest das residências parecidas: o do estado, se tiver amostra suficiente."""
+        digest = self.digests.get(state)
+        if digest is None or digest.count < MIN_SIMILAR_HOUSEHOLDS:
+            return self.digests.get(ALL_STATES), ALL_STATES
+        return digest, state
+
+    def percentile(self, consumption, state=None):
+        """Percentil (0..100) do consumo entre as residências parecidas, ou None."""
+        digest, _ = self.digest_for(state)
+        if digest is None or not len(digest):
+            return None
+        return float(digest.cdf(consumption)) * 100
+
+    def quantiles(self, qs, state=None):
+        digest, _ = self.digest_for(state)
+        return digest.quantile(qs) if digest is not None else np.full(len(qs), np.nan)
+
+    def top_areas(self):
+        return sorted(self.areas.items(), key=lambda item: item[1], reverse=True)
+
+    def top_appliances(self, limit=TOP_APPLIANCES):
+        return sorted(self.appliances.items(), key=lambda item: item[1][0], reverse=True)[:limit]
+
+    def to_dict(self):
+        return {
+            "calculado_em": self.computed_at,
+            "residencias": self.households,
+            "digests": {state: digest.to_dict() for state, digest in self.digests.items()},
+            "areas": self.areas,
+            "aparelhos": {name: list(value) for name, value in self.appliances.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["calculado_em"], data["residencias"],
+                   {state: TDigest.from_dict(digest) for state, digest in data["digests"].items()},
+                   data["areas"], {name: tuple(value) for name, value in data["aparelhos"].items()})
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def compute_fleet_stats(records, batch_size=DEFAULT_BATCH_SIZE, compression=DEFAULT_COMPRESSION):
+    """Estatísticas dos pares (usuário, registro); residências sem aparelhos ficam de fora."""
+    digests = {}
+    areas = {}
+    appliances = {}
+    households = 0
+    for batch in _batches(records, batch_size):
+        batch = [(username, record) for username, record in batch if record.get("aparelhos")]
+        if not batch:
+            continue
+        columns = columns_from_records(batch)
+        result = consumption_from_columns(columns)
+        households += len(batch)
+
+        states = np.array([record.get("estado") or ALL_STATES for _, record in batch])
+        for state in [ALL_STATES, *map(str, np.unique(states[states != ALL_STATES]))]:
+            values = result.totals if state == ALL_STATES else result.totals[states == state]
+            digest = TDigest.from_values(values, compression)
+            digests[state] = digests[state].merge(digest) if state in digests else digest
+
+        for area, kwh in zip(columns.areas, result.per_area.sum(axis=0).tolist()):
+            areas[area] = areas.get(area, 0.0) + kwh
+        n_names = len(columns.names)
+        name_kwh = np.bincount(columns.nome, weights=result.per_appliance, minlength=n_names)
+        # residências distintas que têm cada aparelho
+        pairs = np.unique(columns.household * n_names + columns.nome)
+        name_households = np.bincount(pairs % n_names, minlength=n_names)
+        for name, kwh, count in zip(columns.names, name_kwh.tolist(), name_households.tolist()):
+            total, owners = appliances.get(name, (0.0, 0))
+            appliances[name] = (total + kwh, owners + count)
+    return FleetStats(time.time(), households, digests, areas, appliances)
+
+
+class FleetStatsStore:
+    """Última fotografia das estatísticas, na tabela fleet_stats do banco dos usuários."""
+
+    def __init__(self, store):
+        self.store = store
+        with store.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fleet_stats ("
+                " id INTEGER PRIMARY KEY CHECK (id = 1),"
+                " computed_at REAL NOT NULL,"
+                " payload TEXT NOT NULL"
+                ")"
+            )
+
+    def computed_at(self):
+        row = self.store.connection().execute(
+            "SELECT computed_at FROM fleet_stats WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def load(self):
+        row = self.store.connection().execute(
+            "SELECT payload FROM fleet_stats WHERE id = 1").fetchone()
+        return FleetStats.from_dict(json.loads(row[0])) if row else None
+
+    def save(self, stats):
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO fleet_stats (id, computed_at, payload) VALUES (1, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE"
+                " SET computed_at = excluded.computed_at, payload = excluded.payload",
+                (stats.computed_at, json.dumps(stats.to_dict(), ensure_ascii=False)))
+
+    def refresh(self, batch_size=DEFAULT_BATCH_SIZE):
+        stats = compute_fleet_stats(self.store.iter_records(), batch_size)
+        self.save(stats)
+        return stats
+
+
+class FleetStatsScheduler:
+    """Mantém as estatísticas em memória e as recalcula a cada interval segundos.
+
+    Ao iniciar, reaproveita a fotografia gravada se ela for recente; o
+    recálculo roda numa thread própria e as páginas só leem current(), que
+    também adota uma fotografia mais nova gravada por outro processo (p.ex.
+    pela linha de comando).
+    """
+
+    def __init__(self, store, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self._stats_store = FleetStatsStore(store)
+        self._stats = self._stats_store.load()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="estatisticas", daemon=True)
+        self._thread.start()
+
+    def current(self):
+        computed_at = self._stats_store.computed_at()
+        if computed_at is not None and (self._stats is None or computed_at > self._stats.computed_at):
+            self._stats = self._stats_store.load()
+        return self._stats
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # com vários processos, só recalcula quem encontrar a fotografia vencida
+            stats = self.current()
+            age = time.time() - stats.computed_at if stats else self.interval
+            if age >= self.interval:
+                try:
+                    self._stats = self._stats_store.refresh()
+                except Exception:
+                    # mantém a fotografia anterior; tenta de novo no próximo ciclo
+                    pass
+                age = 0
+            self._stop.wait(self.interval - age)
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recalcula as estatísticas de todas as residências.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = FleetStatsStore(UserStore(args.db)).refresh(args.batch_size)
+    print(f"{stats.households} residências em {time.perf_counter() - start:.1f} s")
+    for state, digest in sorted(stats.digests.items()):
+        p25, p50, p75 = digest.quantile([0.25, 0.5, 0.75])
+        print(f"{state or 'todas'}: {digest.count:.0f} residências, "
+              f"p25 {p25:.0f} / p50 {p50:.0f} / p75 {p75:.0f} kWh")
+
+
+if __name__ == "__main__":
+    main()
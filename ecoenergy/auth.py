@@ -0,0 +1,238 @@
+"""Senhas com scrypt (com sal), verificação fora da thread do script e
+limite de tentativas por usuário.
+
+O hash é guardado como "scrypt$n$r$p$sal$hash" (base64). Hashes antigos
+(SHA-256 sem sal, 64 dígitos hexadecimais) continuam aceitos e são
+substituídos no próximo login bem-sucedido, assim como hashes scrypt com
+custo abaixo do atual. Depois do login a sessão recebe um token assinado
+(HMAC) e de curta duração; as reexecuções do script só validam o token,
+sem recalcular o hash. Com vários processos servindo o app, todos precisam
+assinar com o mesmo segredo, lido da variável de ambiente ECOENERGY_SECRET
+(ou fornecido por sessions.shared_secret).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+# maiores custos aceitos num hash guardado: acima deles um hash (p.ex. importado)
+# faria cada login gastar memória ou CPU demais
+MAX_SCRYPT_N = 2 ** 20
+MAX_SCRYPT_R = 32
+MAX_SCRYPT_P = 16
+# teto fixo de memória de uma chamada ao scrypt (o padrão usa 16 MiB)
+MAX_SCRYPT_MEM = 256 * 2 ** 20
+SALT_BYTES = 16
+KEY_BYTES = 32
+MAX_TRACKED_USERS = 10_000
+SECRET_ENV = "ECOENERGY_SECRET"
+
+OK = "ok"
+INVALID = "invalido"
+THROTTLED = "bloqueado"
+
+LoginResult = namedtuple("LoginResult", "status new_hash retry_after")
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt_memory(n, r, p):
+    return 128 * r * (n + p + 2)
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=MAX_SCRYPT_MEM, dklen=KEY_BYTES)
+
+
+def hash_password(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def _is_legacy(stored):
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+def _parse_scrypt(stored):
+    """(n, r, p, sal, hash) de um hash "scrypt$n$r$p$sal$hash", ou None se estiver malformado."""
+    try:
+        scheme, n, r, p, salt, expected = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        salt, expected = base64.b64decode(salt, validate=True), base64.b64decode(expected, validate=True)
+    except (AttributeError, ValueError):
+        # ValueError cobre também o binascii.Error do base64
+        return None
+    # custos fora do que o scrypt aceita (que também exige n < 2 ** (16 * r)) ou caros
+    # demais não são hashes gerados aqui
+    if (scheme != "scrypt" or not 1 < n <= MAX_SCRYPT_N or n & (n - 1)
+            or not 1 <= r <= MAX_SCRYPT_R or not 1 <= p <= MAX_SCRYPT_P or n >= 2 ** (16 * r)
+            or _scrypt_memory(n, r, p) > MAX_SCRYPT_MEM or not expected):
+        return None
+    return n, r, p, salt, expected
+
+
+def is_password_hash(stored):
+    """Se stored é um hash de senha aceito: scrypt bem formado ou SHA-256 antigo."""
+    return isinstance(stored, str) and (_is_legacy(stored) or _parse_scrypt(stored) is not None)
+
+
+def verify_password(password, stored, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """Devolve (confere, precisa_refazer_hash).
+
+    Um hash guardado malformado nunca confere (e não levanta exceção).
+    """
+    if not isinstance(stored, str):
+        return False, False
+    if _is_legacy(stored):
+        legacy = hashlib.sha256(password.encode()).hexdigest()
+        return hmac.compare_digest(legacy, stored), True
+    parsed = _parse_scrypt(stored)
+    if parsed is None:
+        return False, False
+    stored_n, stored_r, stored_p, salt, expected = parsed
+    try:
+        key = _scrypt(password, salt, stored_n, stored_r, stored_p)
+    except (ValueError, MemoryError):
+        return False, False
+    ok = hmac.compare_digest(key, expected)
+    return ok, (stored_n, stored_r, stored_p) < (n, r, p)
+
+
+# usado quando o usuário não existe, para que a resposta leve o mesmo tempo
+_DUMMY_HASH = hash_password(secrets.token_hex(8))
+
+
+class MemoryThrottle:
+    """Falhas de login recentes de cada usuário, na memória do processo.
+
+    Serve para um único processo; com vários processos servindo o app, use
+    sessions.LoginThrottle, que guarda as falhas no banco compartilhado.
+    """
+
+    def __init__(self, max_attempts=5, window=300):
+        self.max_attempts = max_attempts
+        self.window = window
+        self._failures = {}
+        self._lock = threading.Lock()
+
+    def retry_after(self, username, now=None):
+        """Segundos até o usuário poder tentar de novo (0 se não estiver bloqueado)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            failures = self._failures.get(username)
+            if not failures:
+                return 0
+            while failures and failures[0] <= now - self.window:
+                failures.popleft()
+            if not failures:
+                del self._failures[username]
+                return 0
+            if len(failures) < self.max_attempts:
+                return 0
+            return failures[0] + self.window - now
+
+    def failed(self, username, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            if len(self._failures) > MAX_TRACKED_USERS:
+                self._forget_expired(now)
+            self._failures.setdefault(username, deque()).append(now)
+
+    def succeeded(self, username):
+        with self._lock:
+            self._failures.pop(username, None)
+
+    def _forget_expired(self, now):
+        for username in [name for name, failures in self._failures.items()
+                         if failures[-1] <= now - self.window]:
+            del self._failures[username]
+
+
+class Authenticator:
+    """Verifica senhas num pool limitado de threads e controla as sessões.
+
+    Cada usuário pode errar a senha max_attempts vezes dentro de window
+    segundos; depois disso as tentativas são recusadas sem calcular o hash
+    até a janela passar. As falhas ficam em throttle (por padrão, na memória
+    do processo).
+    """
+
+    def __init__(self, max_workers=None, max_attempts=5, window=300, token_ttl=3600,
+                 secret=None, throttle=None):
+        self.throttle = throttle if throttle is not None else MemoryThrottle(max_attempts, window)
+        self.token_ttl = token_ttl
+        env_secret = os.environ.get(SECRET_ENV)
+        self._secret = secret or (env_secret.encode() if env_secret else secrets.token_bytes(32))
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                                            thread_name_prefix="senha")
+
+    def hash_password(self, password):
+        return self._executor.submit(hash_password, password).result()
+
+    def retry_after(self, username, now=None):
+        """Segundos até o usuário poder tentar de novo (0 se não estiver bloqueado)."""
+        return self.throttle.retry_after(username, now)
+
+    def verify(self, username, password, stored):
+        """Confere a senha; stored é o hash guardado (None se o usuário não existe).
+
+        Devolve LoginResult. new_hash vem preenchido quando o hash guardado
+        deve ser substituído (SHA-256 antigo ou custo desatualizado).
+        """
+        wait = self.retry_after(username)
+        if wait:
+            return LoginResult(THROTTLED, None, wait)
+        ok, needs_rehash = self._executor.submit(
+            verify_password, password, stored or _DUMMY_HASH).result()
+        ok = ok and stored is not None
+        if not ok:
+            self.throttle.failed(username)
+            return LoginResult(INVALID, None, 0)
+        self.throttle.succeeded(username)
+        new_hash = self.hash_password(password) if needs_rehash else None
+        return LoginResult(OK, new_hash, 0)
+
+    def _sign(self, payload):
+        return hmac.new(self._secret, payload.encode(), hashlib.sha256).hexdigest()
+
+    def issue_token(self, username, now=None, session=""):
+        """Token assinado com o usuário e, opcionalmente, o identificador da sessão."""
+        expires = int((time.time() if now is None else now) + self.token_ttl)
+        payload = f"{_b64(username.encode())}.{expires}.{session}"
+        return f"{payload}.{self._sign(payload)}"
+
+    def token_claims(self, token, now=None):
+        """(usuário, sessão) do token, ou None se for inválido ou tiver expirado."""
+        if not token:
+            return None
+        try:
+            encoded, expires, session, signature = token.split(".")
+            payload = f"{encoded}.{expires}.{session}"
+            if not hmac.compare_digest(signature, self._sign(payload)):
+                return None
+            if int(expires) < (time.time() if now is None else now):
+                return None
+            return base64.b64decode(encoded).decode(), session
+        except (ValueError, TypeError):
+            # TypeError: compare_digest com caracteres fora do ASCII (token vindo do cookie)
+            return None
+
+    def validate_token(self, token, now=None):
+        """Nome do usuário do token, ou None se for inválido ou tiver expirado."""
+        claims = self.token_claims(token, now)
+        return claims[0] if claims else None
+
+    def shutdown(self):
+        self._executor.shutdown()
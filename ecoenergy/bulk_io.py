@@ -0,0 +1,299 @@
+"""Importação e exportação em massa de aparelhos e usuários (CSV ou Parquet).
+
+Os arquivos são lidos e escritos em fluxo, em lotes, sem carregar tudo na
+memória. Cada linha de aparelho é validada contra o catálogo; a importação
+inteira roda numa única transação, gravando os usuários afetados lote a
+lote. Também pode ser usada pela linha de comando:
+
+    python -m ecoenergy.bulk_io importar-aparelhos aparelhos.csv
+    python -m ecoenergy.bulk_io exportar-aparelhos aparelhos.parquet
+    python -m ecoenergy.bulk_io importar-usuarios usuarios.csv
+    python -m ecoenergy.bulk_io exportar-usuarios usuarios.csv
+"""
+import argparse
+import csv
+import io
+import os
+import time
+
+from ecoenergy.aggregates import add_appliances
+from ecoenergy.auth import is_password_hash
+from ecoenergy.catalog import load_catalog
+from ecoenergy.simulation import SCHEDULES
+from ecoenergy.storage import DEFAULT_DB_PATH, UserStore
+
+
+APPLIANCE_FIELDS = ["usuario", "nome", "area", "potencia", "horas", "quantidade", "horario"]
+USER_FIELDS = ["usuario", "senha_hash"]
+DEFAULT_BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 100
+
+
+def _format(target, fmt):
+    if fmt:
+        return fmt
+    name = target if isinstance(target, str) else getattr(target, "name", "")
+    return "parquet" if str(name).endswith(".parquet") else "csv"
+
+
+def _first_line(source, fmt):
+    # no CSV a linha 1 é o cabeçalho
+    return 1 if _format(source, fmt) == "parquet" else 2
+
+
+def read_rows(source, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Linhas do arquivo (caminho ou arquivo binário aberto) como dicionários."""
+    fmt = _format(source, fmt)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size):
+            yield from batch.to_pylist()
+        return
+    if isinstance(source, str):
+        with open(source, "r", encoding="utf-8-sig", newline="") as file:
+            yield from csv.DictReader(file)
+    else:
+        yield from csv.DictReader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+
+
+class _RowWriter:
+    """Escreve dicionários em CSV ou Parquet, em lotes."""
+
+    def __init__(self, target, fields, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.fields = fields
+        self.fmt = _format(target, fmt)
+        self.batch_size = batch_size
+        self._batch = []
+        self._owns_file = isinstance(target, str)
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            self._pa = pa
+            self._writer = pq.ParquetWriter(target, self._schema(pa))
+        else:
+            binary = open(target, "wb") if self._owns_file else target
+            self._binary = binary
+            self._text = io.TextIOWrapper(binary, encoding="utf-8", newline="", write_through=True)
+            self._writer = csv.DictWriter(self._text, fieldnames=fields)
+            self._writer.writeheader()
+
+    def _schema(self, pa):
+        types = {"potencia": pa.float64(), "horas": pa.float64(), "quantidade": pa.int64()}
+        return pa.schema([(field, types.get(field, pa.string())) for field in self.fields])
+
+    def write(self, row):
+        if self.fmt == "parquet":
+            self._batch.append(row)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+        else:
+            self._writer.writerow(row)
+
+    def _flush(self):
+        if self._batch:
+            table = self._pa.Table.from_pylist(self._batch, schema=self._writer.schema)
+            self._writer.write_table(table)
+            self._batch = []
+
+    def close(self):
+        if self.fmt == "parquet":
+            self._flush()
+            self._writer.close()
+        else:
+            self._text.flush()
+            self._text.detach()
+            if self._owns_file:
+                self._binary.close()
+
+
+def validate_appliance(row, catalog=None):
+    """Converte uma linha no dicionário de aparelho; ValueError se for inválida.
+
+    O nome pode vir sem acentos ou numa grafia alternativa do catálogo; o
+    aparelho é gravado com o nome oficial.
+    """
+    catalog = catalog or load_catalog()
+    area = row.get("area")
+    nome = row.get("nome")
+    if area not in catalog.area_models:
+        raise ValueError(f"área desconhecida: {area!r}")
+    model = catalog.get(nome) if isinstance(nome, str) else None
+    if model is None or model.area != area:
+        raise ValueError(f"aparelho {nome!r} não existe em {area}")
+    nome = model.nome
+    try:
+        potencia = float(row["potencia"])
+        horas = float(row["horas"])
+        quantidade = float(row.get("quantidade") or 1)
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("potência, horas e quantidade devem ser números")
+    if potencia < 0:
+        raise ValueError("potência negativa")
+    if not 0 <= horas <= 24:
+        raise ValueError("horas de uso fora de 0 a 24")
+    if quantidade < 1 or quantidade != int(quantidade):
+        raise ValueError("quantidade deve ser um inteiro maior que zero")
+    appliance = {"nome": nome, "potencia": potencia, "horas": horas,
+                 "quantidade": int(quantidade), "area": area}
+    horario = row.get("horario")
+    if horario:
+        if horario not in SCHEDULES:
+            raise ValueError(f"horário desconhecido: {horario!r}")
+        appliance["horario"] = horario
+    return appliance
+
+
+def _new_report():
+    return {"linhas": 0, "importadas": 0, "erros": [], "total_erros": 0, "segundos": 0.0}
+
+
+def _error(report, line, message):
+    report["total_erros"] += 1
+    if len(report["erros"]) < MAX_REPORTED_ERRORS:
+        report["erros"].append(f"linha {line}: {message}")
+
+
+def _finish(report, start):
+    report["segundos"] = time.perf_counter() - start
+    report["linhas_por_segundo"] = report["linhas"] / report["segundos"] if report["segundos"] else 0.0
+    return report
+
+
+def _flush_appliances(store, pending, report):
+    for username, appliances in pending.items():
+        rows = [appliance for _, appliance in appliances]
+        # grava sobre a versão lida, como o app: nada gravado por outra sessão se perde
+        if store.update(username, lambda record: add_appliances(record, rows)) is None:
+            for line, _ in appliances:
+                _error(report, line, f"usuário {username!r} não encontrado")
+            continue
+        report["importadas"] += len(appliances)
+    pending.clear()
+
+
+def import_appliances(store, source, fmt=None, username=None, batch_size=DEFAULT_BATCH_SIZE,
+                      strict=False):
+    """Acrescenta os aparelhos do arquivo aos registros dos usuários.
+
+    Com username, todas as linhas vão para esse usuário e a coluna "usuario"
+    é ignorada. Linhas inválidas são puladas e relatadas; com strict, a
+    primeira linha inválida desfaz a importação inteira (ValueError).
+    """
+    start = time.perf_counter()
+    report = _new_report()
+    pending = {}
+    batched = 0
+    with store.transaction():
+        for line, row in enumerate(read_rows(source, fmt, batch_size), start=_first_line(source, fmt)):
+            report["linhas"] += 1
+            try:
+                appliance = validate_appliance(row)
+            except ValueError as error:
+                if strict:
+                    raise ValueError(f"linha {line}: {error}")
+                _error(report, line, str(error))
+                continue
+            pending.setdefault(username or row.get("usuario"), []).append((line, appliance))
+            batched += 1
+            if batched >= batch_size:
+                _flush_appliances(store, pending, report)
+                batched = 0
+        _flush_appliances(store, pending, report)
+        if strict and report["total_erros"]:
+            raise ValueError(report["erros"][0])
+    return _finish(report, start)
+
+
+def export_appliances(store, target, fmt=None, usernames=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Escreve os aparelhos (de todos os usuários ou só de usernames); devolve as linhas escritas."""
+    writer = _RowWriter(target, APPLIANCE_FIELDS, fmt, batch_size)
+    count = 0
+    try:
+        if usernames is None:
+            records = store.iter_records()
+        else:
+            records = ((username, store.get(username)) for username in usernames)
+        for username, record in records:
+            for appliance in (record or {}).get("aparelhos", []):
+                writer.write({"usuario": username, "horario": appliance.get("horario", ""),
+                              **{field: appliance[field] for field in APPLIANCE_FIELDS[1:6]}})
+                count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def import_users(store, source, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Cria os usuários do arquivo (colunas usuario, senha_hash); existentes são pulados.
+
+    senha_hash precisa estar num formato que o login confere (ver auth); a
+    senha em texto puro, por exemplo, é relatada como erro.
+    """
+    start = time.perf_counter()
+    report = _new_report()
+    with store.transaction():
+        for line, row in enumerate(read_rows(source, fmt, batch_size), start=_first_line(source, fmt)):
+            report["linhas"] += 1
+            username, password_hash = row.get("usuario"), row.get("senha_hash")
+            if not username or not password_hash:
+                _error(report, line, "usuário e senha_hash são obrigatórios")
+            elif not is_password_hash(password_hash):
+                _error(report, line, "senha_hash deve ser um hash scrypt$n$r$p$sal$hash ou SHA-256 (64 dígitos hexadecimais)")
+            elif not store.create(username, {"password": password_hash, "aparelhos": []}):
+                _error(report, line, f"usuário {username!r} já existe")
+            else:
+                report["importadas"] += 1
+    return _finish(report, start)
+
+
+def export_users(store, target, fmt=None, batch_size=DEFAULT_BATCH_SIZE):
+    writer = _RowWriter(target, USER_FIELDS, fmt, batch_size)
+    count = 0
+    try:
+        for username, record in store.iter_records():
+            writer.write({"usuario": username, "senha_hash": record["password"]})
+            count += 1
+    finally:
+        writer.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa e exporta aparelhos e usuários em massa.")
+    parser.add_argument("comando", choices=["importar-aparelhos", "exportar-aparelhos",
+                                            "importar-usuarios", "exportar-usuarios"])
+    parser.add_argument("arquivo", help="arquivo .csv ou .parquet")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--usuario", help="importa todas as linhas para este usuário")
+    parser.add_argument("--estrito", action="store_true",
+                        help="desfaz a importação se alguma linha for inválida")
+    args = parser.parse_args()
+
+    store = UserStore(args.db)
+    start = time.perf_counter()
+    if args.comando == "importar-aparelhos":
+        try:
+            report = import_appliances(store, args.arquivo, username=args.usuario, strict=args.estrito)
+        except ValueError as error:
+            raise SystemExit(f"importação desfeita: {error}")
+    elif args.comando == "importar-usuarios":
+        report = import_users(store, args.arquivo)
+    else:
+        export = export_appliances if args.comando == "exportar-aparelhos" else export_users
+        count = export(store, args.arquivo)
+        elapsed = time.perf_counter() - start
+        print(f"{count} linhas exportadas para {os.path.basename(args.arquivo)} "
+              f"em {elapsed:.1f} s ({count / elapsed:.0f} linhas/s)")
+        return
+    print(f"{report['importadas']} de {report['linhas']} linhas importadas em "
+          f"{report['segundos']:.1f} s ({report['linhas_por_segundo']:.0f} linhas/s)")
+    for error in report["erros"]:
+        print(error)
+    if report["total_erros"] > len(report["erros"]):
+        print(f"... e mais {report['total_erros'] - len(report['erros'])} erros")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Catálogo de aparelhos: nomes por área e potência média de cada modelo.
+
+O catálogo vem de data/aparelhos.json e é carregado uma única vez por
+processo numa estrutura imutável e indexada: busca O(1) da potência padrão
+pelo nome (ou por um apelido, como as grafias antigas da "Lista de KWh"),
+iteração por área e busca por prefixo das palavras do nome, sem diferenciar
+maiúsculas nem acentos. A busca usa uma lista ordenada de palavras e
+bisseção, o que serve para catálogos com dezenas de milhares de modelos.
+"""
+import bisect
+import functools
+import json
+import os
+import re
+import unicodedata
+from collections import namedtuple
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import numpy as np
+
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.dirname(__file__), "data", "aparelhos.json")
+
+ApplianceModel = namedtuple("ApplianceModel", "nome area potencia apelidos")
+
+_WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    """Texto em minúsculas e sem acentos, para comparar nomes."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def _words(text):
+    return _WORD.findall(normalize(text))
+
+
+@dataclass(frozen=True)
+class Catalog:
+    version: str
+    models: tuple
+    areas: tuple
+    area_names: MappingProxyType    # área -> nomes dos modelos, na ordem do catálogo
+    area_models: MappingProxyType   # área -> índices dos modelos
+    name_index: MappingProxyType    # nome ou apelido normalizado -> índice do modelo
+    word_keys: tuple                # palavras dos nomes e apelidos, ordenadas
+    word_owners: np.ndarray         # modelo de cada palavra de word_keys
+    search_text: tuple              # palavras normalizadas de cada modelo, " palavra palavra"
+    search_names: tuple             # nome e apelidos normalizados de cada modelo
+
+    def __len__(self):
+        return len(self.models)
+
+    def get(self, nome):
+        """Modelo pelo nome ou apelido (sem diferenciar acentos), ou None."""
+        index = self.name_index.get(normalize(nome))
+        return None if index is None else self.models[index]
+
+    def default_power(self, nome, default=0):
+        model = self.get(nome)
+        return default if model is None else model.potencia
+
+    def names(self, area):
+        return self.area_names[area]
+
+    def iter_area(self, area):
+        for index in self.area_models[area]:
+            yield self.models[index]
+
+    def search(self, query, area=None, limit=20):
+        """Modelos cujas palavras começam com as palavras da busca.
+
+        Os nomes que começam com o texto buscado vêm primeiro; o restante
+        segue a ordem do catálogo.
+        """
+        words = _words(query)
+        if not words:
+            candidates = self.area_models[area] if area is not None else range(len(self.models))
+            return [self.models[index] for index in candidates[:limit]]
+        # a palavra mais longa costuma ser a mais seletiva
+        longest = max(words, key=len)
+        lo = bisect.bisect_left(self.word_keys, longest)
+        hi = bisect.bisect_left(self.word_keys, longest + "\uffff", lo)
+        prefix = normalize(query).strip()
+        matches = []
+        for index in np.unique(self.word_owners[lo:hi]).tolist():
+            model = self.models[index]
+            if area is not None and model.area != area:
+                continue
+            text = self.search_text[index]
+            if all(" " + part in text for part in words):
+                starts = any(name.startswith(prefix) for name in self.search_names[index])
+                matches.append((not starts, index))
+        matches.sort()
+        return [self.models[index] for _, index in matches[:limit]]
+
+
+def build_catalog(areas, version=""):
+    """Monta o catálogo a partir de {área: [{"nome", "potencia", "apelidos"}, ...]}."""
+    models = []
+    area_models = {}
+    name_index = {}
+    words = []
+    search_text = []
+    search_names = []
+    for area, entries in areas.items():
+        indices = []
+        for entry in entries:
+            index = len(models)
+            model = ApplianceModel(entry["nome"], area, entry["potencia"],
+                                   tuple(entry.get("apelidos", ())))
+            models.append(model)
+            indices.append(index)
+            model_words = set()
+            normalized = tuple(normalize(name) for name in (model.nome, *model.apelidos))
+            for name in normalized:
+                # nomes repetidos ficam com o primeiro modelo
+                name_index.setdefault(name, index)
+                model_words.update(_WORD.findall(name))
+            words.extend((word, index) for word in model_words)
+            search_text.append(" " + " ".join(sorted(model_words)))
+            search_names.append(normalized)
+        area_models[area] = tuple(indices)
+    words.sort()
+    return Catalog(
+        version=version,
+        models=tuple(models),
+        areas=tuple(area_models),
+        area_names=MappingProxyType({area: tuple(models[i].nome for i in indices)
+                                     for area, indices in area_models.items()}),
+        area_models=MappingProxyType(area_models),
+        name_index=MappingProxyType(name_index),
+        word_keys=tuple(word for word, _ in words),
+        word_owners=np.array([index for _, index in words], dtype=np.int32),
+        search_text=tuple(search_text),
+        search_names=tuple(search_names),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def load_catalog(path=DEFAULT_CATALOG_PATH):
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    return build_catalog(data["areas"], data["versao"])
+
+
+APPLIANCE_OPTIONS = load_catalog().area_names
+AREAS = load_catalog().areas
@@ -0,0 +1,152 @@
+"""Gráficos da calculadora renderizados em memória e guardados em cache.
+
+Cada gráfico é identificado pelo hash do seu conteúdo (tipo, dados e
+formato); enquanto os dados não mudam, as execuções seguintes do script
+recebem os mesmos bytes PNG/SVG sem passar pelo matplotlib. As figuras são
+criadas com matplotlib.figure.Figure, sem passar pelo registro global do
+pyplot, e descartadas logo após o savefig.
+"""
+import hashlib
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from matplotlib.figure import Figure
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _bar(ax, names, values):
+    ax.bar(names, values, color='skyblue')
+    ax.set_xlabel('Aparelhos')
+    ax.set_ylabel('Consumo (kWh)')
+    ax.set_title('Consumo de Energia por Aparelho')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    for i, value in enumerate(values):
+        ax.text(i, value + 0.05, f'{value:.2f}', ha='center', va='bottom')
+
+
+def bar_figure(items):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    names, values = zip(*items) if items else ((), ())
+    _bar(ax, names, values)
+    return fig
+
+
+def pie_figure(items):
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    names, values = zip(*items)
+    wedges, texts, autotexts = ax.pie(
+        values,
+        labels=names,
+        autopct='%1.1f%%',
+        startangle=90,
+        textprops=dict(color="w")
+    )
+    ax.axis('equal')
+    ax.set_title("Consumo de Energia por Aparelho")
+    ax.legend(
+        wedges, names,
+        title="Aparelhos",
+        loc="center left",
+        bbox_to_anchor=(1, 0, 0.5, 1)
+    )
+    return fig
+
+
+def history_figure(points):
+    fig = Figure()
+    ax = fig.subplots()
+    dates, values = zip(*points)
+    ax.plot([datetime.fromisoformat(date) for date in dates], values, marker='o')
+    fig.autofmt_xdate()
+    ax.set_xlabel("Mês")
+    ax.set_ylabel("Consumo (kWh)")
+    ax.set_title("Consumo Mensal ao Longo do Tempo")
+    return fig
+
+
+FIGURES = {
+    "barras": bar_figure,
+    "pizza": pie_figure,
+    "historico": history_figure,
+}
+
+
+def render(kind, data, fmt="png", dpi=200):
+    """Renderiza o gráfico e devolve os bytes da imagem."""
+    fig = FIGURES[kind](data)
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=fmt, dpi=dpi, bbox_inches="tight")
+    finally:
+        fig.clear()
+    return buffer.getvalue()
+
+
+def content_key(kind, data, fmt="png", dpi=200):
+    payload = json.dumps([kind, data, fmt, dpi], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ChartCache:
+    """Cache LRU de imagens renderizadas, limitado pelo total de bytes."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.render_seconds = 0.0
+
+    def get(self, kind, data, fmt="png", dpi=200):
+        """Bytes do gráfico; renderiza apenas se o conteúdo ainda não estiver no cache.
+
+        data deve ser serializável em JSON, p.ex. uma lista de pares (nome, valor).
+        """
+        key = content_key(kind, data, fmt, dpi)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return image
+            self.misses += 1
+        start = time.perf_counter()
+        image = render(kind, data, fmt, dpi)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.render_seconds += elapsed
+            if key not in self._images and len(image) <= self.max_bytes:
+                self._images[key] = image
+                self.size_bytes += len(image)
+                while self.size_bytes > self.max_bytes:
+                    _, evicted = self._images.popitem(last=False)
+                    self.size_bytes -= len(evicted)
+                    self.evictions += 1
+        return image
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._images),
+                "size_bytes": self.size_bytes,
+                "render_seconds": self.render_seconds,
+                "mean_render_ms": self.render_seconds / self.misses * 1000 if self.misses else 0.0,
+            }
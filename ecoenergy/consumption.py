@@ -0,0 +1,136 @@
+"""Cálculo de consumo em lote, vetorizado com NumPy.
+
+Recebe os aparelhos de muitas residências em colunas (um elemento por
+aparelho) e devolve, numa única passada, os totais mensais por residência e
+os detalhamentos por aparelho, por nome e por área. Os valores são idênticos
+aos de calculate_consumption, aplicado usuário a usuário: a conta por
+aparelho segue a mesma ordem de operações e np.bincount soma na ordem das
+linhas.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+
+ApplianceColumns = namedtuple(
+    "ApplianceColumns",
+    "usernames household nome names area areas potencia horas quantidade",
+)
+
+BatchConsumption = namedtuple(
+    "BatchConsumption", "totals per_appliance per_name per_area")
+
+
+def calculate_consumption(appliance_data):
+    total_consumption = 0
+    appliance_consumption = {}
+    for appliance in appliance_data:
+        power = appliance['potencia']
+        hours_per_day = appliance['horas']
+        quantity = appliance['quantidade']
+        daily_consumption = power * hours_per_day * quantity / 1000
+        monthly_consumption = daily_consumption * 30
+        appliance_name = appliance['nome']
+        total_consumption += monthly_consumption
+        # aparelhos com o mesmo nome são somados, como no total
+        appliance_consumption[appliance_name] = appliance_consumption.get(appliance_name, 0) + monthly_consumption
+    return total_consumption, appliance_consumption
+
+
+def monthly_consumption(potencia, horas, quantidade):
+    """Consumo mensal (kWh) de cada linha: potência x horas x quantidade x 30 dias."""
+    potencia = np.asarray(potencia, dtype=np.float64)
+    return potencia * horas * quantidade / 1000 * 30
+
+
+def calculate_consumption_batch(potencia, horas, quantidade, household, area,
+                                nome=None, n_households=None, n_areas=None,
+                                n_names=None):
+    """Consumo de várias residências de uma vez.
+
+    household, area e nome são códigos inteiros (0..n-1) por aparelho. Devolve
+    BatchConsumption com:
+
+    - totals: consumo mensal por residência, shape (n_households,);
+    - per_appliance: consumo mensal de cada linha, shape (n_linhas,);
+    - per_name: consumo somado por nome de aparelho, shape
+      (n_households, n_names), ou None se nome não for informado;
+    - per_area: consumo por área, shape (n_households, n_areas).
+    """
+    household = np.asarray(household, dtype=np.int64)
+    area = np.asarray(area, dtype=np.int64)
+    if n_households is None:
+        n_households = int(household.max()) + 1 if household.size else 0
+    if n_areas is None:
+        n_areas = int(area.max()) + 1 if area.size else 0
+
+    per_appliance = monthly_consumption(potencia, horas, quantidade)
+    totals = np.bincount(household, weights=per_appliance, minlength=n_households)
+    per_area = np.bincount(
+        household * n_areas + area, weights=per_appliance,
+        minlength=n_households * n_areas,
+    ).reshape(n_households, n_areas)
+
+    per_name = None
+    if nome is not None:
+        nome = np.asarray(nome, dtype=np.int64)
+        if n_names is None:
+            n_names = int(nome.max()) + 1 if nome.size else 0
+        per_name = np.bincount(
+            household * n_names + nome, weights=per_appliance,
+            minlength=n_households * n_names,
+        ).reshape(n_households, n_names)
+
+    return BatchConsumption(totals, per_appliance, per_name, per_area)
+
+
+def columns_from_records(records):
+    """Converte pares (usuário, registro) nas colunas usadas pelo cálculo em lote."""
+    usernames = []
+    names, name_codes = [], {}
+    areas, area_codes = [], {}
+    household, nome, area = [], [], []
+    potencia, horas, quantidade = [], [], []
+    for username, record in records:
+        code = len(usernames)
+        usernames.append(username)
+        for appliance in record.get("aparelhos", []):
+            household.append(code)
+            name = appliance["nome"]
+            if name not in name_codes:
+                name_codes[name] = len(names)
+                names.append(name)
+            nome.append(name_codes[name])
+            area_name = appliance.get("area", "")
+            if area_name not in area_codes:
+                area_codes[area_name] = len(areas)
+                areas.append(area_name)
+            area.append(area_codes[area_name])
+            potencia.append(appliance["potencia"])
+            horas.append(appliance["horas"])
+            quantidade.append(appliance["quantidade"])
+    return ApplianceColumns(
+        usernames,
+        np.array(household, dtype=np.int64),
+        np.array(nome, dtype=np.int64), names,
+        np.array(area, dtype=np.int64), areas,
+        np.array(potencia, dtype=np.float64),
+        np.array(horas, dtype=np.float64),
+        np.array(quantidade, dtype=np.float64),
+    )
+
+
+def consumption_from_columns(columns):
+    return calculate_consumption_batch(
+        columns.potencia, columns.horas, columns.quantidade,
+        columns.household, columns.area, nome=columns.nome,
+        n_households=len(columns.usernames), n_areas=len(columns.areas),
+        n_names=len(columns.names),
+    )
+
+
+def recompute_all(store):
+    """Consumo mensal de todos os usuários do store, como {usuário: kWh}."""
+    columns = columns_from_records(store.iter_records())
+    totals = consumption_from_columns(columns).totals
+    return dict(zip(columns.usernames, totals.tolist()))
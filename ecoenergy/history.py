@@ -0,0 +1,172 @@
+"""Histórico de consumo como série temporal, no mesmo banco dos usuários.
+
+Cada ponto (usuário, instante, kWh) é uma linha de uma tabela agrupada por
+usuário e instante, então gravar um ponto novo não reescreve os anteriores e
+uma consulta por intervalo lê só as linhas pedidas. Os totais mensais e
+anuais são mantidos a cada gravação, na mesma transação, e os gráficos usam
+essas agregações em vez de percorrer a série inteira.
+
+Os pontos são estimativas de consumo mensal: a agregação do mês guarda a
+soma e a quantidade de pontos (média = soma / quantidade) e a do ano soma as
+médias de cada mês.
+"""
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+MONTH = "mes"
+YEAR = "ano"
+
+
+def month_bucket(ts):
+    moment = datetime.fromtimestamp(ts, timezone.utc)
+    return moment.year * 12 + moment.month - 1
+
+
+def month_start(bucket):
+    moment = datetime(bucket // 12, bucket % 12 + 1, 1, tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def downsample(x, values, max_points):
+    """Média por blocos consecutivos, para no máximo max_points pontos."""
+    x = np.asarray(x)
+    values = np.asarray(values, dtype=np.float64)
+    if len(values) <= max_points:
+        return x, values
+    edges = np.linspace(0, len(values), max_points + 1).astype(np.int64)
+    sums = np.add.reduceat(values, edges[:-1])
+    return x[edges[:-1]], sums / np.diff(edges)
+
+
+class HistoryStore:
+    def __init__(self, store):
+        self.store = store
+        with store.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history ("
+                " username TEXT NOT NULL,"
+                " ts INTEGER NOT NULL,"
+                " consumo REAL NOT NULL,"
+                " PRIMARY KEY (username, ts)"
+                ") WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS history_rollup ("
+                " username TEXT NOT NULL,"
+                " period TEXT NOT NULL,"
+                " bucket INTEGER NOT NULL,"
+                " total REAL NOT NULL,"
+                " count INTEGER NOT NULL,"
+                " PRIMARY KEY (username, period, bucket)"
+                ") WITHOUT ROWID"
+            )
+
+    def _rollup_row(self, conn, username, period, bucket):
+        row = conn.execute(
+            "SELECT total, count FROM history_rollup"
+            " WHERE username = ? AND period = ? AND bucket = ?",
+            (username, period, bucket)).fetchone()
+        return row or (0.0, 0)
+
+    def _set_rollup(self, conn, username, period, bucket, total, count):
+        conn.execute(
+            "INSERT OR REPLACE INTO history_rollup (username, period, bucket, total, count)"
+            " VALUES (?, ?, ?, ?, ?)",
+            (username, period, bucket, total, count))
+
+    def record(self, username, consumo, ts=None):
+        """Grava (ou substitui) o ponto do instante ts; devolve o instante usado."""
+        ts = int(time.time()) if ts is None else int(ts)
+        month = month_bucket(ts)
+        with self.store.transaction() as conn:
+            old = conn.execute(
+                "SELECT consumo FROM history WHERE username = ? AND ts = ?",
+                (username, ts)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO history (username, ts, consumo) VALUES (?, ?, ?)",
+                (username, ts, consumo))
+
+            month_total, month_count = self._rollup_row(conn, username, MONTH, month)
+            old_mean = month_total / month_count if month_count else 0.0
+            if old is None:
+                month_total, month_count = month_total + consumo, month_count + 1
+            else:
+                month_total += consumo - old[0]
+            self._set_rollup(conn, username, MONTH, month, month_total, month_count)
+
+            year_total, year_count = self._rollup_row(conn, username, YEAR, month // 12)
+            if month_count == 1 and old is None:
+                year_count += 1
+            self._set_rollup(conn, username, YEAR, month // 12,
+                             year_total + month_total / month_count - old_mean, year_count)
+        return ts
+
+    def count(self, username):
+        return self.store.connection().execute(
+            "SELECT COUNT(*) FROM history WHERE username = ?", (username,)).fetchone()[0]
+
+    def range(self, username, start=None, end=None):
+        """Instantes e valores com start <= ts < end, como arrays NumPy."""
+        start = -2 ** 63 if start is None else int(start)
+        end = 2 ** 63 - 1 if end is None else int(end)
+        rows = self.store.connection().execute(
+            "SELECT ts, consumo FROM history"
+            " WHERE username = ? AND ts >= ? AND ts < ? ORDER BY ts",
+            (username, start, end)).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        ts, values = zip(*rows)
+        return np.array(ts, dtype=np.int64), np.array(values, dtype=np.float64)
+
+    def rollup(self, username, period=MONTH):
+        """Buckets (mês ou ano) e o consumo de cada um, em ordem."""
+        rows = self.store.connection().execute(
+            "SELECT bucket, total, count FROM history_rollup"
+            " WHERE username = ? AND period = ? AND count > 0 ORDER BY bucket",
+            (username, period)).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        buckets, totals, counts = (np.array(column) for column in zip(*rows))
+        if period == MONTH:
+            return buckets, totals / counts
+        return buckets, totals.astype(np.float64)
+
+    def chart_series(self, username, max_points=120):
+        """Pares [data ISO, kWh] prontos para o gráfico, com no máximo max_points pontos.
+
+        Séries curtas vão inteiras; as longas usam a agregação mensal e, se
+        ainda forem grandes demais, são reduzidas por médias em blocos.
+        """
+        if self.count(username) <= max_points:
+            ts, values = self.range(username)
+        else:
+            buckets, values = self.rollup(username, MONTH)
+            buckets, values = downsample(buckets, values, max_points)
+            ts = [month_start(bucket) for bucket in buckets.tolist()]
+        labels = [datetime.fromtimestamp(t, timezone.utc).isoformat() for t in np.asarray(ts).tolist()]
+        return [[label, value] for label, value in zip(labels, np.asarray(values).tolist())]
+
+    def migrate_legacy(self, username, record):
+        """Move a lista "historico" do registro para a série temporal.
+
+        Os pontos antigos não têm data: o último vira o mês atual e os
+        anteriores, um por mês, voltando no tempo. Devolve True se o
+        registro foi alterado (e precisa ser gravado).
+        """
+        legacy = record.pop("historico", None)
+        if legacy is None:
+            return False
+        current = month_bucket(time.time())
+        with self.store.transaction():
+            for i, entry in enumerate(legacy):
+                self.record(username, entry["consumo"],
+                            ts=month_start(current - (len(legacy) - 1 - i)))
+        return True
+
+    def clear(self, username):
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM history WHERE username = ?", (username,))
+            conn.execute("DELETE FROM history_rollup WHERE username = ?", (username,))
@@ -0,0 +1,182 @@
+"""Fila de geração de relatórios em segundo plano.
+
+submit() devolve imediatamente o id de um job, executado por um pool local
+de threads; a página consulta status() até o PDF ficar pronto. Os PDFs
+prontos ficam num cache endereçado pelo conteúdo (hash SHA-256 do usuário e
+dos dados do relatório), gravado em disco: um usuário cujos aparelhos não
+mudaram recebe o relatório anterior na hora. Cada aparelho alterado gera um
+relatório novo, então o cache tem limite de tamanho e de idade: a cada PDF
+gravado saem os expirados e, se preciso, os usados há mais tempo.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ecoenergy.reports import generate_pdf_report
+
+
+DEFAULT_CACHE_DIR = "report_cache"
+DEFAULT_MAX_BYTES = 200 * 2**20
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+PENDING = "pendente"
+RUNNING = "executando"
+DONE = "concluido"
+FAILED = "erro"
+
+
+def report_key(username, total_consumption, appliance_consumption):
+    payload = json.dumps([username, total_consumption, appliance_consumption],
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """PDFs prontos em disco, um arquivo por hash de conteúdo.
+
+    Guarda no máximo max_bytes de PDFs, nenhum sem uso há mais de max_age
+    segundos; a data de modificação do arquivo marca o último uso.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                pdf = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return pdf
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, pdf):
+        # grava num arquivo temporário e renomeia: leitores nunca veem um PDF pela metade
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as file:
+            file.write(pdf)
+        os.replace(tmp_path, self._path(key))
+        # o PDF recém-gravado fica, mesmo que sozinho passe do limite
+        self.prune(keep=self._path(key))
+
+    def prune(self, now=None, keep=None):
+        """Apaga os PDFs expirados e os menos usados além do limite; devolve quantos."""
+        now = time.time() if now is None else now
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort(reverse=True)
+        removed = 0
+        total = 0
+        for mtime, size, path in entries:
+            total += size
+            if path != keep and (total > self.max_bytes or now - mtime > self.max_age):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+
+class ReportJobQueue:
+    """Executa relatórios em segundo plano e guarda o estado de cada job."""
+
+    def __init__(self, cache=None, max_workers=2, chart_executor=None, max_jobs=1000):
+        self.cache = cache if cache is not None else ReportCache()
+        self.chart_executor = chart_executor
+        self.max_jobs = max_jobs
+        self._workers = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="relatorio")
+        self._jobs = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, username, total_consumption, appliance_consumption):
+        """Agenda o relatório e devolve o id do job.
+
+        Se o mesmo conteúdo já estiver no cache, o job nasce concluído; se já
+        estiver sendo gerado, devolve o job existente.
+        """
+        key = report_key(username, total_consumption, appliance_consumption)
+        with self._lock:
+            if key in self._in_flight:
+                return self._in_flight[key]
+            job_id = uuid.uuid4().hex
+            cached = key in self.cache
+            self._jobs[job_id] = {
+                "id": job_id,
+                "key": key,
+                "state": DONE if cached else PENDING,
+                "progress": 1.0 if cached else 0.0,
+                "error": None,
+            }
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+            if cached:
+                return job_id
+            self._in_flight[key] = job_id
+        self._workers.submit(self._run, job_id, key, username, total_consumption,
+                             appliance_consumption)
+        return job_id
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(self, job_id, key, username, total_consumption, appliance_consumption):
+        self._update(job_id, state=RUNNING)
+        try:
+            pdf = generate_pdf_report(
+                username, total_consumption, appliance_consumption,
+                executor=self.chart_executor,
+                # o último passo (montar o PDF) fica fora da barra de progresso
+                progress=lambda fraction: self._update(job_id, progress=0.95 * fraction),
+            )
+            self.cache.put(key, pdf)
+        except Exception as error:
+            self._update(job_id, state=FAILED, error=str(error))
+        else:
+            self._update(job_id, state=DONE, progress=1.0)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def status(self, job_id):
+        """Cópia do estado do job (ou None se o id for desconhecido)."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def result(self, job_id):
+        """Bytes do PDF de um job concluído; None caso contrário."""
+        job = self.status(job_id)
+        if job is None or job["state"] != DONE:
+            return None
+        return self.cache.get(job["key"])
+
+    def shutdown(self, wait=True):
+        self._workers.shutdown(wait=wait)
@@ -0,0 +1,304 @@
+"""Leituras do medidor inteligente (intervalos de 15 minutos) e conciliação com a estimativa.
+
+O arquivo CSV exportado pelo medidor tem uma linha por intervalo, com o
+início do intervalo ("inicio", data e hora ISO 8601 ou segundos desde 1970)
+e a energia medida ("kwh"); arquivos com vários clientes trazem também a
+coluna "usuario". O arquivo é lido em blocos de linhas, então a memória não
+depende do tamanho do arquivo: de cada bloco ficam só os totais por mês e
+por hora do dia (dias úteis e fins de semana) de cada usuário.
+
+Os meses já encerrados vão para o histórico (HistoryStore) enquanto o
+arquivo é lido, um ponto por mês com o consumo do mês completo (meses com
+dados faltando são extrapolados pela cobertura). reconcile() compara o
+perfil horário medido com os perfis simulados dos aparelhos cadastrados e
+estima, por mínimos quadrados, um fator de escala por aparelho: fatores
+longe de 1 indicam potência ou horas de uso mal informadas.
+
+    python -m ecoenergy.metering medidor.csv --usuario ana
+"""
+import argparse
+import time
+from calendar import monthrange
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from ecoenergy.consumption import calculate_consumption
+from ecoenergy.history import HistoryStore, month_start
+from ecoenergy.simulation import ScheduleBank, daily_profiles, default_schedule
+from ecoenergy.storage import DEFAULT_DB_PATH, UserStore
+from ecoenergy.tariffs import WEEKDAY, WEEKEND
+
+
+TIME_COLUMN = "inicio"
+VALUE_COLUMN = "kwh"
+USER_COLUMN = "usuario"
+INTERVAL_MINUTES = 15
+DEFAULT_CHUNK_ROWS = 1_000_000
+# fator de escala a partir do qual o aparelho é apontado como divergente
+DEFAULT_TOLERANCE = 0.5
+# dias úteis e fins de semana por semana, para o consumo médio de um dia
+DAY_WEIGHTS = np.array([5 / 7, 2 / 7])
+
+Reconciliation = namedtuple("Reconciliation", [
+    "measured_kwh",      # consumo mensal medido (30 dias)
+    "estimated_kwh",     # consumo mensal estimado pelos aparelhos (calculate_consumption)
+    "unexplained_kwh",   # parte do consumo medido que os aparelhos ajustados não explicam
+    "factors",           # nome -> fator de escala ajustado
+    "flagged",           # [(nome, fator)] dos aparelhos divergentes (ver suggested_hours)
+])
+
+
+class MeterSummary:
+    """Totais das leituras de um usuário: por mês e por hora do dia e tipo de dia."""
+
+    def __init__(self, username):
+        self.username = username
+        self.months = {}                   # bucket -> [kWh, intervalos]
+        self.hourly_kwh = np.zeros((2, 24))
+        self.hourly_intervals = np.zeros((2, 24))
+        self.rows = 0
+
+    def daily_profile(self):
+        """kWh médio de cada hora de um dia útil e de um fim de semana, shape (2, 24)."""
+        # cada hora observada em N dias soma N x (60 / intervalo) leituras
+        days = self.hourly_intervals * INTERVAL_MINUTES / 60
+        return np.divide(self.hourly_kwh, days, out=np.zeros((2, 24)), where=days > 0)
+
+    def monthly_kwh(self):
+        """Consumo de 30 dias pelo perfil medido, comparável a calculate_consumption."""
+        return float(DAY_WEIGHTS @ self.daily_profile().sum(axis=1) * 30)
+
+    def month_total(self, bucket):
+        """Consumo do mês, extrapolado para o mês inteiro se faltarem leituras."""
+        kwh, intervals = self.months[bucket]
+        year, month = divmod(bucket, 12)
+        expected = monthrange(year, month + 1)[1] * 24 * 60 / INTERVAL_MINUTES
+        return kwh * expected / intervals if intervals < expected else kwh
+
+
+def _parse_times(column):
+    """Segundos desde 1970 (no horário local do medidor) de cada leitura."""
+    if column.isna().any():
+        raise ValueError(f"há leituras sem data e hora na coluna '{TIME_COLUMN}'")
+    if pd.api.types.is_numeric_dtype(column):
+        return column.to_numpy(dtype=np.int64)
+    try:
+        parsed = pd.to_datetime(column, format="ISO8601", errors="coerce")
+    except (ValueError, TypeError):
+        # p.ex. fusos horários diferentes no mesmo bloco
+        raise ValueError(f"datas e horas inconsistentes na coluna '{TIME_COLUMN}'") from None
+    invalid = parsed.isna()
+    if invalid.any():
+        raise ValueError(f"data e hora inválida na coluna '{TIME_COLUMN}': {column[invalid].iloc[0]!r}")
+    if parsed.dt.tz is not None:
+        # horário de parede do medidor: o fuso só importa para a hora do dia
+        parsed = parsed.dt.tz_localize(None)
+    return parsed.to_numpy(dtype="datetime64[s]").astype(np.int64)
+
+
+def _accumulate(summaries, users, codes, seconds, kwh):
+    """Soma um bloco de leituras nos resumos; devolve o primeiro mês de cada usuário no bloco."""
+    n_users = len(users)
+    days = seconds // 86400
+    hours = (seconds // 3600) % 24
+    # 01/01/1970 foi uma quinta-feira (weekday 3)
+    day_types = np.where((days + 3) % 7 >= 5, WEEKEND, WEEKDAY)
+    months = seconds.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+    slots = (codes * 2 + day_types) * 24 + hours
+    kwh_by_slot = np.bincount(slots, weights=kwh, minlength=n_users * 48).reshape(n_users, 2, 24)
+    count_by_slot = np.bincount(slots, minlength=n_users * 48).reshape(n_users, 2, 24)
+
+    first_month = {}
+    pairs, inverse = np.unique(np.column_stack([codes, months]), axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    pair_kwh = np.bincount(inverse, weights=kwh, minlength=len(pairs))
+    pair_count = np.bincount(inverse, minlength=len(pairs))
+    for (code, month), total, count in zip(pairs.tolist(), pair_kwh.tolist(), pair_count.tolist()):
+        summary = summaries[users[code]]
+        entry = summary.months.setdefault(month, [0.0, 0])
+        entry[0] += total
+        entry[1] += count
+        summary.rows += count
+        first_month[users[code]] = min(first_month.get(users[code], month), month)
+    for code, username in enumerate(users):
+        summaries[username].hourly_kwh += kwh_by_slot[code]
+        summaries[username].hourly_intervals += count_by_slot[code]
+    return first_month
+
+
+def _read_chunks(source, chunk_rows):
+    """Blocos do CSV; arquivos vazios, ilegíveis ou sem as colunas viram ValueError."""
+    try:
+        reader = pd.read_csv(source, chunksize=chunk_rows, dtype={VALUE_COLUMN: np.float64})
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                return
+            except (pd.errors.ParserError, UnicodeDecodeError):
+                raise
+            except ValueError as error:
+                # a coluna kwh é lida como número já na leitura do bloco
+                raise ValueError(f"valor não numérico na coluna '{VALUE_COLUMN}': {error}") from None
+            missing = [column for column in (TIME_COLUMN, VALUE_COLUMN) if column not in chunk.columns]
+            if missing:
+                raise ValueError(f"o arquivo não tem a(s) coluna(s) {', '.join(map(repr, missing))}")
+            yield chunk
+    except pd.errors.EmptyDataError:
+        raise ValueError("o arquivo do medidor está vazio") from None
+    except pd.errors.ParserError as error:
+        raise ValueError(f"o arquivo do medidor não é um CSV válido: {error}") from None
+    except UnicodeDecodeError:
+        raise ValueError("o arquivo do medidor não é um CSV em UTF-8") from None
+
+
+def ingest(source, history=None, username=None, chunk_rows=DEFAULT_CHUNK_ROWS, progress=None):
+    """Lê o CSV do medidor (caminho ou arquivo aberto) e devolve {usuário: MeterSummary}.
+
+    Com username, todas as leituras são desse usuário (a coluna "usuario",
+    se houver, é ignorada); sem ele, o arquivo precisa da coluna. Com history,
+    o consumo de cada mês encerrado é gravado no histórico durante a leitura.
+    progress, se informado, recebe o número de linhas lidas até o momento.
+    Arquivos vazios, sem as colunas inicio e kwh ou com valores ilegíveis
+    levantam ValueError com a descrição do problema.
+    """
+    summaries = {}
+    written = {}        # usuário -> {mês: leituras do mês já gravadas no histórico}
+    rows = 0
+    for chunk in _read_chunks(source, chunk_rows):
+        if username is not None:
+            codes, users = np.zeros(len(chunk), dtype=np.int64), [username]
+        elif USER_COLUMN in chunk.columns:
+            codes, users = pd.factorize(chunk[USER_COLUMN].astype(str))
+            users = list(users)
+        else:
+            raise ValueError("o arquivo não tem a coluna 'usuario'; informe o usuário")
+        for name in users:
+            summaries.setdefault(name, MeterSummary(name))
+        valid = chunk[VALUE_COLUMN].notna().to_numpy()
+        first_month = _accumulate(summaries, users, np.asarray(codes, dtype=np.int64)[valid],
+                                  _parse_times(chunk[TIME_COLUMN])[valid],
+                                  chunk[VALUE_COLUMN].to_numpy()[valid])
+        if history is not None:
+            # meses anteriores ao primeiro mês do bloco não recebem mais leituras
+            _write_months(history, summaries, written, first_month)
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows)
+    if not rows:
+        raise ValueError("o arquivo do medidor não tem leituras")
+    if history is not None:
+        _write_months(history, summaries, written, {name: None for name in summaries})
+    return summaries
+
+
+def _write_months(history, summaries, written, before):
+    with history.store.transaction():
+        for name, limit in before.items():
+            summary = summaries[name]
+            done = written.setdefault(name, {})
+            for bucket, (_, intervals) in sorted(summary.months.items()):
+                if done.get(bucket) == intervals or (limit is not None and bucket >= limit):
+                    continue
+                # num arquivo fora de ordem o mês pode voltar a receber leituras:
+                # o ponto do mês é regravado com o novo total
+                history.record(name, summary.month_total(bucket), ts=month_start(bucket))
+                done[bucket] = intervals
+
+
+def appliance_profiles(appliances):
+    """Nomes dos aparelhos e o perfil diário simulado de cada nome (kWh por hora), shape (n, 2, 24)."""
+    bank = ScheduleBank()
+    names, codes = [], {}
+    household, kw, horas, weekday_code, weekend_code = [], [], [], [], []
+    for appliance in appliances:
+        name = appliance["nome"]
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+        schedule = appliance.get("horario") or default_schedule(name)
+        household.append(codes[name])
+        kw.append(appliance["potencia"] * appliance["quantidade"] / 1000)
+        horas.append(min(appliance["horas"], 24))
+        weekday_code.append(bank.code(schedule))
+        weekend_code.append(bank.code(appliance.get("horario_fds") or schedule))
+    profiles = daily_profiles(
+        np.array(household, dtype=np.int64), kw, np.array(horas, dtype=np.float64),
+        np.array(weekday_code, dtype=np.int64), np.array(weekend_code, dtype=np.int64),
+        bank, len(names))
+    return names, profiles
+
+
+def reconcile(summary, appliances, tolerance=DEFAULT_TOLERANCE, ridge=1e-2):
+    """Compara as leituras com os aparelhos cadastrados.
+
+    Ajusta fatores s >= 0 tais que a soma dos perfis simulados x s se
+    aproxime do perfil medido (mínimos quadrados com regularização ridge em
+    direção a 1, pois há mais aparelhos do que horas em muitos casos).
+    """
+    estimated, _ = calculate_consumption(appliances)
+    measured = summary.monthly_kwh()
+    names, profiles = appliance_profiles(appliances)
+    if not names:
+        return Reconciliation(measured, estimated, measured, {}, [])
+    # cada hora pesa pela frequência do tipo de dia
+    weights = np.sqrt(np.repeat(DAY_WEIGHTS, 24))
+    design = profiles.reshape(len(names), 48).T * weights[:, None]
+    target = summary.daily_profile().reshape(48) * weights
+    gram = design.T @ design
+    penalty = ridge * max(np.trace(gram) / len(names), 1e-12)
+    factors = np.linalg.solve(gram + penalty * np.eye(len(names)),
+                              design.T @ target + penalty * np.ones(len(names)))
+    factors = np.clip(factors, 0.0, None)
+    fitted = DAY_WEIGHTS @ (profiles * factors[:, None, None]).sum(axis=(0, 2)) * 30
+
+    flagged = [(name, factor) for name, factor in zip(names, factors.tolist())
+               if abs(factor - 1) > tolerance]
+    flagged.sort(key=lambda item: abs(item[1] - 1), reverse=True)
+    return Reconciliation(measured, estimated, max(float(measured - fitted), 0.0),
+                          dict(zip(names, factors.tolist())), flagged)
+
+
+def suggested_hours(appliance, factor):
+    """Horas de uso do aparelho escaladas pelo fator do seu nome (no máximo 24 por dia).
+
+    O fator vale para todos os aparelhos de mesmo nome, mas cada um mantém
+    a proporção das próprias horas.
+    """
+    return min(24.0, appliance["horas"] * factor)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa leituras do medidor para o histórico.")
+    parser.add_argument("arquivo")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--usuario", help="usuário de todas as leituras (ignora a coluna usuario)")
+    parser.add_argument("--linhas-por-bloco", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    store = UserStore(args.db)
+    start = time.perf_counter()
+    summaries = ingest(args.arquivo, HistoryStore(store), args.usuario, args.linhas_por_bloco)
+    elapsed = time.perf_counter() - start
+    rows = sum(summary.rows for summary in summaries.values())
+    print(f"{rows} leituras de {len(summaries)} usuários em {elapsed:.1f} s ({rows / elapsed:.0f} linhas/s)")
+    for username, summary in summaries.items():
+        record = store.get(username)
+        if record is None:
+            print(f"{username}: usuário não cadastrado; leituras gravadas só no histórico")
+            continue
+        result = reconcile(summary, record.get("aparelhos", []))
+        print(f"{username}: medido {result.measured_kwh:.1f} kWh/mês, "
+              f"estimado {result.estimated_kwh:.1f} kWh/mês, "
+              f"não explicado {result.unexplained_kwh:.1f} kWh/mês")
+        for name, factor in result.flagged:
+            hours = ", ".join(f"{suggested_hours(appliance, factor):.1f}"
+                              for appliance in record.get("aparelhos", []) if appliance["nome"] == name)
+            print(f"  {name}: fator {factor:.2f} (horas sugeridas: {hours})")
+
+
+if __name__ == "__main__":
+    main()
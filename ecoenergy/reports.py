@@ -0,0 +1,179 @@
+"""Relatórios de consumo em PDF gerados inteiramente em memória.
+
+Os gráficos de cada página são renderizados em buffers PNG (em paralelo,
+num pool de processos, quando há mais de uma página) e embutidos no PDF, que
+é devolvido como bytes. O modo em lote gera os relatórios de muitos usuários
+para um diretório ou arquivo .zip:
+
+    python -m ecoenergy.reports --db user_data.db --out relatorios.zip
+"""
+import argparse
+import multiprocessing
+import os
+import re
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from itertools import islice
+
+from fpdf import FPDF
+
+from ecoenergy import charts
+from ecoenergy.consumption import calculate_consumption
+from ecoenergy.storage import DEFAULT_DB_PATH, UserStore
+
+
+MAX_ITEMS_PER_PAGE = 10
+CHART_DPI = 100
+# registros por tarefa do lote e tarefas em andamento por processo
+BATCH_CHUNK = 16
+BATCH_WINDOW = 2
+
+
+def chart_pool(max_workers=None):
+    """Pool de processos para renderizar gráficos (o matplotlib segura o GIL)."""
+    return ProcessPoolExecutor(max_workers=max_workers,
+                               mp_context=multiprocessing.get_context("spawn"))
+
+
+def _chart_pages(appliance_consumption):
+    appliance_list = [[name, value] for name, value in appliance_consumption.items()]
+    return [appliance_list[i:i + MAX_ITEMS_PER_PAGE]
+            for i in range(0, len(appliance_list), MAX_ITEMS_PER_PAGE)]
+
+
+def _render_page(page):
+    return charts.render("barras", page, dpi=CHART_DPI)
+
+
+def render_chart_pages(appliance_consumption, executor=None, progress=None):
+    """PNG do gráfico de barras de cada página, na ordem das páginas.
+
+    progress, se informado, é chamado com a fração de páginas já prontas.
+    """
+    pages = _chart_pages(appliance_consumption)
+    if executor is None or len(pages) < 2:
+        images = (_render_page(page) for page in pages)
+    else:
+        images = executor.map(_render_page, pages)
+    rendered = []
+    for image in images:
+        rendered.append(image)
+        if progress is not None:
+            progress(len(rendered) / len(pages))
+    return rendered
+
+
+def generate_pdf_report(username, total_consumption, appliance_consumption, executor=None,
+                        progress=None):
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Helvetica", size=12)
+    pdf.cell(200, 10, text=f"Relatório de Consumo de Energia - {username}",
+             new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.cell(200, 10, text=f"Consumo Mensal Total: {total_consumption:.2f} kWh",
+             new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(200, 10, text="Consumo por Aparelho:", new_x="LMARGIN", new_y="NEXT")
+
+    for appliance, consumption in appliance_consumption.items():
+        pdf.cell(200, 10, text=f"{appliance}: {consumption:.2f} kWh",
+                 new_x="LMARGIN", new_y="NEXT")
+
+    for image in render_chart_pages(appliance_consumption, executor, progress):
+        pdf.add_page()
+        pdf.set_font("Helvetica", 'B', size=12)
+        pdf.cell(200, 10, text="Gráfico de Consumo por Aparelho",
+                 new_x="LMARGIN", new_y="NEXT", align='C')
+        pdf.ln(10)
+        pdf.image(BytesIO(image), x=10, w=180)
+
+    return bytes(pdf.output())
+
+
+def report_filename(username):
+    return re.sub(r"[^\w.-]", "_", username) + "_relatorio.pdf"
+
+
+def _report_for_record(item):
+    username, record = item
+    total_consumption, appliance_consumption = calculate_consumption(record.get("aparelhos", []))
+    return report_filename(username), generate_pdf_report(username, total_consumption, appliance_consumption)
+
+
+def _reports_for_chunk(items):
+    return [_report_for_record(item) for item in items]
+
+
+def _bounded_map(pool, function, iterable, in_flight):
+    """pool.map em ordem, lendo do iterável só à medida que as tarefas terminam.
+
+    Executor.map consome o iterável inteiro antes do primeiro resultado; aqui
+    ficam no máximo in_flight tarefas (e seus resultados) em memória.
+    """
+    iterator = iter(iterable)
+    pending = deque(pool.submit(function, item) for item in islice(iterator, in_flight))
+    while pending:
+        result = pending.popleft().result()
+        for item in islice(iterator, 1):
+            pending.append(pool.submit(function, item))
+        yield result
+
+
+def generate_reports_batch(records, output, max_workers=None):
+    """Gera o relatório de cada par (usuário, registro) em output.
+
+    output é um diretório ou um caminho terminado em .zip. Cada processo do
+    pool gera relatórios completos. Os registros são lidos em blocos de
+    BATCH_CHUNK à medida que os processos ficam livres, então um iterável
+    como UserStore.iter_records() não é carregado inteiro na memória.
+    Devolve estatísticas de vazão.
+    """
+    start = time.perf_counter()
+    count = 0
+    total_bytes = 0
+    to_zip = output.endswith(".zip")
+    archive = zipfile.ZipFile(output, "w", zipfile.ZIP_STORED) if to_zip else None
+    if not to_zip:
+        os.makedirs(output, exist_ok=True)
+    try:
+        workers = max_workers or os.cpu_count() or 1
+        records = iter(records)
+        chunks = iter(lambda: list(islice(records, BATCH_CHUNK)), [])
+        with chart_pool(workers) as pool:
+            for reports in _bounded_map(pool, _reports_for_chunk, chunks, BATCH_WINDOW * workers):
+                for filename, pdf in reports:
+                    if archive is not None:
+                        archive.writestr(filename, pdf)
+                    else:
+                        with open(os.path.join(output, filename), "wb") as file:
+                            file.write(pdf)
+                    count += 1
+                    total_bytes += len(pdf)
+    finally:
+        if archive is not None:
+            archive.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "reports": count,
+        "bytes": total_bytes,
+        "seconds": elapsed,
+        "reports_per_second": count / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera relatórios em PDF de todos os usuários.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    parser.add_argument("--out", default="relatorios")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    stats = generate_reports_batch(UserStore(args.db).iter_records(), args.out, args.workers)
+    print(f"{stats['reports']} relatórios em {stats['seconds']:.1f} s "
+          f"({stats['reports_per_second']:.1f} relatórios/s, {stats['bytes'] / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""Recomendações de economia a partir dos aparelhos cadastrados e da tarifa do estado.
+
+As ações avaliadas são trocar lâmpadas incandescentes, halógenas e
+fluorescentes por LED, reduzir o tempo de uso do chuveiro elétrico,
+substituir o ar-condicionado por um modelo inverter e instalar painéis
+solares. Cada ação é calculada para todos os aparelhos de uma vez, em
+colunas: o tipo de ação é decidido uma única vez por nome distinto, a
+economia em kWh e o investimento de cada linha saem de operações vetoriais
+e as linhas com a mesma ação e o mesmo nome viram uma única recomendação
+("trocar 12 lâmpadas incandescentes"). Ações com economia desprezível são
+descartadas antes de precificar.
+
+A economia em R$ de cada ação é a diferença entre a conta atual e a conta
+sem os kWh economizados (com faixas e bandeira), e o retorno é o
+investimento dividido pela economia mensal.
+
+O plano com orçamento escolhe a combinação de ações sem percorrer os 2^n
+subconjuntos. As ações nos aparelhos não interferem umas nas outras (cada
+uma altera linhas diferentes) e a conta cresce com o consumo, então a
+combinação que mais economiza em R$ é a que mais economiza em kWh: um
+problema da mochila, resolvido por programação dinâmica sobre o orçamento,
+vetorizada por ação. Antes disso as ações sem custo entram direto, as que
+não cabem no orçamento saem, e se todas couberem não há o que escolher. Os
+painéis solares dependem do consumo que sobra, então são dimensionados por
+último, sobre o consumo já reduzido e com o orçamento restante.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+from types import MappingProxyType
+
+import numpy as np
+
+from ecoenergy.consumption import monthly_consumption
+from ecoenergy.solar import DEFAULT_PARAMS as DEFAULT_SOLAR_PARAMS, monthly_yield, optimal, sweep
+from ecoenergy.tariffs import load_tariffs, price_monthly
+
+
+LED = "led"
+SHOWER = "banho"
+INVERTER = "inversor"
+SOLAR = "solar"
+KINDS = (LED, SHOWER, INVERTER)
+
+# quantidades de painéis avaliadas de uma vez no dimensionamento
+MAX_SOLAR_SCENARIOS = 64
+# ações x valores de orçamento na programação dinâmica do plano
+MAX_KNAPSACK_CELLS = 20_000_000
+
+BY_PAYBACK = "retorno"
+BY_MONEY = "reais"
+BY_KWH = "kwh"
+
+SavingsParams = namedtuple("SavingsParams", [
+    "led_ratio",            # potência da LED equivalente / potência atual, por tipo de lâmpada
+    "led_cost",             # preço de uma lâmpada LED (R$)
+    "shower_cut",           # fração do tempo de banho a reduzir
+    "inverter_saving",      # economia do inverter sobre o ar-condicionado comum
+    "inverter_cost",        # preço de um ar-condicionado inverter instalado (R$)
+    "solar_cost_per_kwp",   # custo de instalação dos painéis (R$ por kWp)
+    "min_kwh",              # economia mensal mínima para uma ação ser recomendada
+])
+
+DEFAULT_PARAMS = SavingsParams(
+    led_ratio=MappingProxyType({"incandescente": 0.15, "halogena": 0.2, "fluorescente": 0.6}),
+    led_cost=15.0, shower_cut=0.25, inverter_saving=0.4, inverter_cost=2800.0,
+    solar_cost_per_kwp=4500.0, min_kwh=0.5,
+)
+
+Recommendation = namedtuple("Recommendation", [
+    "kind",             # LED, SHOWER, INVERTER ou SOLAR
+    "name",             # nome do aparelho ("" para os painéis solares)
+    "description",
+    "kwh",              # kWh economizados por mês
+    "money",            # R$ economizados por mês
+    "cost",             # investimento (R$)
+    "payback_months",   # meses para recuperar o investimento (0 sem investimento)
+    "units",            # aparelhos (ou painéis) envolvidos
+])
+
+Plan = namedtuple("Plan", "actions kwh money cost payback_months")
+
+_WORD = re.compile(r"\w+")
+
+
+def _name_words(names):
+    """Palavras (minúsculas, sem acentos) de cada nome, normalizando todos de uma vez."""
+    text = "\n".join(name.replace("\n", " ") for name in names)
+    # as ações só procuram palavras em ASCII: descartar os acentos decompostos basta
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode().casefold()
+    return [set(_WORD.findall(line)) for line in text.split("\n")] if names else []
+
+
+def _classify(words, params):
+    """Ação aplicável a um aparelho (pelas palavras do nome) e a razão de consumo depois dela."""
+    if "inverter" in words:
+        return None
+    if words & {"lampada", "lampadas"}:
+        for kind, ratio in params.led_ratio.items():
+            if kind in words:
+                return LED, ratio
+    if "chuveiro" in words:
+        return SHOWER, 1 - params.shower_cut
+    if {"ar", "condicionado"} <= words:
+        return INVERTER, 1 - params.inverter_saving
+    return None
+
+
+def _payback(cost, money):
+    cost, money = np.asarray(cost, dtype=np.float64), np.asarray(money, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cost <= 0, 0.0, np.where(money > 0, cost / money, np.inf))
+
+
+def _describe(kind, name, units, params):
+    count = f" ({units:g} unidades)" if units != 1 else ""
+    if kind == LED:
+        return f"Trocar {name} por LED{count}"
+    if kind == SHOWER:
+        return f"Reduzir em {params.shower_cut:.0%} o tempo de uso do {name}"
+    return f"Substituir {name} por modelo inverter{count}"
+
+
+def _columns(appliances):
+    """Código do nome, consumo mensal (kWh) e quantidade de cada aparelho."""
+    codes = {}
+    rows = np.array([codes.setdefault(appliance["nome"], len(codes)) for appliance in appliances],
+                    dtype=np.int64)
+    quantity = np.array([appliance["quantidade"] for appliance in appliances], dtype=np.float64)
+    kwh = monthly_consumption([appliance["potencia"] for appliance in appliances],
+                              np.array([appliance["horas"] for appliance in appliances], dtype=np.float64),
+                              quantity)
+    return list(codes), rows, kwh, quantity
+
+
+def appliance_actions(appliances, params=DEFAULT_PARAMS):
+    """Ações nos aparelhos, agrupadas por tipo e nome, sem preço.
+
+    Devolve (tipos, nomes, kWh economizados, investimento, unidades), um
+    elemento por ação.
+    """
+    return _actions(_columns(appliances), params)
+
+
+def _actions(columns, params):
+    names, rows, kwh, quantity = columns
+    # o tipo de ação é decidido uma vez por nome distinto, não por aparelho
+    kind_of_name = np.full(len(names), -1, dtype=np.int64)
+    ratio_of_name = np.ones(len(names))
+    for code, words in enumerate(_name_words(names)):
+        action = _classify(words, params)
+        if action is not None:
+            kind_of_name[code] = KINDS.index(action[0])
+            ratio_of_name[code] = action[1]
+    selected = np.flatnonzero(kind_of_name[rows] >= 0)
+    if not len(selected):
+        return [], [], np.empty(0), np.empty(0), np.empty(0)
+
+    name_codes = rows[selected]
+    quantity = quantity[selected]
+    saved = kwh[selected] * (1 - ratio_of_name[name_codes])
+    kinds = kind_of_name[name_codes]
+    unit_cost = np.array([params.led_cost, 0.0, params.inverter_cost])[kinds]
+
+    # uma ação por nome: o nome já determina o tipo
+    groups, inverse = np.unique(name_codes, return_inverse=True)
+    saved = np.bincount(inverse, weights=saved, minlength=len(groups))
+    cost = np.bincount(inverse, weights=unit_cost * quantity, minlength=len(groups))
+    units = np.bincount(inverse, weights=quantity, minlength=len(groups))
+    keep = saved >= params.min_kwh
+    groups = groups[keep]
+    return ([KINDS[kind] for kind in kind_of_name[groups].tolist()], [names[code] for code in groups.tolist()],
+            saved[keep], cost[keep], units[keep])
+
+
+def _bill(totals, state, flag, tier_set, table):
+    totals = np.asarray(totals, dtype=np.float64)
+    return price_monthly(totals, table.state_codes([state]), flag, tier_set, table)
+
+
+def solar_action(consumption, state, params=DEFAULT_PARAMS, solar_params=DEFAULT_SOLAR_PARAMS):
+    """Painéis solares com o maior valor presente líquido para o consumo, ou None."""
+    if consumption <= solar_params.minimum_kwh:
+        return None
+    # com painéis suficientes para cobrir até o mês de menor geração, mais painéis só geram
+    # créditos que nunca serão usados: nenhuma quantidade acima disso tem VPL maior
+    limit = int(np.ceil(consumption / monthly_yield(state, solar_params).min())) + 1
+    costs = [params.solar_cost_per_kwp]
+    step = max(1, limit // MAX_SOLAR_SCENARIOS)
+    result = sweep(consumption, state, np.arange(0, limit + 1, step), costs, solar_params)
+    best = int(result.panels[optimal(result)])
+    if step > 1:
+        # casas grandes: grade grossa primeiro, depois as quantidades vizinhas da melhor
+        result = sweep(consumption, state, np.arange(max(best - step, 0), min(best + step, limit) + 1),
+                       costs, solar_params)
+        best = int(result.panels[optimal(result)])
+    index = int(np.searchsorted(result.panels, best))
+    if best == 0 or result.npv[0, index] <= 0:
+        return None
+    kwh = min(result.first_year_generation[index], consumption - solar_params.minimum_kwh)
+    kwp = best * solar_params.panel_kwp
+    return Recommendation(SOLAR, "", f"Instalar {best} painéis solares ({kwp:.1f} kWp)", float(kwh),
+                          float(result.first_year_savings[index]), kwp * params.solar_cost_per_kwp,
+                          float(result.payback_months[0, index]), best)
+
+
+def _sort(recommendations, order):
+    if order == BY_MONEY:
+        return sorted(recommendations, key=lambda item: -item.money)
+    if order == BY_KWH:
+        return sorted(recommendations, key=lambda item: -item.kwh)
+    return sorted(recommendations, key=lambda item: (item.payback_months, -item.money))
+
+
+def rank_actions(appliances, state, flag="verde", tier_set="convencional", params=DEFAULT_PARAMS,
+                 order=BY_PAYBACK, solar=True, table=None):
+    """Recomendações para os aparelhos, cada uma avaliada sozinha sobre a conta atual."""
+    table = table or load_tariffs()
+    columns = _columns(appliances)
+    kinds, names, kwh, cost, units = _actions(columns, params)
+    total = float(columns[2].sum())
+    current = _bill([total], state, flag, tier_set, table)[0]
+    money = current - _bill(total - kwh, state, flag, tier_set, table)
+    payback = _payback(cost, money)
+    recommendations = [
+        Recommendation(kind, name, _describe(kind, name, count, params), saved, reais, invested, months, count)
+        for kind, name, saved, reais, invested, months, count in zip(
+            kinds, names, kwh.tolist(), money.tolist(), cost.tolist(), payback.tolist(), units.tolist())
+    ]
+    if solar:
+        panels = solar_action(total, state, params)
+        if panels is not None:
+            recommendations.append(panels)
+    return _sort(recommendations, order)
+
+
+def _select(cost, kwh, budget):
+    """Máscara das ações com o maior kWh economizado cujo investimento cabe no orçamento."""
+    chosen = cost <= 0
+    candidates = np.flatnonzero((cost > 0) & (cost <= budget))
+    if cost[candidates].sum() <= budget:
+        chosen[candidates] = True
+        return chosen
+    # orçamento em passos de step reais; os custos são arredondados para cima,
+    # então a escolha sempre cabe no orçamento de verdade
+    step = max(1.0, budget * len(candidates) / MAX_KNAPSACK_CELLS)
+    cells = int(budget // step)
+    weights = np.ceil(cost[candidates] / step).astype(np.int64)
+    best = np.zeros(cells + 1)          # maior kWh com até b passos de orçamento
+    take = np.zeros((len(candidates), cells + 1), dtype=bool)
+    for i, (weight, value) in enumerate(zip(weights.tolist(), kwh[candidates].tolist())):
+        if weight > cells:
+            continue
+        with_item = best[:cells + 1 - weight] + value
+        better = with_item > best[weight:]
+        take[i, weight:] = better
+        best[weight:] = np.where(better, with_item, best[weight:])
+    remaining = cells
+    for i in range(len(candidates) - 1, -1, -1):
+        if take[i, remaining]:
+            chosen[candidates[i]] = True
+            remaining -= weights[i]
+    return chosen
+
+
+def savings_plan(recommendations, consumption, state, flag="verde", tier_set="convencional",
+                 budget=None, params=DEFAULT_PARAMS, table=None):
+    """Ações que mais economizam dentro do orçamento (R$; None = sem limite).
+
+    As ações do plano vêm em ordem de retorno, e a economia de cada uma é a
+    marginal: a conta é precificada sobre o consumo acumulado depois de
+    cada ação. Os painéis solares, se recomendados, são redimensionados
+    para o consumo que sobra.
+    """
+    table = table or load_tariffs()
+    pool = [item for item in recommendations if item.kind != SOLAR and np.isfinite(item.payback_months)]
+    mask = _select(np.array([item.cost for item in pool], dtype=np.float64),
+                   np.array([item.kwh for item in pool], dtype=np.float64),
+                   np.inf if budget is None else budget)
+    chosen = _sort([item for item, selected in zip(pool, mask.tolist()) if selected], BY_PAYBACK)
+    remaining = (np.inf if budget is None else budget) - sum(item.cost for item in chosen)
+    cumulative = consumption - np.cumsum([item.kwh for item in chosen])
+    bills = _bill(np.concatenate([[consumption], cumulative]), state, flag, tier_set, table)
+    marginal = -np.diff(bills)
+    chosen = [item._replace(money=float(money), payback_months=float(_payback(item.cost, money)))
+              for item, money in zip(chosen, marginal)]
+    if any(item.kind == SOLAR for item in recommendations):
+        reduced = cumulative[-1] if chosen else consumption
+        panels = solar_action(reduced, state, params)
+        if panels is not None and panels.cost <= remaining:
+            chosen.append(panels)
+    kwh = sum(item.kwh for item in chosen)
+    money = sum(item.money for item in chosen)
+    cost = sum(item.cost for item in chosen)
+    return Plan(chosen, kwh, money, cost, float(_payback(cost, money)))
@@ -0,0 +1,246 @@
+"""Serviço HTTP assíncrono com os cálculos do EcoEnergy, sem o Streamlit.
+
+Os endpoints recebem lotes: uma requisição calcula o consumo ou a conta de
+muitas residências numa única passada vetorizada. A geração de PDF, que
+ocupa a CPU, roda numa thread fora do laço de eventos.
+
+    python -m ecoenergy.service --port 8000
+
+    POST /consumo    {"residencias": [{"aparelhos": [...]}, ...]}
+    POST /conta      {"itens": [{"consumo_kwh": 230, "estado": "São Paulo"}, ...],
+                      "bandeira": "verde", "faixas": "convencional"}
+    POST /dicas      {"consumos": [120, 480, ...]}
+    POST /relatorio  {"usuario": "ana", "aparelhos": [...]}  -> application/pdf
+    GET  /tarifas
+    GET  /saude
+    GET  /metricas   tempos por endpoint no formato do Prometheus
+"""
+import argparse
+import json
+import math
+
+import numpy as np
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from ecoenergy.consumption import calculate_consumption, columns_from_records, consumption_from_columns
+from ecoenergy.reports import generate_pdf_report, report_filename
+from ecoenergy.tariffs import load_tariffs, price_monthly
+from ecoenergy.timing import PhaseTimer, Tracer
+from ecoenergy.tips import energy_saving_tips
+
+
+MAX_BATCH = 10_000
+# cada 10 aparelhos do relatório viram uma página com gráfico
+MAX_REPORT_APPLIANCES = 500
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def _number(value, field):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise BadRequest(f"{field} deve ser um número")
+    # o JSON aceita NaN e Infinity, que a resposta não consegue devolver
+    if not math.isfinite(value) or value < 0:
+        raise BadRequest(f"{field} deve ser um número finito e não negativo")
+    return value
+
+
+def _pdf_text(value, field):
+    # as fontes padrão do PDF só têm os caracteres do Latin-1
+    try:
+        value.encode("latin-1")
+    except UnicodeEncodeError:
+        raise BadRequest(f"{field} tem caracteres que o relatório em PDF não suporta: {value!r}")
+    return value
+
+
+def _appliances(items, limit=MAX_BATCH):
+    if not isinstance(items, list):
+        raise BadRequest("aparelhos deve ser uma lista")
+    if len(items) > limit:
+        raise BadRequest(f"aparelhos deve ter no máximo {limit} itens")
+    appliances = []
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get("nome"), str):
+            raise BadRequest("cada aparelho precisa de nome, potencia, horas e quantidade")
+        appliances.append({
+            "nome": item["nome"],
+            "area": item.get("area", ""),
+            "potencia": _number(item.get("potencia"), "potencia"),
+            "horas": _number(item.get("horas"), "horas"),
+            "quantidade": _number(item.get("quantidade", 1), "quantidade"),
+        })
+    return appliances
+
+
+def _batch(payload, key):
+    items = payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        raise BadRequest(f"o corpo deve ter a lista {key!r}")
+    if len(items) > MAX_BATCH:
+        raise BadRequest(f"no máximo {MAX_BATCH} itens por requisição")
+    return items
+
+
+def consumption_batch(households):
+    """Consumo mensal e detalhamento por aparelho de cada residência."""
+    records = []
+    for household in households:
+        if not isinstance(household, dict):
+            raise BadRequest("cada residência deve ser um objeto com aparelhos")
+        records.append((len(records), {"aparelhos": _appliances(household.get("aparelhos", []))}))
+    columns = columns_from_records(records)
+    result = consumption_from_columns(columns)
+    # nomes presentes em cada residência, mesmo com consumo zero
+    n_names = len(columns.names)
+    present = np.bincount(columns.household * n_names + columns.nome,
+                          minlength=len(records) * n_names).reshape(len(records), n_names) > 0
+    output = []
+    for code, total in enumerate(result.totals.tolist()):
+        names = np.flatnonzero(present[code])
+        output.append({
+            "consumo_kwh": total,
+            "por_aparelho": dict(zip((columns.names[j] for j in names),
+                                     result.per_name[code, names].tolist())),
+        })
+    return output
+
+
+def bill_batch(items, flag="verde", tier_set="convencional"):
+    """Conta mensal (R$) de cada item {"consumo_kwh", "estado"}.
+
+    estado é o nome completo do estado, como em GET /tarifas; sem ele vale a
+    tarifa padrão.
+    """
+    table = load_tariffs()
+    if flag not in table.flags:
+        raise BadRequest(f"bandeira desconhecida: {flag!r}")
+    if tier_set not in table.tiers:
+        raise BadRequest(f"faixas desconhecidas: {tier_set!r}")
+    totals, states = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            raise BadRequest("cada item deve ter consumo_kwh e estado")
+        totals.append(_number(item.get("consumo_kwh"), "consumo_kwh"))
+        state = item.get("estado")
+        if state is not None and (not isinstance(state, str) or state not in table.state_index):
+            raise BadRequest(f"estado desconhecido: {state!r}")
+        states.append(state)
+    bills = price_monthly(totals, table.state_codes(states), flag, tier_set, table)
+    return [{"conta": bill} for bill in bills.tolist()]
+
+
+async def _json_body(request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise BadRequest("corpo JSON inválido")
+
+
+async def consumo(request):
+    households = _batch(await _json_body(request), "residencias")
+    return JSONResponse({"residencias": consumption_batch(households)})
+
+
+async def conta(request):
+    payload = await _json_body(request)
+    items = _batch(payload, "itens")
+    bills = bill_batch(items, payload.get("bandeira", "verde"), payload.get("faixas", "convencional"))
+    return JSONResponse({"itens": bills})
+
+
+async def dicas(request):
+    consumptions = _batch(await _json_body(request), "consumos")
+    return JSONResponse({"dicas": [energy_saving_tips(_number(value, "consumo"))
+                                   for value in consumptions]})
+
+
+async def relatorio(request):
+    payload = await _json_body(request)
+    if not isinstance(payload, dict):
+        raise BadRequest("o corpo deve ter usuario e aparelhos")
+    username = _pdf_text(str(payload.get("usuario", "")), "usuario")
+    appliances = _appliances(payload.get("aparelhos", []), MAX_REPORT_APPLIANCES)
+    for appliance in appliances:
+        _pdf_text(appliance["nome"], "nome")
+    total, appliance_consumption = calculate_consumption(appliances)
+    pdf = await run_in_threadpool(generate_pdf_report, username, total, appliance_consumption)
+    return Response(pdf, media_type="application/pdf", headers={
+        "Content-Disposition": f'attachment; filename="{report_filename(username)}"'})
+
+
+async def tarifas(request):
+    table = load_tariffs()
+    return JSONResponse({
+        "versao": table.version,
+        "tarifa_padrao": table.default_rate,
+        "estados": dict(zip(table.states, table.rates.tolist())),
+        "bandeiras": dict(table.flags),
+    })
+
+
+async def saude(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def metricas(request):
+    return PlainTextResponse(tracer.to_prometheus("ecoenergy_servico"))
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware(BaseHTTPMiddleware):
+    """Registra o tempo de cada requisição, com o caminho como etapa."""
+
+    async def dispatch(self, request, call_next):
+        path = request.url.path
+        # caminhos desconhecidos vão para uma única etapa, para não multiplicar as séries
+        phase = path if any(route.path == path for route in request.app.routes) else "outros"
+        timer = PhaseTimer()
+        with timer.phase(phase):
+            response = await call_next(request)
+        tracer.record("servico", timer, phase)
+        return response
+
+
+async def bad_request(request, error):
+    return JSONResponse({"erro": str(error)}, status_code=400)
+
+
+app = Starlette(
+    routes=[
+        Route("/consumo", consumo, methods=["POST"]),
+        Route("/conta", conta, methods=["POST"]),
+        Route("/dicas", dicas, methods=["POST"]),
+        Route("/relatorio", relatorio, methods=["POST"]),
+        Route("/tarifas", tarifas),
+        Route("/saude", saude),
+        Route("/metricas", metricas),
+    ],
+    middleware=[Middleware(TracingMiddleware)],
+    exception_handlers={BadRequest: bad_request},
+)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serviço HTTP de cálculo de consumo e contas.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("ecoenergy.service:app", host=args.host, port=args.port, workers=args.workers,
+                access_log=False)
+
+
+if __name__ == "__main__":
+    main()
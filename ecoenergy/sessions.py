@@ -0,0 +1,252 @@
+"""Sessões de login compartilhadas por todos os processos que servem o app.
+
+Com vários processos do Streamlit atrás de um balanceador, o login não pode
+ficar só em st.session_state: uma nova conexão (p.ex. ao recarregar a
+página) pode cair em outro processo. No login a sessão ganha uma linha na
+tabela sessions e um token assinado com o segredo compartilhado (variável
+de ambiente ECOENERGY_SECRET ou, na falta dela, um segredo gerado uma única
+vez e guardado no próprio banco). Qualquer processo valida o token: primeiro
+a assinatura, sem tocar no banco, depois a linha da sessão, que pode ser
+encerrada (logout ou troca de senha) e expira após ttl segundos sem uso.
+
+O token nunca aparece na URL: fica num cookie HttpOnly. Como o script do
+Streamlit roda sobre o websocket e não pode gravar cookies, o login emite
+um código de uso único e curta duração; o navegador o troca pelo cookie em
+POST /api/sessao (session_routes, servidas junto com o app por asgi.py).
+
+As falhas de login (LoginThrottle) também ficam no banco, para que o
+limite de tentativas valha para todos os processos.
+"""
+import json
+import os
+import secrets
+import time
+
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Route
+
+from ecoenergy.auth import SECRET_ENV
+
+
+DEFAULT_TTL = 3600
+# duração máxima de um token, mesmo com a sessão em uso
+MAX_AGE = 12 * 3600
+# intervalo mínimo (s) entre duas renovações da mesma sessão, para não gravar a cada execução
+RENEW_AFTER = 60
+# validade (s) do código que o navegador troca pelo cookie logo após o login
+CODE_TTL = 60
+COOKIE_NAME = "ecoenergy_sessao"
+
+
+def shared_secret(store):
+    """Segredo de assinatura dos tokens: o de ECOENERGY_SECRET ou o guardado no banco."""
+    env_secret = os.environ.get(SECRET_ENV)
+    if env_secret:
+        return env_secret.encode()
+    with store.transaction() as conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS app_secrets ("
+            " name TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL"
+            ")"
+        )
+        # o primeiro processo a chegar aqui gera o segredo; os outros o reaproveitam
+        conn.execute("INSERT OR IGNORE INTO app_secrets (name, value) VALUES ('sessoes', ?)",
+                     (secrets.token_hex(32),))
+        value = conn.execute("SELECT value FROM app_secrets WHERE name = 'sessoes'").fetchone()[0]
+    return value.encode()
+
+
+class SessionStore:
+    """Sessões abertas, na tabela sessions do banco dos usuários."""
+
+    def __init__(self, store, authenticator, ttl=DEFAULT_TTL, renew_after=RENEW_AFTER):
+        self.store = store
+        self.authenticator = authenticator
+        self.ttl = ttl
+        self.renew_after = renew_after
+        with store.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " id TEXT PRIMARY KEY,"
+                " username TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_username ON sessions (username)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS session_codes ("
+                " code TEXT PRIMARY KEY,"
+                " token TEXT NOT NULL,"
+                " expires_at REAL NOT NULL"
+                ") WITHOUT ROWID"
+            )
+
+    def open(self, username, now=None):
+        """Abre uma sessão para o usuário e devolve o token."""
+        now = time.time() if now is None else now
+        session = secrets.token_urlsafe(16)
+        with self.store.transaction():
+            # cada login também limpa as sessões expiradas (um login custa bem mais que isso)
+            self.purge(now)
+            self.store.connection().execute(
+                "INSERT INTO sessions (id, username, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (session, username, now, now + self.ttl))
+        return self.authenticator.issue_token(username, now, session)
+
+    def issue_code(self, token, now=None):
+        """Código de uso único que redeem_code troca pelo token (para gravar o cookie)."""
+        now = time.time() if now is None else now
+        code = secrets.token_urlsafe(24)
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO session_codes (code, token, expires_at) VALUES (?, ?, ?)",
+                         (code, token, now + CODE_TTL))
+        return code
+
+    def redeem_code(self, code, now=None):
+        """Token do código (que deixa de valer), ou None se for desconhecido ou tiver expirado."""
+        now = time.time() if now is None else now
+        with self.store.transaction() as conn:
+            row = conn.execute("SELECT token, expires_at FROM session_codes WHERE code = ?",
+                               (code,)).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM session_codes WHERE code = ?", (code,))
+        return row[0] if row[1] >= now else None
+
+    def resume(self, token, now=None):
+        """Usuário da sessão do token, ou None se o token ou a sessão não valerem mais."""
+        now = time.time() if now is None else now
+        claims = self.authenticator.token_claims(token, now)
+        if claims is None or not claims[1]:
+            return None
+        username, session = claims
+        row = self.store.connection().execute(
+            "SELECT username, expires_at FROM sessions WHERE id = ?", (session,)).fetchone()
+        if row is None or row[0] != username or row[1] < now:
+            return None
+        if row[1] - self.ttl + self.renew_after <= now:
+            with self.store.transaction() as conn:
+                conn.execute("UPDATE sessions SET expires_at = ? WHERE id = ?",
+                             (now + self.ttl, session))
+        return username
+
+    def close(self, token):
+        """Encerra a sessão do token (logout)."""
+        claims = self.authenticator.token_claims(token)
+        if claims is None:
+            return
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (claims[1],))
+
+    def close_user(self, username):
+        """Encerra todas as sessões do usuário; devolve quantas eram."""
+        with self.store.transaction() as conn:
+            return conn.execute("DELETE FROM sessions WHERE username = ?", (username,)).rowcount
+
+    def count(self, now=None):
+        now = time.time() if now is None else now
+        return self.store.connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE expires_at >= ?", (now,)).fetchone()[0]
+
+    def purge(self, now=None):
+        """Apaga as sessões (e os códigos) expirados; devolve quantas sessões eram."""
+        now = time.time() if now is None else now
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM session_codes WHERE expires_at < ?", (now,))
+            return conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,)).rowcount
+
+
+class LoginThrottle:
+    """Falhas de login recentes, na tabela login_failures do banco dos usuários.
+
+    Mesma interface de auth.MemoryThrottle, mas o limite vale para todos os
+    processos que servem o app.
+    """
+
+    def __init__(self, store, max_attempts=5, window=300):
+        self.store = store
+        self.max_attempts = max_attempts
+        self.window = window
+        with store.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS login_failures ("
+                " username TEXT NOT NULL,"
+                " failed_at REAL NOT NULL"
+                ")"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS login_failures_username"
+                         " ON login_failures (username, failed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS login_failures_failed_at"
+                         " ON login_failures (failed_at)")
+
+    def retry_after(self, username, now=None):
+        """Segundos até o usuário poder tentar de novo (0 se não estiver bloqueado)."""
+        now = time.time() if now is None else now
+        count, oldest = self.store.connection().execute(
+            "SELECT COUNT(*), MIN(failed_at) FROM login_failures WHERE username = ? AND failed_at > ?",
+            (username, now - self.window)).fetchone()
+        if count < self.max_attempts:
+            return 0
+        return oldest + self.window - now
+
+    def failed(self, username, now=None):
+        now = time.time() if now is None else now
+        with self.store.transaction() as conn:
+            conn.execute("INSERT INTO login_failures (username, failed_at) VALUES (?, ?)",
+                         (username, now))
+            # as falhas fora da janela não contam mais; a tabela não cresce sem limite
+            conn.execute("DELETE FROM login_failures WHERE failed_at <= ?", (now - self.window,))
+
+    def succeeded(self, username):
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM login_failures WHERE username = ?", (username,))
+
+
+def _same_origin(request):
+    # navegadores mandam Origin em todo POST; outra origem não troca nem apaga o cookie
+    origin = request.headers.get("origin")
+    return origin is None or origin == f"{request.url.scheme}://{request.url.netloc}"
+
+
+def session_routes(get_sessions):
+    """Rotas que gravam (POST /api/sessao, corpo: o código) e apagam (POST /api/sair) o cookie.
+
+    get_sessions devolve o SessionStore; é chamado a cada requisição, fora do
+    laço de eventos, e pode criá-lo na primeira.
+    """
+
+    async def open_session(request):
+        if not _same_origin(request):
+            return Response(status_code=403)
+        try:
+            code = json.loads(await request.body())
+        except ValueError:
+            code = None
+        token = None
+        if isinstance(code, str):
+            token = await run_in_threadpool(lambda: get_sessions().redeem_code(code))
+        if token is None:
+            return Response(status_code=400)
+        response = Response(status_code=204)
+        response.set_cookie(COOKIE_NAME, token, max_age=MAX_AGE, path="/", httponly=True,
+                            samesite="strict", secure=request.url.scheme == "https")
+        return response
+
+    async def close_session(request):
+        if not _same_origin(request):
+            return Response(status_code=403)
+        token = request.cookies.get(COOKIE_NAME)
+        if token:
+            await run_in_threadpool(lambda: get_sessions().close(token))
+        response = Response(status_code=204)
+        response.delete_cookie(COOKIE_NAME, path="/", httponly=True, samesite="strict",
+                               secure=request.url.scheme == "https")
+        return response
+
+    return [
+        Route("/api/sessao", open_session, methods=["POST"]),
+        Route("/api/sair", close_session, methods=["POST"]),
+    ]
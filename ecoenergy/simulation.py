@@ -0,0 +1,196 @@
+"""Simulação do perfil de carga horário a partir dos aparelhos cadastrados.
+
+Cada aparelho tem um horário de uso: um modelo (p.ex. "noite") ou uma lista
+própria de 24 prioridades, em "horario" (dias úteis) e opcionalmente
+"horario_fds" (fins de semana). As horas de uso por dia são distribuídas
+pelas horas do dia na ordem de prioridade do horário; horas com a mesma
+prioridade dividem o uso igualmente. Sem horário, o modelo é escolhido pelo
+nome do aparelho.
+
+Como todo dia útil (e todo fim de semana) repete o mesmo perfil, a simulação
+guarda só o perfil diário de cada residência por tipo de dia; a matriz
+24 x N dias de uma residência é montada sob demanda a partir do calendário.
+Pares (horário, horas de uso) repetidos são calculados uma única vez.
+"""
+from collections import namedtuple
+from datetime import date
+
+import numpy as np
+
+from ecoenergy.tariffs import WEEKDAY, WEEKEND, load_tariffs, price_weighted
+
+
+# Cada modelo lista grupos de horas, do mais para o menos provável; as horas
+# que faltarem formam o último grupo.
+SCHEDULES = {
+    "continuo": [list(range(24))],
+    "dia": [[9, 10, 11, 14, 15, 16], [8, 12, 13, 17], [7, 18, 19]],
+    "noite": [[19, 20, 21], [18, 22], [17, 23], [6, 7], [0, 1, 2, 3, 4, 5]],
+    "madrugada": [[23, 0, 1, 2, 3, 4, 5], [22, 6], [21, 7]],
+    "banho": [[7, 19], [6, 20], [8, 18, 21]],
+    "refeicoes": [[12, 19], [7, 13, 18, 20], [6, 11, 21]],
+}
+
+# palavra no nome do aparelho -> modelo usado quando não há horário
+DEFAULT_SCHEDULES = [
+    ("geladeira", "continuo"), ("roteador", "continuo"), ("alarme", "continuo"),
+    ("receptor", "continuo"), ("portão", "continuo"), ("purificador", "continuo"),
+    ("chuveiro", "banho"), ("ar-condicionado", "madrugada"), ("aquecedor", "madrugada"),
+    ("ventilador", "madrugada"), ("lâmpada", "noite"), ("abajur", "noite"),
+    ("luminária", "noite"), ("televisão", "noite"), ("vídeo game", "noite"),
+    ("home theater", "noite"), ("fogão", "refeicoes"), ("micro-ondas", "refeicoes"),
+    ("forno", "refeicoes"), ("cafeteira", "refeicoes"), ("sanduicheira", "refeicoes"),
+]
+FALLBACK_SCHEDULE = "dia"
+
+
+def default_schedule(nome):
+    nome = nome.lower()
+    for keyword, schedule in DEFAULT_SCHEDULES:
+        if keyword in nome:
+            return schedule
+    return FALLBACK_SCHEDULE
+
+
+def _groups_from_priorities(priorities):
+    order = sorted(set(priorities))
+    return [[hour for hour in range(24) if priorities[hour] == rank] for rank in order]
+
+
+def _start_and_width(groups):
+    """Para cada hora: horas de uso consumidas antes do seu grupo e tamanho do grupo."""
+    start = np.zeros(24)
+    width = np.zeros(24)
+    remaining = [hour for hour in range(24) if not any(hour in group for group in groups)]
+    consumed = 0
+    for group in list(groups) + ([remaining] if remaining else []):
+        start[group] = consumed
+        width[group] = len(group)
+        consumed += len(group)
+    return start, width
+
+
+class ScheduleBank:
+    """Horários distintos usados na simulação, cada um guardado uma única vez."""
+
+    def __init__(self):
+        self._codes = {}
+        self._start = []
+        self._width = []
+
+    def code(self, schedule):
+        key = schedule if isinstance(schedule, str) else tuple(schedule)
+        code = self._codes.get(key)
+        if code is None:
+            groups = SCHEDULES[key] if isinstance(key, str) else _groups_from_priorities(key)
+            start, width = _start_and_width(groups)
+            code = self._codes[key] = len(self._start)
+            self._start.append(start)
+            self._width.append(width)
+        return code
+
+    def __len__(self):
+        return len(self._start)
+
+    def usage(self, codes, horas):
+        """Fração de cada hora do dia em uso, shape (len(codes), 24); cada linha soma horas."""
+        start = np.array(self._start)[codes]
+        width = np.array(self._width)[codes]
+        return np.clip((np.asarray(horas, dtype=np.float64)[:, None] - start) / width, 0.0, 1.0)
+
+
+def daily_profiles(household, kw, horas, weekday_code, weekend_code, bank, n_households):
+    """Carga (kW) por residência, tipo de dia e hora: shape (n_households, 2, 24)."""
+    profiles = np.zeros((n_households, 2, 24))
+    if len(household) == 0:
+        return profiles
+    for day_type, codes in ((WEEKDAY, weekday_code), (WEEKEND, weekend_code)):
+        pairs, inverse = np.unique(np.column_stack([codes, horas]), axis=0, return_inverse=True)
+        usage = bank.usage(pairs[:, 0].astype(np.int64), pairs[:, 1])
+        load = usage[inverse.ravel()] * np.asarray(kw, dtype=np.float64)[:, None]
+        for hour in range(24):
+            profiles[:, day_type, hour] = np.bincount(
+                household, weights=load[:, hour], minlength=n_households)
+    return profiles
+
+
+def calendar(days, start=None):
+    """Tipo de cada dia (dia útil ou fim de semana) a partir de start."""
+    start = start or date(date.today().year, 1, 1)
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    return np.where(weekdays >= 5, WEEKEND, WEEKDAY)
+
+
+class LoadProfile:
+    """Resultado da simulação de várias residências ao longo de N dias."""
+
+    def __init__(self, usernames, profiles, day_types):
+        self.usernames = usernames
+        self.profiles = profiles
+        self.day_types = day_types
+        self.day_counts = np.bincount(day_types, minlength=2).astype(np.float64)
+
+    @property
+    def days(self):
+        return len(self.day_types)
+
+    def matrix(self, household):
+        """Carga horária (kWh) de uma residência, shape (24, N dias)."""
+        return self.profiles[household][self.day_types].T
+
+    def hourly_kwh(self):
+        """Consumo de cada hora do dia somado no período, shape (n_households, 24)."""
+        return np.einsum("d,hdk->hk", self.day_counts, self.profiles)
+
+    def energy_kwh(self):
+        return self.hourly_kwh().sum(axis=1)
+
+    def peak_kw(self):
+        present = self.day_counts > 0
+        return self.profiles[:, present].max(axis=(1, 2))
+
+    def load_factor(self):
+        """Carga média / pico (0 para residências sem consumo)."""
+        mean = self.energy_kwh() / (24 * self.days)
+        peak = self.peak_kw()
+        return np.divide(mean, peak, out=np.zeros_like(mean), where=peak > 0)
+
+    def monthly_bill(self, state_codes, flag="verde", tier_set="convencional", table=None):
+        """Conta mensal média (R$) na tarifa branca, com as faixas aplicadas por mês."""
+        table = table or load_tariffs()
+        weighted = np.einsum("d,hdk,dk->h", self.day_counts, self.profiles, table.time_of_use)
+        months = self.days / 30
+        return price_weighted(self.energy_kwh() / months, weighted / months,
+                              state_codes, flag, tier_set, table)
+
+
+def simulate_records(records, days=365, start=None):
+    """Simula os aparelhos de cada par (usuário, registro) por days dias."""
+    bank = ScheduleBank()
+    usernames = []
+    household, kw, horas, weekday_code, weekend_code = [], [], [], [], []
+    for username, record in records:
+        code = len(usernames)
+        usernames.append(username)
+        for appliance in record.get("aparelhos", []):
+            schedule = appliance.get("horario") or default_schedule(appliance["nome"])
+            household.append(code)
+            kw.append(appliance["potencia"] * appliance["quantidade"] / 1000)
+            horas.append(min(appliance["horas"], 24))
+            weekday_code.append(bank.code(schedule))
+            weekend_code.append(bank.code(appliance.get("horario_fds") or schedule))
+    profiles = daily_profiles(
+        np.array(household, dtype=np.int64), kw, np.array(horas, dtype=np.float64),
+        np.array(weekday_code, dtype=np.int64), np.array(weekend_code, dtype=np.int64),
+        bank, len(usernames))
+    return LoadProfile(usernames, profiles, calendar(days, start))
+
+
+LoadSummary = namedtuple("LoadSummary", "peak_kw load_factor hourly_kwh energy_kwh")
+
+
+def summarize(appliances, days=30):
+    """Resumo do perfil de carga de um único usuário."""
+    profile = simulate_records([("", {"aparelhos": appliances})], days)
+    return LoadSummary(float(profile.peak_kw()[0]), float(profile.load_factor()[0]),
+                       profile.hourly_kwh()[0], float(profile.energy_kwh()[0]))
@@ -0,0 +1,127 @@
+"""Dimensionamento de painéis solares e retorno do investimento.
+
+A geração de cada mês vem da irradiação do estado (data/irradiacao.json),
+da potência instalada, da taxa de desempenho do sistema e da degradação
+anual dos painéis. O consumo mensal é comparado com a geração mês a mês: o
+excedente vira crédito na distribuidora e abate o consumo dos meses
+seguintes, respeitando o custo de disponibilidade (consumo mínimo cobrado).
+
+sweep() simula de uma vez milhares de cenários (quantidade de painéis x
+custo por kWp): todas as contas são vetorizadas sobre os cenários e só o
+saldo de créditos percorre os meses em sequência.
+"""
+import functools
+import json
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from ecoenergy.tariffs import load_tariffs
+
+
+DEFAULT_IRRADIANCE_PATH = os.path.join(os.path.dirname(__file__), "data", "irradiacao.json")
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.float64)
+
+SolarParams = namedtuple("SolarParams", [
+    "panel_kwp",            # potência de cada painel (kWp)
+    "performance_ratio",    # perdas de inversor, temperatura, sujeira...
+    "degradation",          # perda de geração por ano
+    "years",                # horizonte da análise
+    "discount_rate",        # taxa de desconto anual do VPL
+    "tariff_increase",      # reajuste anual da tarifa
+    "minimum_kwh",          # custo de disponibilidade (kWh cobrados mesmo com créditos)
+])
+
+DEFAULT_PARAMS = SolarParams(
+    panel_kwp=0.55, performance_ratio=0.80, degradation=0.005, years=25,
+    discount_rate=0.08, tariff_increase=0.04, minimum_kwh=50.0,
+)
+
+SweepResult = namedtuple("SweepResult", [
+    "panels",           # quantidades de painéis avaliadas, shape (P,)
+    "costs_per_kwp",    # custos por kWp avaliados, shape (C,)
+    "npv",              # VPL (R$), shape (C, P)
+    "payback_months",   # meses até recuperar o investimento (inf se não recupera), shape (C, P)
+    "first_year_generation",  # geração média mensal no primeiro ano (kWh), shape (P,)
+    "first_year_savings",     # economia média mensal no primeiro ano (R$), shape (P,)
+])
+
+
+@functools.lru_cache(maxsize=None)
+def load_irradiance(path=DEFAULT_IRRADIANCE_PATH):
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    default = np.array(data["padrao"], dtype=np.float64)
+    default.flags.writeable = False
+    states = {}
+    for state, values in data["estados"].items():
+        states[state] = np.array(values, dtype=np.float64)
+        states[state].flags.writeable = False
+    return default, states
+
+
+def monthly_yield(state, params=DEFAULT_PARAMS):
+    """Geração de 1 painel em cada mês de um ano (kWh), shape (12,)."""
+    default, states = load_irradiance()
+    irradiance = states.get(state, default)
+    return irradiance * DAYS_IN_MONTH * params.panel_kwp * params.performance_ratio
+
+
+def _savings_by_month(monthly_consumption, generation, rate_by_month, minimum_kwh):
+    """Economia (R$) de cada cenário em cada mês; generation tem shape (S, meses)."""
+    scenarios, months = generation.shape
+    billed_without = max(monthly_consumption, minimum_kwh)
+    credits = np.zeros(scenarios)
+    savings = np.empty((scenarios, months))
+    for month in range(months):
+        net = monthly_consumption - generation[:, month]
+        # excedente do mês vira crédito; o déficit é abatido dos créditos acumulados
+        credits += np.maximum(-net, 0.0)
+        deficit = np.maximum(net, 0.0)
+        used = np.minimum(credits, np.maximum(deficit - minimum_kwh, 0.0))
+        credits -= used
+        billed = np.maximum(deficit - used, minimum_kwh)
+        savings[:, month] = (billed_without - billed) * rate_by_month[month]
+    return savings
+
+
+def sweep(monthly_consumption, state, panels, costs_per_kwp, params=DEFAULT_PARAMS, rate=None):
+    """Simula todas as combinações de quantidade de painéis e custo por kWp.
+
+    monthly_consumption é o consumo mensal (kWh), p.ex. o total de
+    calculate_consumption; rate é a tarifa (R$/kWh), por padrão a do estado.
+    """
+    panels = np.asarray(panels, dtype=np.float64)
+    costs_per_kwp = np.asarray(costs_per_kwp, dtype=np.float64)
+    rate = load_tariffs().rate(state) if rate is None else rate
+    months = params.years * 12
+    year = np.arange(months) // 12
+
+    per_panel = np.tile(monthly_yield(state, params), params.years) * (1 - params.degradation) ** year
+    generation = panels[:, None] * per_panel
+    rate_by_month = rate * (1 + params.tariff_increase) ** year
+    savings = _savings_by_month(monthly_consumption, generation, rate_by_month, params.minimum_kwh)
+
+    monthly_discount = (1 + params.discount_rate) ** (-(np.arange(months) + 1) / 12)
+    present_value = savings @ monthly_discount
+    investment = costs_per_kwp[:, None] * panels * params.panel_kwp
+    npv = present_value - investment
+
+    # a economia de cada mês nunca é negativa, então o acumulado é crescente e o
+    # primeiro mês em que ele cobre o investimento sai de uma busca binária por
+    # quantidade de painéis, sem uma matriz (custos x painéis x meses)
+    cumulative = np.cumsum(savings, axis=1)
+    payback = np.empty_like(investment)
+    for column, row in enumerate(cumulative):
+        payback[:, column] = np.searchsorted(row, investment[:, column]) + 1.0
+    payback[payback > months] = np.inf
+
+    return SweepResult(panels, costs_per_kwp, npv, payback,
+                       generation[:, :12].mean(axis=1), savings[:, :12].mean(axis=1))
+
+
+def optimal(result, cost_index=0):
+    """Índice da quantidade de painéis com maior VPL para um custo por kWp."""
+    return int(np.argmax(result.npv[cost_index]))
@@ -0,0 +1,388 @@
+"""Armazenamento dos usuários em SQLite (modo WAL), um registro por usuário.
+
+Cada gravação altera apenas a linha do usuário modificado, dentro de uma
+transação, de modo que sessões concorrentes do Streamlit não sobrescrevem
+os dados umas das outras. Cada linha tem um contador de versão, incrementado
+a cada gravação, usado por CachedUserStore para invalidar o cache e pelas
+gravações condicionais (put com expected_version): quem leu a versão N só
+grava se a linha ainda estiver na versão N, senão recebe ConflictError.
+
+Vários processos podem usar o mesmo banco. Gatilhos anotam cada gravação na
+tabela user_changes, e ChangeListener avisa os processos interessados sobre
+os registros alterados pelos outros.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+DEFAULT_DB_PATH = "user_data.db"
+LEGACY_JSON_PATH = "user_data.json"
+DEFAULT_RETRIES = 5
+DEFAULT_POLL_INTERVAL = 0.5
+# por quanto tempo (s) as alterações ficam em user_changes
+CHANGE_RETENTION = 3600
+
+
+_UPSERT = (
+    "INSERT INTO users (username, record) VALUES (?, ?)"
+    " ON CONFLICT(username) DO UPDATE"
+    " SET record = excluded.record, version = users.version + 1"
+)
+
+
+_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+_CHANGE_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS users_inserted AFTER INSERT ON users BEGIN"
+    f" INSERT INTO user_changes (username, version, ts) VALUES (new.username, new.version, {_NOW});"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS users_updated AFTER UPDATE ON users BEGIN"
+    f" INSERT INTO user_changes (username, version, ts) VALUES (new.username, new.version, {_NOW});"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS users_deleted AFTER DELETE ON users BEGIN"
+    f" INSERT INTO user_changes (username, version, ts) VALUES (old.username, NULL, {_NOW});"
+    " END",
+)
+
+
+def _encode(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+class ConflictError(Exception):
+    """O registro foi gravado por outra sessão (ou processo) depois de lido."""
+
+    def __init__(self, username, expected, current):
+        super().__init__(f"registro de {username!r} mudou: versão esperada {expected}, atual {current}")
+        self.username = username
+        self.expected = expected
+        self.current = current
+
+
+class UserStore:
+    """Registros de usuário indexados pelo nome, gravados de forma atômica."""
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        with self.transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS users ("
+                " username TEXT PRIMARY KEY,"
+                " record TEXT NOT NULL,"
+                " version INTEGER NOT NULL DEFAULT 0"
+                ") WITHOUT ROWID"
+            )
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+            if "version" not in columns:
+                conn.execute(
+                    "ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS user_changes ("
+                " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " username TEXT NOT NULL,"
+                " version INTEGER,"
+                " ts INTEGER NOT NULL"
+                ")"
+            )
+            for trigger in _CHANGE_TRIGGERS:
+                conn.execute(trigger)
+
+    def connection(self):
+        # Uma conexão por thread: o Streamlit executa cada sessão numa thread.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """Abre uma transação de escrita; transações aninhadas são absorvidas."""
+        conn = self.connection()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        self._local.depth = 1
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+
+    def get(self, username):
+        row = self.connection().execute(
+            "SELECT record FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_with_version(self, username):
+        row = self.connection().execute(
+            "SELECT record, version FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else (None, None)
+
+    def get_version(self, username):
+        row = self.connection().execute(
+            "SELECT version FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def exists(self, username):
+        return self.connection().execute(
+            "SELECT 1 FROM users WHERE username = ?", (username,)
+        ).fetchone() is not None
+
+    def create(self, username, record):
+        """Insere um usuário novo; devolve False se o nome já existir."""
+        with self.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO users (username, record) VALUES (?, ?)",
+                (username, _encode(record)),
+            )
+            return cursor.rowcount == 1
+
+    def put(self, username, record, expected_version=None):
+        """Grava o registro e devolve a nova versão.
+
+        Com expected_version, só grava se a linha existir e ainda estiver
+        nessa versão; caso contrário levanta ConflictError.
+        """
+        with self.transaction() as conn:
+            if expected_version is None:
+                return conn.execute(_UPSERT + " RETURNING version",
+                                    (username, _encode(record))).fetchone()[0]
+            row = conn.execute(
+                "UPDATE users SET record = ?, version = version + 1"
+                " WHERE username = ? AND version = ? RETURNING version",
+                (_encode(record), username, expected_version)).fetchone()
+            if row is None:
+                raise ConflictError(username, expected_version, self.get_version(username))
+            return row[0]
+
+    def update(self, username, change, retries=DEFAULT_RETRIES):
+        """Lê, altera com change(record) e grava, repetindo se houver conflito.
+
+        change recebe o registro (e pode alterá-lo no lugar); devolve a nova
+        versão, ou None se o usuário não existir.
+        """
+        for _ in range(retries):
+            record, version = self.get_with_version(username)
+            if record is None:
+                return None
+            change(record)
+            try:
+                return self.put(username, record, expected_version=version)
+            except ConflictError:
+                continue
+        raise ConflictError(username, version, self.get_version(username))
+
+    def put_many(self, records):
+        """Grava vários usuários (pares nome/registro) numa única transação."""
+        with self.transaction() as conn:
+            conn.executemany(
+                _UPSERT, ((username, _encode(record)) for username, record in records))
+
+    def delete(self, username):
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM users WHERE username = ?", (username,))
+
+    def count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM users").fetchone()[0]
+
+    def usernames(self):
+        return [row[0] for row in self.connection().execute(
+            "SELECT username FROM users ORDER BY username")]
+
+    def iter_records(self):
+        for username, record in self.connection().execute(
+                "SELECT username, record FROM users ORDER BY username"):
+            yield username, json.loads(record)
+
+    def load_all(self):
+        return dict(self.iter_records())
+
+    def migrate_from_json(self, json_path=LEGACY_JSON_PATH):
+        """Importa uma única vez o antigo user_data.json.
+
+        Só roda se o banco estiver vazio; devolve quantos usuários foram
+        importados. O arquivo JSON é mantido como backup.
+        """
+        if not os.path.exists(json_path):
+            return 0
+        with self.transaction():
+            if self.count():
+                return 0
+            with open(json_path, "r") as file:
+                data = json.load(file)
+            self.put_many(data.items())
+        return len(data)
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class CachedUserStore(UserStore):
+    """UserStore com cache de registros compartilhado pelo processo.
+
+    Uma leitura só consulta a versão da linha (uma busca pela chave primária)
+    e reaproveita o JSON já lido enquanto a versão não mudar. O cache guarda
+    o texto, não o dicionário: cada leitura devolve uma cópia própria, que
+    quem chamou pode alterar sem afetar as outras sessões.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        super().__init__(path)
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username):
+        return self.get_with_version(username)[0]
+
+    def get_with_version(self, username):
+        version = self.get_version(username)
+        with self._cache_lock:
+            cached = self._cache.get(username)
+            if version is None:
+                self._cache.pop(username, None)
+                return None, None
+            if cached is not None and cached[0] == version:
+                self.hits += 1
+                return json.loads(cached[1]), version
+            self.misses += 1
+        row = self.connection().execute(
+            "SELECT record, version FROM users WHERE username = ?", (username,)
+        ).fetchone()
+        if row is None:
+            return None, None
+        self._remember(username, row[1], row[0])
+        return json.loads(row[0]), row[1]
+
+    def create(self, username, record):
+        created = super().create(username, record)
+        if created:
+            self._remember_written(username, 0, record)
+        return created
+
+    def put(self, username, record, expected_version=None):
+        try:
+            version = super().put(username, record, expected_version)
+        except ConflictError:
+            self.forget(username)
+            raise
+        self._remember_written(username, version, record)
+        return version
+
+    def put_many(self, records):
+        records = list(records)
+        super().put_many(records)
+        with self._cache_lock:
+            for username, _ in records:
+                self._cache.pop(username, None)
+
+    def delete(self, username):
+        super().delete(username)
+        self.forget(username)
+
+    def forget(self, username, version=None):
+        """Descarta o registro em cache (se version for dada, só se for mais antigo)."""
+        with self._cache_lock:
+            cached = self._cache.get(username)
+            if cached is not None and (version is None or cached[0] < version):
+                del self._cache[username]
+
+    def _remember(self, username, version, text):
+        with self._cache_lock:
+            self._cache[username] = (version, text)
+
+    def _remember_written(self, username, version, record):
+        if self._local.depth:
+            # dentro de uma transação maior a gravação ainda pode ser desfeita
+            self.forget(username)
+        else:
+            self._remember(username, version, _encode(record))
+
+
+class ChangeListener:
+    """Avisa sobre os registros gravados por qualquer processo que use o banco.
+
+    Uma thread consulta PRAGMA data_version a cada interval segundos (a
+    consulta não lê tabelas e muda só quando outra conexão grava algo); se
+    mudou, lê as novas linhas de user_changes e chama cada callback
+    inscrito com (usuário, versão), com versão None para usuários
+    removidos. As linhas com mais de retention segundos são apagadas.
+    """
+
+    def __init__(self, store, interval=DEFAULT_POLL_INTERVAL, retention=CHANGE_RETENTION):
+        self.store = store
+        self.interval = interval
+        self.retention = retention
+        self._callbacks = []
+        self._last_seq = self._max_seq()
+        self._last_purge = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="alteracoes", daemon=True)
+        self._thread.start()
+
+    def subscribe(self, callback):
+        self._callbacks.append(callback)
+
+    def _max_seq(self):
+        return self.store.connection().execute(
+            "SELECT COALESCE(MAX(seq), 0) FROM user_changes").fetchone()[0]
+
+    def poll(self):
+        """Entrega as alterações ainda não vistas; devolve quantas eram."""
+        rows = self.store.connection().execute(
+            "SELECT seq, username, version FROM user_changes WHERE seq > ? ORDER BY seq",
+            (self._last_seq,)).fetchall()
+        for seq, username, version in rows:
+            for callback in self._callbacks:
+                callback(username, version)
+            self._last_seq = seq
+        return len(rows)
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        with self.store.transaction() as conn:
+            conn.execute("DELETE FROM user_changes WHERE ts < ?", (int(now - self.retention),))
+        self._last_purge = now
+
+    def _loop(self):
+        conn = self.store.connection()
+        data_version = None
+        while not self._stop.wait(self.interval):
+            try:
+                current = conn.execute("PRAGMA data_version").fetchone()[0]
+                if current != data_version:
+                    data_version = current
+                    self.poll()
+                if time.time() - self._last_purge >= self.retention:
+                    self.purge()
+            except sqlite3.Error:
+                # banco ocupado: tenta de novo no próximo ciclo
+                pass
+
+    def shutdown(self):
+        self._stop.set()
+        self._thread.join()
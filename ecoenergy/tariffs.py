@@ -0,0 +1,146 @@
+"""Tabela de tarifas de energia e precificação vetorizada de contas.
+
+A tabela vem de data/tarifas.json (versionado) e é carregada uma única vez
+por processo numa estrutura imutável: tarifa base por estado (R$/kWh),
+faixas de consumo, bandeiras tarifárias (acréscimo em R$/kWh) e os fatores
+da tarifa branca por hora do dia, para dias úteis e fins de semana.
+"""
+import functools
+import json
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import numpy as np
+
+
+DEFAULT_TARIFF_PATH = os.path.join(os.path.dirname(__file__), "data", "tarifas.json")
+
+WEEKDAY, WEEKEND = 0, 1
+
+
+def _frozen(values, dtype=np.float64):
+    array = np.array(values, dtype=dtype)
+    array.flags.writeable = False
+    return array
+
+
+@dataclass(frozen=True)
+class TariffTable:
+    version: str
+    default_rate: float
+    states: tuple
+    state_index: MappingProxyType
+    rates: np.ndarray
+    tiers: MappingProxyType
+    flags: MappingProxyType
+    time_of_use: np.ndarray
+
+    def state_codes(self, states):
+        """Códigos dos estados; estados desconhecidos recebem -1 (tarifa padrão)."""
+        return np.array([self.state_index.get(state, -1) for state in states], dtype=np.int64)
+
+    def rate(self, state):
+        code = self.state_index.get(state)
+        return self.default_rate if code is None else float(self.rates[code])
+
+    def rates_for(self, state_codes):
+        state_codes = np.asarray(state_codes, dtype=np.int64)
+        return np.where(state_codes >= 0, self.rates[state_codes], self.default_rate)
+
+
+def _parse_tiers(bands):
+    limits = [np.inf if band["ate_kwh"] is None else band["ate_kwh"] for band in bands]
+    factors = [band["fator"] for band in bands]
+    return _frozen(limits), _frozen(factors)
+
+
+def _parse_time_of_use(config):
+    factors = config["fatores"]
+    weekday = [factors["fora_ponta"]] * 24
+    for period, hours in config["dias_uteis"].items():
+        for hour in hours:
+            weekday[hour] = factors[period]
+    weekend = [factors["fora_ponta"]] * 24
+    return _frozen([weekday, weekend])
+
+
+@functools.lru_cache(maxsize=None)
+def load_tariffs(path=DEFAULT_TARIFF_PATH):
+    with open(path, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    states = tuple(data["estados"])
+    return TariffTable(
+        version=data["versao"],
+        default_rate=float(data["tarifa_padrao"]),
+        states=states,
+        state_index=MappingProxyType({state: i for i, state in enumerate(states)}),
+        rates=_frozen(list(data["estados"].values())),
+        tiers=MappingProxyType({name: _parse_tiers(bands) for name, bands in data["faixas"].items()}),
+        flags=MappingProxyType(dict(data["bandeiras"])),
+        time_of_use=_parse_time_of_use(data["horarios"]),
+    )
+
+
+def tiered_energy(total_kwh, tier_set="convencional", table=None):
+    """kWh ponderados pelos fatores das faixas de consumo (mesma shape da entrada)."""
+    table = table or load_tariffs()
+    limits, factors = table.tiers[tier_set]
+    lower = np.concatenate(([0.0], limits[:-1]))
+    total_kwh = np.asarray(total_kwh, dtype=np.float64)
+    in_band = np.clip(total_kwh[..., None] - lower, 0.0, limits - lower)
+    return in_band @ factors
+
+
+def price_monthly(total_kwh, state_codes, flag="verde", tier_set="convencional", table=None):
+    """Conta mensal (R$) de cada usuário a partir do consumo total em kWh."""
+    table = table or load_tariffs()
+    total_kwh = np.asarray(total_kwh, dtype=np.float64)
+    energy = tiered_energy(total_kwh, tier_set, table) * table.rates_for(state_codes)
+    return energy + total_kwh * table.flags[flag]
+
+
+def hourly_factors(n_hours, start_weekday=0, table=None):
+    """Fator da tarifa branca para cada hora a partir da meia-noite de start_weekday.
+
+    start_weekday segue datetime.weekday(): 0 é segunda-feira.
+    """
+    table = table or load_tariffs()
+    hours = np.arange(n_hours)
+    weekday = (start_weekday + hours // 24) % 7
+    day_type = np.where(weekday >= 5, WEEKEND, WEEKDAY)
+    return table.time_of_use[day_type, hours % 24]
+
+
+def price_weighted(total_kwh, weighted_kwh, state_codes, flag="verde", tier_set="convencional",
+                   table=None):
+    """Conta (R$) a partir do consumo total e do consumo ponderado pela tarifa branca.
+
+    weighted_kwh é a soma de kWh x fator de cada hora; as faixas de consumo
+    são aplicadas sobre o total.
+    """
+    table = table or load_tariffs()
+    total_kwh = np.asarray(total_kwh, dtype=np.float64)
+    # fração do consumo que sobra após os descontos por faixa
+    tier_ratio = np.divide(tiered_energy(total_kwh, tier_set, table), total_kwh,
+                           out=np.ones_like(total_kwh), where=total_kwh > 0)
+    energy = weighted_kwh * tier_ratio * table.rates_for(state_codes)
+    return energy + total_kwh * table.flags[flag]
+
+
+def price_hourly(consumption, state_codes, flag="verde", tier_set="convencional",
+                 time_of_use=True, start_weekday=0, table=None):
+    """Conta (R$) de muitos usuários a partir do consumo horário.
+
+    consumption tem shape (n_usuarios, n_horas), começando à meia-noite de
+    start_weekday. Com time_of_use, cada hora é cobrada pelo fator da tarifa
+    branca; as faixas de consumo são aplicadas sobre o total do período.
+    """
+    table = table or load_tariffs()
+    consumption = np.asarray(consumption, dtype=np.float64)
+    total_kwh = consumption.sum(axis=1)
+    if time_of_use:
+        weighted = consumption @ hourly_factors(consumption.shape[1], start_weekday, table)
+    else:
+        weighted = total_kwh
+    return price_weighted(total_kwh, weighted, state_codes, flag, tier_set, table)
@@ -0,0 +1,141 @@
+"""Medição do tempo gasto em cada etapa das execuções do script.
+
+PhaseTimer mede uma execução; Tracer junta as execuções do processo, por
+etapa e por sessão, e exporta os números em JSON ou no formato texto do
+Prometheus.
+"""
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+
+# limites (segundos) dos histogramas exportados
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TOTAL = "total"
+
+
+class PhaseTimer:
+    """Acumula o tempo (em segundos) gasto em cada etapa nomeada."""
+
+    def __init__(self):
+        self.phases = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self, name):
+        return self.phases.get(name, 0.0)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+class _Histogram:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS)
+
+    def add(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        for i, limit in enumerate(BUCKETS):
+            if seconds <= limit:
+                self.buckets[i] += 1
+
+    def to_dict(self):
+        return {"execucoes": self.count, "soma_s": self.sum,
+                "media_ms": self.sum / self.count * 1000 if self.count else 0.0,
+                "max_ms": self.max * 1000}
+
+
+class Tracer:
+    """Tempos por etapa de todas as execuções do processo, e por sessão.
+
+    Guarda as últimas max_runs execuções e os totais das últimas
+    max_sessions sessões; os histogramas por etapa não têm limite de
+    execuções, pois ocupam memória constante.
+    """
+
+    def __init__(self, max_runs=500, max_sessions=1000):
+        self.max_sessions = max_sessions
+        self._runs = deque(maxlen=max_runs)
+        self._sessions = OrderedDict()
+        self._phases = {}
+        self._lock = threading.Lock()
+
+    def record(self, session, timer, page=None):
+        """Registra uma execução concluída, medida por timer."""
+        phases = dict(timer.phases)
+        phases[TOTAL] = timer.elapsed()
+        run = {"sessao": session, "pagina": page, "instante": time.time(),
+               "etapas_ms": {name: seconds * 1000 for name, seconds in phases.items()}}
+        with self._lock:
+            self._runs.append(run)
+            for name, seconds in phases.items():
+                self._phases.setdefault(name, _Histogram()).add(seconds)
+            totals = self._sessions.pop(session, None) or {"execucoes": 0, "etapas_s": {}}
+            totals["execucoes"] += 1
+            for name, seconds in phases.items():
+                totals["etapas_s"][name] = totals["etapas_s"].get(name, 0.0) + seconds
+            self._sessions[session] = totals
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return run
+
+    def session(self, session):
+        """Média (ms) de cada etapa nas execuções da sessão."""
+        with self._lock:
+            totals = self._sessions.get(session)
+            if totals is None:
+                return {}
+            return {name: seconds / totals["execucoes"] * 1000
+                    for name, seconds in totals["etapas_s"].items()}
+
+    def phases(self):
+        with self._lock:
+            return {name: histogram.to_dict() for name, histogram in self._phases.items()}
+
+    def runs(self):
+        with self._lock:
+            return list(self._runs)
+
+    def to_json(self):
+        with self._lock:
+            sessions = {session: {"execucoes": totals["execucoes"], "etapas_s": dict(totals["etapas_s"])}
+                        for session, totals in self._sessions.items()}
+        return json.dumps({"etapas": self.phases(), "sessoes": sessions, "execucoes": self.runs()},
+                          ensure_ascii=False, indent=1)
+
+    def to_prometheus(self, prefix="ecoenergy"):
+        lines = [f"# HELP {prefix}_phase_seconds Tempo gasto em cada etapa das execuções.",
+                 f"# TYPE {prefix}_phase_seconds histogram"]
+        with self._lock:
+            for name, histogram in sorted(self._phases.items()):
+                label = name.replace("\\", "\\\\").replace('"', '\\"')
+                for limit, count in zip(BUCKETS, histogram.buckets):
+                    lines.append(f'{prefix}_phase_seconds_bucket{{phase="{label}",le="{limit}"}} {count}')
+                lines.append(f'{prefix}_phase_seconds_bucket{{phase="{label}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{prefix}_phase_seconds_sum{{phase="{label}"}} {histogram.sum}')
+                lines.append(f'{prefix}_phase_seconds_count{{phase="{label}"}} {histogram.count}')
+            lines.append(f"# HELP {prefix}_sessions Sessões com execuções registradas.")
+            lines.append(f"# TYPE {prefix}_sessions gauge")
+            lines.append(f"{prefix}_sessions {len(self._sessions)}")
+        return "\n".join(lines) + "\n"
+
+
+@functools.lru_cache(maxsize=None)
+def default_tracer():
+    """Tracer compartilhado pelo processo."""
+    return Tracer()
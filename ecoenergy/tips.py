@@ -0,0 +1,42 @@
+"""Dicas de economia de acordo com o consumo mensal.
+
+Com as estatísticas de todas as residências (ecoenergy.analytics), o
+consumo é comparado com o de residências parecidas pelo percentil; sem
+elas, valem os limites fixos em kWh.
+"""
+
+
+HIGH_CONSUMPTION_KWH = 500
+MODERATE_CONSUMPTION_KWH = 200
+HIGH_PERCENTILE = 75
+MODERATE_PERCENTILE = 40
+
+HIGH_TIPS = [
+    "Seu consumo está alto! Considere usar aparelhos mais eficientes.",
+    "Desligue aparelhos que não estão sendo usados para economizar mais."
+]
+MODERATE_TIPS = [
+    "Você está no caminho certo! Verifique se há aparelhos que podem ser otimizados.",
+    "Considere instalar painéis solares para reduzir ainda mais sua conta de luz."
+]
+LOW_TIPS = [
+    "Seu consumo está em um bom nível. Continue economizando!",
+    "Aproveite para compartilhar suas práticas de economia com amigos e familiares."
+]
+
+
+def energy_saving_tips(consumption, percentile=None):
+    """Dicas para o consumo mensal (kWh); percentile (0..100) é a posição do
+    consumo entre as residências parecidas, quando conhecida."""
+    if percentile is None:
+        if consumption > HIGH_CONSUMPTION_KWH:
+            return list(HIGH_TIPS)
+        elif MODERATE_CONSUMPTION_KWH <= consumption <= HIGH_CONSUMPTION_KWH:
+            return list(MODERATE_TIPS)
+        return list(LOW_TIPS)
+    comparison = f"Você consome mais que {percentile:.0f}% das residências parecidas com a sua."
+    if percentile > HIGH_PERCENTILE:
+        return [comparison] + HIGH_TIPS
+    elif percentile >= MODERATE_PERCENTILE:
+        return [comparison] + MODERATE_TIPS
+    return [comparison] + LOW_TIPS
@@ -1,160 +1,207 @@
 import streamlit as st
+import numpy as np
+import io
 import json
-import matplotlib.pyplot as plt
-import hashlib
-from fpdf import FPDF
 import os
-
-
-def load_user_data():
-    try:
-        with open("user_data.json", "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return {}
-
-def save_user_data(data):
-    with open("user_data.json", "w") as file:
-        json.dump(data, file)
+import time
+import uuid
+from ecoenergy import aggregates
+from ecoenergy.analytics import FleetStatsScheduler
+from ecoenergy.auth import OK, THROTTLED, Authenticator
+from ecoenergy.bulk_io import export_appliances, import_appliances
+from ecoenergy.catalog import load_catalog
+from ecoenergy.charts import ChartCache
+from ecoenergy.history import HistoryStore
+from ecoenergy.jobs import DONE, FAILED, ReportJobQueue
+from ecoenergy.metering import ingest as ingest_meter_readings, reconcile as reconcile_meter_readings, suggested_hours as suggested_meter_hours
+from ecoenergy.reports import chart_pool
+from ecoenergy.savings import BY_KWH, BY_MONEY, BY_PAYBACK, rank_actions, savings_plan
+from ecoenergy.sessions import COOKIE_NAME, MAX_AGE as MAX_SESSION_AGE, LoginThrottle, SessionStore, shared_secret
+from ecoenergy.simulation import SCHEDULES, summarize
+from ecoenergy.solar import DEFAULT_PARAMS as DEFAULT_SOLAR_PARAMS, monthly_yield, optimal as optimal_solar, sweep as sweep_solar
+from ecoenergy.storage import CachedUserStore, ChangeListener, ConflictError
+from ecoenergy.tariffs import load_tariffs
+from ecoenergy.tips import energy_saving_tips
+from ecoenergy.timing import PhaseTimer, default_tracer
+
+
+@st.cache_resource
+def get_user_store():
+    store = CachedUserStore()
+    store.migrate_from_json()
+    return store
+
+@st.cache_resource
+def get_change_listener():
+    store = get_user_store()
+    listener = ChangeListener(store)
+    # registros gravados por outros processos saem do cache assim que o aviso chega
+    listener.subscribe(store.forget)
+    return listener
+
+@st.cache_resource
+def get_authenticator():
+    # todos os processos assinam com o mesmo segredo, então qualquer um valida o token
+    # e as falhas de login ficam no banco, para o limite de tentativas valer em todos
+    store = get_user_store()
+    return Authenticator(secret=shared_secret(store), token_ttl=MAX_SESSION_AGE,
+                         throttle=LoginThrottle(store))
+
+@st.cache_resource
+def get_sessions():
+    return SessionStore(get_user_store(), get_authenticator())
+
+@st.cache_resource
+def get_history_store():
+    return HistoryStore(get_user_store())
+
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache()
+
+@st.cache_resource
+def get_chart_pool():
+    return chart_pool(max_workers=min(4, os.cpu_count() or 1))
+
+@st.cache_resource
+def get_report_jobs():
+    return ReportJobQueue(chart_executor=get_chart_pool())
+
+@st.cache_resource
+def get_fleet_stats():
+    return FleetStatsScheduler(get_user_store())
+
+def load_user_data(username):
+    with timer.phase("dados"):
+        store = get_user_store()
+        record, version = store.get_with_version(username)
+        try:
+            if record is not None and "historico" in record:
+                with store.transaction():
+                    get_history_store().migrate_legacy(username, record)
+                    version = store.put(username, record, expected_version=version)
+            if record is not None and aggregates.ensure(record)[1]:
+                # registros antigos (ou tarifas novas) ganham os totais uma única vez
+                version = store.put(username, record, expected_version=version)
+        except ConflictError:
+            # outro processo gravou o registro antes; a versão dele já vem migrada
+            record, version = store.get_with_version(username)
+        seen = st.session_state.get("record_version")
+        if st.session_state.pop("save_conflict", False):
+            st.warning("Seus dados foram alterados em outra sessão e a última alteração não foi gravada. Confira os dados e tente de novo.")
+        elif seen is not None and seen[0] == username and seen[1] != version:
+            st.info("Seus dados foram alterados em outra sessão; a página mostra a versão mais recente.")
+        st.session_state.record_version = (username, version)
+        return record
+
+def save_user_data(username, record):
+    """Grava o registro se ninguém o alterou desde a leitura (senão recomeça a execução)."""
+    with timer.phase("gravacao"):
+        seen = st.session_state.get("record_version")
+        version = None
+        # só grava sobre a versão lida; sem ela não há como saber se o registro é o atual
+        if seen is not None and seen[0] == username and seen[1] is not None:
+            try:
+                version = get_user_store().put(username, record, expected_version=seen[1])
+            except ConflictError:
+                pass
+    if version is None:
+        # o registro desta execução ficou desatualizado: recomeça com a versão gravada
+        st.session_state.save_conflict = True
+        rerun()
+    st.session_state.record_version = (username, version)
+
+
+def rerun():
+    """st.rerun() que antes registra os tempos da execução, que não chega ao fim do script."""
+    tracer.record(st.session_state.trace_session, timer, menu)
+    st.rerun()
+
+
+def per_version(name, build):
+    """Valor derivado do registro, recalculado só quando a versão gravada muda."""
+    version = st.session_state.get("record_version")
+    cached = st.session_state.get(name)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    value = build()
+    st.session_state[name] = (version, value)
+    return value
 
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-
-def calculate_consumption(appliance_data):
-    total_consumption = 0
-    appliance_consumption = {}
-    for appliance in appliance_data:
-        power = appliance['potencia']
-        hours_per_day = appliance['horas']
-        quantity = appliance['quantidade']
-        daily_consumption = power * hours_per_day * quantity / 1000
-        monthly_consumption = daily_consumption * 30
-        appliance_name = appliance['nome']
-        total_consumption += monthly_consumption
-        appliance_consumption[appliance_name] = monthly_consumption
-    return total_consumption, appliance_consumption
-
-
-def get_current_energy_rate():
-    return 0.85
-
-def get_energy_rate_by_state(state):
-    rates = {
-        "Pará": 0.962,
-        "Mato Grosso": 0.883,
-        "Mato Grosso do Sul": 0.880,
-        "Alagoas": 0.866,
-        "Piauí": 0.854,
-        "Rio de Janeiro": 0.840,
-        "Amazonas": 0.835,
-        "Acre": 0.828,
-        "Bahia": 0.808,
-        "Distrito Federal": 0.766,
-        "Pernambuco": 0.764,
-        "Tocantins": 0.756,
-        "Minas Gerais": 0.751,
-        "Ceará": 0.744,
-        "Roraima": 0.735,
-        "Maranhão": 0.719,
-        "Rondônia": 0.709,
-        "Goiás": 0.711,
-        "Espírito Santo": 0.696,
-        "Rio Grande do Sul": 0.691,
-        "Rio Grande do Norte": 0.689,
-        "São Paulo": 0.680,
-        "Sergipe": 0.651,
-        "Paraná": 0.639,
-        "Paraíba": 0.602,
-        "Santa Catarina": 0.593,
-    }
-    return rates.get(state, 0.85)
-
-
-def generate_pdf_report(username, total_consumption, appliance_consumption):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=f"Relatório de Consumo de Energia - {username}", ln=True, align='C')
-    pdf.cell(200, 10, txt=f"Consumo Mensal Total: {total_consumption:.2f} kWh", ln=True)
-    pdf.cell(200, 10, txt="Consumo por Aparelho:", ln=True)
-
-
-    for appliance, consumption in appliance_consumption.items():
-        pdf.cell(200, 10, txt=f"{appliance}: {consumption:.2f} kWh", ln=True)
-
-
-    max_items_per_page = 10
-    appliance_list = list(appliance_consumption.items())
-
-    for i in range(0, len(appliance_list), max_items_per_page):
-        pdf.add_page()
-        pdf.set_font("Arial", 'B', size=12)
-        pdf.cell(200, 10, txt="Gráfico de Consumo por Aparelho", ln=True, align='C')
-        pdf.ln(10)
-
-
-        fig, ax = plt.subplots(figsize=(10, 6))
-        current_items = appliance_list[i:i + max_items_per_page]
-        names, values = zip(*current_items)
-
-        ax.bar(names, values, color='skyblue')
-        ax.set_xlabel('Aparelhos')
-        ax.set_ylabel('Consumo (kWh)')
-        ax.set_title('Consumo de Energia por Aparelho')
-        plt.xticks(rotation=45, ha='right')
-
-        for j, value in enumerate(values):
-            ax.text(j, value + 0.05, f'{value:.2f}', ha='center', va='bottom')
-
-
-        img_path = f"temp_chart_{i // max_items_per_page}.png"
-        plt.savefig(img_path)
-        plt.close(fig)
-
-
-        pdf.image(img_path, x=10, w=180)
-
-    file_path = f"{username}_relatorio.pdf"
-    pdf.output(file_path)
-    return file_path
-
-
-
-def get_energy_saving_tips(consumption):
-    if consumption > 500:
-        return [
-            "Seu consumo está alto! Considere usar aparelhos mais eficientes.",
-            "Desligue aparelhos que não estão sendo usados para economizar mais."
-        ]
-    elif 200 <= consumption <= 500:
-        return [
-            "Você está no caminho certo! Verifique se há aparelhos que podem ser otimizados.",
-            "Considere instalar painéis solares para reduzir ainda mais sua conta de luz."
-        ]
+    return get_authenticator().hash_password(password)
+
+
+def post_to_server(path, body=None):
+    """POST do navegador para uma rota de asgi.py (só ela grava ou apaga o cookie HttpOnly)."""
+    st.html(f"<script>fetch({json.dumps(path)}, {{method: 'POST', credentials: 'same-origin',"
+            f" body: {json.dumps(json.dumps(body))}}})</script>", unsafe_allow_javascript=True)
+
+
+def is_logged_in():
+    # o token também fica num cookie HttpOnly: ao recarregar a página, qualquer processo retoma a sessão
+    cookie = st.context.cookies.get(COOKIE_NAME)
+    token = st.session_state.get("session_token") or cookie
+    username = get_sessions().resume(token) if token else None
+    if username is None:
+        st.session_state.logged_in = False
+        st.session_state.session_token = None
+        # cookie de uma sessão encerrada ou expirada (ou logout): apaga uma vez
+        if st.session_state.get("clear_cookie", cookie is not None):
+            post_to_server("/api/sair")
+            st.session_state.clear_cookie = False
+        return False
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.session_token = token
+    return True
+
+
+def logout():
+    # a sessão fecha no banco; o cookie que ficou no navegador é apagado na próxima execução
+    get_sessions().close(st.session_state.session_token)
+    st.session_state.logged_in = False
+    st.session_state.session_token = None
+    st.session_state.clear_cookie = True
+
+
+def show_report_job(pending):
+    jobs = get_report_jobs()
+    job = jobs.status(st.session_state.report_job)
+    if pending and (job is None or job["state"] in (DONE, FAILED)):
+        # o fragmento foi criado com run_every; a página inteira o recria sem ele
+        st.rerun()
+    pdf = jobs.result(job["id"]) if job is not None and job["state"] == DONE else None
+    if job is None or (job["state"] == DONE and pdf is None):
+        # job esquecido pela fila ou PDF já removido do cache
+        st.session_state.report_job = None
+    elif job["state"] == DONE:
+        st.download_button("Clique para baixar o PDF", data=pdf,
+                           file_name=f"{st.session_state.username}_relatorio.pdf")
+    elif job["state"] == FAILED:
+        st.error(f"Não foi possível gerar o relatório: {job['error']}")
     else:
-        return [
-            "Seu consumo está em um bom nível. Continue economizando!",
-            "Aproveite para compartilhar suas práticas de economia com amigos e familiares."
-        ]
+        st.progress(job["progress"], text="Gerando relatório...")
 
 
 def update_consumption_history(username, monthly_consumption):
-    if "historico" not in user_data[username]:
-        user_data[username]["historico"] = []
-    user_data[username]["historico"].append({
-        "mes": len(user_data[username]["historico"]) + 1,
-        "consumo": monthly_consumption
-    })
-    save_user_data(user_data)
+    with timer.phase("dados"):
+        get_history_store().record(username, monthly_consumption)
 
 
-user_data = load_user_data()
+# acima disso, o aparelho a editar é escolhido pelo número, não numa lista
+MAX_EDIT_OPTIONS = 200
+
+timer = PhaseTimer()
+tracer = default_tracer()
+get_change_listener()
+if "trace_session" not in st.session_state:
+    st.session_state.trace_session = uuid.uuid4().hex[:12]
 
 
 st.title("EcoEnergy: Lugar certo para economizar sua energia!")
-menu = st.sidebar.selectbox("Menu", ["Login", "Registrar", "TUTORIAL", "Calculadora Energética", "Lista de KWh", "Paineis Solares", "Dicas Sustentáveis"])
+menu = st.sidebar.selectbox("Menu", ["Login", "Registrar", "TUTORIAL", "Calculadora Energética", "Lista de KWh", "Paineis Solares", "Dicas Sustentáveis", "Estatísticas Gerais"])
 
 
 if menu == "Registrar":
@@ -162,11 +209,12 @@ if menu == "Registrar":
     username = st.text_input("Nome de usuário")
     password = st.text_input("Senha", type="password")
     if st.button("Registrar"):
-        if username in user_data:
+        record = {"password": hash_password(password), "aparelhos": []}
+        with timer.phase("dados"):
+            created = get_user_store().create(username, record)
+        if not created:
             st.warning("Usuário já existe.")
         else:
-            user_data[username] = {"password": hash_password(password), "aparelhos": []}
-            save_user_data(user_data)
             st.success("Conta criada com sucesso. Vá para o login.")
 
 
@@ -175,26 +223,38 @@ elif menu == "Login":
     username = st.text_input("Nome de usuário", key="login_user")
     password = st.text_input("Senha", type="password", key="login_pass")
     if st.button("Login"):
-        if username in user_data and user_data[username]["password"] == hash_password(password):
+        # leitura simples: migrações e totais só são gravados depois que a senha confere
+        with timer.phase("dados"):
+            stored = get_user_store().get(username)
+        with timer.phase("senha"):
+            result = get_authenticator().verify(username, password, stored["password"] if stored else None)
+        if result.status == OK:
+            if result.new_hash:
+                record = load_user_data(username)
+                record["password"] = result.new_hash
+                save_user_data(username, record)
             st.success("Login realizado com sucesso! Agora você tem acesso às demais abas.")
             st.session_state.logged_in = True
             st.session_state.username = username
+            st.session_state.session_token = get_sessions().open(username)
+            # o navegador troca o código (nunca o token) pelo cookie da sessão
+            post_to_server("/api/sessao", get_sessions().issue_code(st.session_state.session_token))
+        elif result.status == THROTTLED:
+            st.warning(f"Muitas tentativas. Tente novamente em {result.retry_after:.0f} segundos.")
         else:
             st.warning("Credenciais incorretas.")
 
 
 
-if st.session_state.get("logged_in"):
-    st.subheader(f"Bem-vindo, {st.session_state.username}")
+logged_in = is_logged_in()
+if logged_in and st.sidebar.button("Sair"):
+    logout()
+    rerun()
 
+if logged_in:
+    st.subheader(f"Bem-vindo, {st.session_state.username}")
+    user_record = load_user_data(st.session_state.username)
 
-    appliance_options = {
-        "Eletrodomésticos": ["Geladeira/Freezer", "Fogão Elétrico", "Micro-ondas", "Máquina de lavar roupas", "Máquina de secar roupas", "Máquina de lavar louça", "Ferro de passar roupa", "Aparelho de Ar-condicionado", "Ventilador", "Aquecedor Elétrico", "Chuveiro Elétrico", "Purificador de água elétrico", "Desumidificador", "Umidificador"],
-        "Entretenimento e Eletrônicos": ["Televisão", "Computador (Desktop/Notebook)", "Vídeo Game/Consoles", "Home theater", "Caixa de som", "Roteador de Internet", "Receptor de TV a cabo",
-                    "Carregador de celular e tablet"],
-        "Iluminação e Pequenos Aparelhos": ["Lâmpada Incandescente (Comum)", "Lâmpada Fluorescente", "Lâmpada LED", "Abajur", "Luminária", "Aspirador de Pó", "Liquidificador", "Batedeira", "Processador de Alimentos", "Cafeteira elétrica", "Chaleira elétrica", "Torradeira", "Sanduicheira/Grill Elétrico", "Forno elétrico"],
-        "Outros Equipamentos": ["Secador de cabelo", "Máquina de barbear elétrica", "Escova de dentes elétrica", "Cortador de grama elétrico", "Furadeira Elétrica", "Portão Automático", "Sistema de alarme e segurança (Câmeras, sensores)", "Bombas de água para piscina ou poço"]
-    }
 
     # Área da calculadora
     if menu == "Calculadora Energética":
@@ -206,30 +266,43 @@ if st.session_state.get("logged_in"):
         if st.session_state.get("logged_in"):
 
             #seleção de estado
-            state = st.selectbox("Escolha seu estado", [
-                "Pará", "Mato Grosso", "Mato Grosso do Sul", "Alagoas", "Piauí",
-                "Rio de Janeiro", "Amazonas", "Acre", "Bahia", "Distrito Federal",
-                "Pernambuco", "Tocantins", "Minas Gerais", "Ceará", "Roraima",
-                "Maranhão", "Rondônia", "Goiás", "Espírito Santo", "Rio Grande do Sul",
-                "Rio Grande do Norte", "São Paulo", "Sergipe", "Paraná", "Paraíba", "Santa Catarina"
-            ])
+            states = load_tariffs().states
+            saved_state = user_record.get("estado")
+            # sem estado escolhido, a conta usa a tarifa padrão e a residência entra só nas estatísticas gerais
+            state = st.selectbox("Escolha seu estado", states, placeholder="Selecione",
+                                 index=states.index(saved_state) if saved_state in states else None)
+            if state is not None and state != saved_state:
+                # o estado entra nas estatísticas das residências parecidas
+                user_record["estado"] = state
+                save_user_data(st.session_state.username, user_record)
+            flag = st.selectbox("Bandeira tarifária", list(load_tariffs().flags))
 
         #adicionar aparelhos em diferentes áreas
         def add_appliance(area):
+            catalog = load_catalog()
+            query = st.text_input(f"Buscar aparelho em {area}", key=f"busca-{area}")
+            options = [model.nome for model in catalog.search(query, area=area, limit=50)] if query else catalog.names(area)
+            appliance_name = st.selectbox(f"Escolha um aparelho em {area}", options)
             with st.form(key=area):
-                appliance_name = st.selectbox(f"Escolha um aparelho em {area}", appliance_options[area])
-                power = st.number_input("Potência (W) do aparelho", min_value=0)
+                # a potência começa com o valor médio do catálogo para o aparelho escolhido
+                power = st.number_input("Potência (W) do aparelho", min_value=0,
+                                        value=catalog.default_power(appliance_name) if appliance_name else 0,
+                                        key=f"potencia-{area}-{appliance_name}")
                 hours = st.number_input("Horas de uso por dia do aparelho", min_value=0.0, max_value=24.0)
                 quantity = st.number_input("Quantidade de aparelhos", min_value=1, value=1)
-                if st.form_submit_button(f"Adicionar {area}"):
-                    user_data[st.session_state.username]["aparelhos"].append({
+                schedule = st.selectbox("Horário de uso", ["Automático"] + list(SCHEDULES))
+                if st.form_submit_button(f"Adicionar {area}") and appliance_name:
+                    appliance = {
                         "nome": appliance_name,
                         "potencia": power,
                         "horas": hours,
                         "quantidade": quantity,
                         "area": area
-                    })
-                    save_user_data(user_data)
+                    }
+                    if schedule != "Automático":
+                        appliance["horario"] = schedule
+                    aggregates.add_appliance(user_record, appliance)
+                    save_user_data(st.session_state.username, user_record)
                     st.success(f"Aparelho '{appliance_name}' adicionado em {area}!")
 
 
@@ -237,52 +310,112 @@ if st.session_state.get("logged_in"):
             with tabs[["Eletrodomésticos", "Entretenimento e Eletrônicos", "Iluminação e Pequenos Aparelhos", "Outros Equipamentos"].index(area)]:
                 add_appliance(area)
 
+        with st.expander("Importar ou exportar aparelhos (CSV ou Parquet)"):
+            st.caption("Colunas: nome, area, potencia, horas, quantidade e, opcionalmente, horario.")
+            uploaded = st.file_uploader("Arquivo de aparelhos", type=["csv", "parquet"])
+            if uploaded is not None and st.button("Importar aparelhos"):
+                report = import_appliances(get_user_store(), uploaded, username=st.session_state.username)
+                st.success(f"{report['importadas']} de {report['linhas']} aparelhos importados.")
+                for error in report["erros"]:
+                    st.warning(error)
+                # a importação grava direto no banco: a nova versão não é de outra sessão
+                st.session_state.record_version = None
+                user_record = load_user_data(st.session_state.username)
+            def exported_csv(store=get_user_store(), username=st.session_state.username):
+                exported = io.BytesIO()
+                export_appliances(store, exported, "csv", [username])
+                return exported.getvalue()
+
+            # o CSV só é montado quando o usuário clica para baixar
+            st.download_button("Exportar meus aparelhos (CSV)", data=exported_csv,
+                               file_name="aparelhos.csv", mime="text/csv")
+
+        if user_record["aparelhos"]:
+            with st.expander("Editar ou remover aparelhos"):
+                count = len(user_record["aparelhos"])
+                if count <= MAX_EDIT_OPTIONS:
+                    labels = per_version("appliance_labels", lambda: [
+                        f"{i + 1}. {appliance['nome']} ({appliance.get('area', '')})"
+                        for i, appliance in enumerate(user_record["aparelhos"])])
+                    index = labels.index(st.selectbox("Aparelho", labels))
+                else:
+                    # com milhares de aparelhos, uma lista de opções seria enviada a cada execução
+                    index = st.number_input(f"Número do aparelho (1 a {count})", min_value=1, max_value=count, value=1) - 1
+                current = user_record["aparelhos"][index]
+                if count > MAX_EDIT_OPTIONS:
+                    st.caption(f"{current['nome']} ({current.get('area', '')})")
+                new_power = st.number_input("Potência (W)", min_value=0.0, value=float(current["potencia"]), key=f"editar-potencia-{index}")
+                new_hours = st.number_input("Horas de uso por dia", min_value=0.0, max_value=24.0, value=float(current["horas"]), key=f"editar-horas-{index}")
+                new_quantity = st.number_input("Quantidade", min_value=1, value=int(current["quantidade"]), key=f"editar-quantidade-{index}")
+                if st.button("Salvar alterações"):
+                    aggregates.update_appliance(user_record, index, {**current, "potencia": new_power, "horas": new_hours, "quantidade": new_quantity})
+                    save_user_data(st.session_state.username, user_record)
+                    st.success(f"Aparelho '{current['nome']}' atualizado!")
+                if st.button("Remover aparelho"):
+                    removed = aggregates.remove_appliance(user_record, index)
+                    save_user_data(st.session_state.username, user_record)
+                    st.success(f"Aparelho '{removed['nome']}' removido!")
+
+        with st.expander("Leituras do medidor inteligente (CSV de 15 minutos)"):
+            st.caption("Colunas: inicio (data e hora de cada intervalo) e kwh. O consumo de cada mês vai para o histórico.")
+            readings = st.file_uploader("Arquivo do medidor", type=["csv"], key="medidor")
+            if readings is not None and st.button("Importar leituras"):
+                try:
+                    with timer.phase("medidor"):
+                        summary = ingest_meter_readings(readings, get_history_store(), st.session_state.username)[st.session_state.username]
+                        st.session_state.meter_result = reconcile_meter_readings(summary, user_record["aparelhos"])
+                except ValueError as error:
+                    st.error(f"Não foi possível importar as leituras: {error}")
+                else:
+                    st.success(f"{summary.rows} leituras importadas.")
+            result = st.session_state.get("meter_result")
+            if result is not None:
+                st.write(f"Consumo medido: {result.measured_kwh:.2f} kWh/mês; estimado pelos aparelhos: {result.estimated_kwh:.2f} kWh/mês")
+                if result.unexplained_kwh > 0.05 * result.measured_kwh:
+                    st.write(f"Consumo não explicado pelos aparelhos cadastrados: {result.unexplained_kwh:.2f} kWh/mês")
+                for name, factor in result.flagged:
+                    st.warning(f"{name}: o medidor indica {factor:.1f}x o consumo cadastrado.")
+                if result.flagged and st.button("Ajustar horas de uso"):
+                    # cada aparelho escala as próprias horas pelo fator do seu nome
+                    factors = dict(result.flagged)
+                    for index, appliance in enumerate(user_record["aparelhos"]):
+                        if appliance["nome"] in factors:
+                            hours = round(suggested_meter_hours(appliance, factors[appliance["nome"]]), 1)
+                            aggregates.update_appliance(user_record, index, {**appliance, "horas": hours})
+                    save_user_data(st.session_state.username, user_record)
+                    del st.session_state.meter_result
+                    st.success("Horas de uso ajustadas!")
+
 
 
         st.subheader("Consumo Estimado")
-        total_consumption, appliance_consumption = calculate_consumption(
-            user_data[st.session_state.username]["aparelhos"])
-        energy_rate = get_energy_rate_by_state(state)
+        with timer.phase("consumo"):
+            total_consumption, appliance_consumption = aggregates.consumption(user_record)
+            bill = aggregates.bill(user_record, state, flag)
         st.write(f"Consumo mensal estimado: {total_consumption:.2f} kWh")
-        st.write(f"Valor estimado da conta de luz: R$ {total_consumption * energy_rate:.2f}")
+        st.write(f"Valor estimado da conta de luz: R$ {bill:.2f}")
+
+        with timer.phase("simulacao"):
+            load = per_version("load_summary", lambda: summarize(user_record["aparelhos"]))
+        st.write(f"Pico de demanda estimado: {load.peak_kw:.2f} kW (fator de carga {load.load_factor:.2f})")
+        with st.expander("Consumo por hora do dia"):
+            st.bar_chart(load.hourly_kwh / 30, x_label="Hora", y_label="kWh por dia")
 
         graph_type = st.selectbox("Escolha o tipo de gráfico", ["Barras", "Pizza"])
 
+        chart_data = [[name, value] for name, value in appliance_consumption.items()]
         if graph_type == "Pizza":
             st.subheader("Consumo por Aparelho (PIZZA)")
             if appliance_consumption:
-
-                fig, ax = plt.subplots(figsize=(8, 8))
-                wedges, texts, autotexts = ax.pie(
-                    appliance_consumption.values(),
-                    labels=appliance_consumption.keys(),
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    textprops=dict(color="w")
-                )
-                ax.axis('equal')  
-                ax.set_title("Consumo de Energia por Aparelho")
-        
-                ax.legend(
-                    wedges, appliance_consumption.keys(),
-                    title="Aparelhos",
-                    loc="center left",
-                    bbox_to_anchor=(1, 0, 0.5, 1)
-                )
-            
-                st.pyplot(fig)
+                with timer.phase("graficos"):
+                    image = get_chart_cache().get("pizza", chart_data)
+                st.image(image)
 
         else:
             st.subheader("Consumo por Aparelho (BARRAS)")
-            fig, ax = plt.subplots(figsize=(10, 6))
-            ax.bar(appliance_consumption.keys(), appliance_consumption.values(), color='skyblue')
-            ax.set_xlabel('Aparelhos')
-            ax.set_ylabel('Consumo (kWh)')
-            ax.set_title('Consumo de Energia por Aparelho')
-            plt.xticks(rotation=45, ha='right')
-            for i, (name, value) in enumerate(appliance_consumption.items()):
-                ax.text(i, value + 0.05, f'{value:.2f}', ha='center', va='bottom')
-            st.pyplot(fig)
+            with timer.phase("graficos"):
+                image = get_chart_cache().get("barras", chart_data)
+            st.image(image)
 
 
 
@@ -291,52 +424,90 @@ if st.session_state.get("logged_in"):
             update_consumption_history(st.session_state.username, total_consumption)
             st.success("Histórico atualizado com sucesso!")
 
-        if len(user_data[st.session_state.username].get("historico", [])) > 0:
-            history = user_data[st.session_state.username]["historico"]
-            months = [entry["mes"] for entry in history]
-            consumption_values = [entry["consumo"] for entry in history]
-
+        with timer.phase("dados"):
+            history = get_history_store().chart_series(st.session_state.username)
+        if history:
             st.subheader("Histórico de Consumo")
-            fig, ax = plt.subplots()
-            ax.plot(months, consumption_values, marker='o')
-            ax.set_xlabel("Mês")
-            ax.set_ylabel("Consumo (kWh)")
-            ax.set_title("Consumo Mensal ao Longo do Tempo")
-            st.pyplot(fig)
+            with timer.phase("graficos"):
+                image = get_chart_cache().get("historico", history)
+            st.image(image)
 
    
         st.subheader("Dicas de Economia Personalizadas")
-        tips = get_energy_saving_tips(total_consumption)
+        with timer.phase("dicas"):
+            fleet = get_fleet_stats().current()
+            percentile = fleet.percentile(total_consumption, state) if fleet and total_consumption > 0 else None
+            tips = energy_saving_tips(total_consumption, percentile)
         for tip in tips:
             st.write(f"- {tip}")
 
         if st.button("Baixar Relatório em PDF"):
-            file_path = generate_pdf_report(st.session_state.username, total_consumption, appliance_consumption)
-            with open(file_path, "rb") as file:
-                st.download_button("Clique para baixar o PDF", data=file, file_name=f"{st.session_state.username}_relatorio.pdf")
+            with timer.phase("relatorio"):
+                st.session_state.report_job = get_report_jobs().submit(
+                    st.session_state.username, total_consumption, appliance_consumption)
+
+        if st.session_state.get("report_job"):
+            job = get_report_jobs().status(st.session_state.report_job)
+            pending = job is not None and job["state"] not in (DONE, FAILED)
+            # enquanto o relatório é gerado, só este trecho da página é reexecutado
+            st.fragment(show_report_job, run_every=1.0 if pending else None)(pending)
 
         if st.button("Resetar Dados"):
-            user_data[st.session_state.username]["aparelhos"] = []  
-            save_user_data(user_data)  
+            aggregates.clear_appliances(user_record)
+            save_user_data(st.session_state.username, user_record)  
             st.success("Dados resetados com sucesso!")  
 
     elif menu == "Paineis Solares":
         st.header("Instalação de Painéis Solares")
-        panels = st.number_input("Número de painéis solares", min_value=0, value=0)
-        daily_production = st.number_input("Produção diária de cada painel (kWh)", min_value=0.0, value=0.0)
-        installation_cost = st.number_input("Custo de instalação (R$)", min_value=0.0, value=0.0)
-
-        if panels > 0 and daily_production > 0:
-            monthly_production = daily_production * panels * 30  
-            savings = monthly_production * 0.70  
-            months_to_recoup = installation_cost / savings if savings > 0 else float('inf')
+        state = st.selectbox("Escolha seu estado", load_tariffs().states)
+        panel_kwp = st.number_input("Potência de cada painel (kWp)", min_value=0.1, value=DEFAULT_SOLAR_PARAMS.panel_kwp)
+        total_consumption, _ = aggregates.consumption(user_record)
+        params = DEFAULT_SOLAR_PARAMS._replace(panel_kwp=panel_kwp)
+        needed = total_consumption / monthly_yield(state, params).mean()
+        # cada painel avaliado é uma linha da simulação: acima de 4x o necessário para zerar o consumo não há o que ganhar
+        panels = st.number_input("Número de painéis solares", min_value=0, max_value=max(10, int(4 * needed) + 1), value=0)
+        cost_per_kwp = st.slider("Custo de instalação por kWp (R$)", 2000, 8000, 4500, step=100)
+
+        if total_consumption > 0:
+            # até o dobro do necessário para zerar o consumo, ou o número informado
+            panel_counts = np.arange(max(panels, int(2 * needed) + 1) + 1)
+            costs = np.arange(2000, 8001, 100)
+            with timer.phase("solar"):
+                result = sweep_solar(total_consumption, state, panel_counts, costs, params)
+            cost_index = int(np.searchsorted(costs, cost_per_kwp))
+            best = optimal_solar(result, cost_index)
 
             st.subheader("Resultados da Instalação de Painéis Solares")
-            st.write(f"Produção mensal dos painéis: {monthly_production:.2f} kWh")
-            st.write(f"Economia mensal com os painéis solares: R$ {savings:.2f}")
-            st.write(f"Tempo para recuperar o investimento: {months_to_recoup:.1f} meses" if months_to_recoup != float('inf') else "A economia é zero. Revise os parâmetros.")
-
-        st.write("Informe a quantidade de painéis e a produção diária para calcular a economia.")
+            st.write(f"Consumo mensal dos seus aparelhos: {total_consumption:.2f} kWh")
+            if panels > 0:
+                payback = result.payback_months[cost_index, panels]
+                st.write(f"Produção mensal dos painéis: {result.first_year_generation[panels]:.2f} kWh")
+                st.write(f"Economia mensal com os painéis solares: R$ {result.first_year_savings[panels]:.2f}")
+                st.write(f"Tempo para recuperar o investimento: {payback:.0f} meses" if np.isfinite(payback) else f"O investimento não se paga em {params.years} anos. Revise os parâmetros.")
+            st.write(f"Quantidade ideal: {best} painéis (valor presente líquido de R$ {result.npv[cost_index, best]:.2f} em {params.years} anos)")
+            st.line_chart(result.npv[cost_index], x_label="Painéis", y_label="Valor presente líquido (R$)")
+
+        st.write("Cadastre seus aparelhos na Calculadora Energética e informe a quantidade de painéis para calcular a economia.")
+
+    elif menu == "Estatísticas Gerais":
+        st.header("Estatísticas de Todas as Residências")
+        fleet = get_fleet_stats().current()
+        if fleet is None or not fleet.households:
+            st.info("As estatísticas ainda estão sendo calculadas. Volte em alguns instantes.")
+        else:
+            st.caption(f"{fleet.households} residências, atualizado em {time.strftime('%d/%m/%Y %H:%M', time.localtime(fleet.computed_at))}")
+            st.subheader("Consumo mensal por estado (kWh)")
+            rows = []
+            for state_name, digest in sorted(fleet.digests.items()):
+                p25, p50, p75, p90 = digest.quantile([0.25, 0.5, 0.75, 0.9])
+                rows.append({"Estado": state_name or "Todos", "Residências": int(digest.count),
+                             "P25": round(p25, 1), "Mediana": round(p50, 1), "P75": round(p75, 1), "P90": round(p90, 1)})
+            st.dataframe(rows, hide_index=True)
+            st.subheader("Consumo por categoria (kWh)")
+            st.bar_chart(dict(fleet.top_areas()), x_label="Categoria", y_label="kWh por mês")
+            st.subheader("Aparelhos que mais consomem")
+            st.dataframe([{"Aparelho": name, "kWh por mês": round(kwh, 1), "Residências": owners}
+                          for name, (kwh, owners) in fleet.top_appliances()], hide_index=True)
 
     elif menu == "TUTORIAL":
         st.header("Tutorial Básico de Como Utilizar o Programa")
@@ -369,7 +540,34 @@ if st.session_state.get("logged_in"):
     elif menu == "Dicas Sustentáveis":
         st.header("Dicas Sustentáveis para Reduzir o Consumo de Energia")
 
-       
+        st.subheader("Recomendações para a sua casa")
+        if user_record["aparelhos"]:
+            orders = {"Retorno do investimento": BY_PAYBACK, "Economia em R$": BY_MONEY, "Economia em kWh": BY_KWH}
+            order = st.selectbox("Ordenar por", list(orders))
+            budget = st.number_input("Quanto você pode investir (R$)? Deixe 0 para não limitar.", min_value=0.0, value=0.0, step=500.0)
+            state = user_record.get("estado", "")
+            with timer.phase("economia"):
+                total_consumption, _ = aggregates.consumption(user_record)
+                actions = rank_actions(user_record["aparelhos"], state, order=orders[order])
+                plan = savings_plan(actions, total_consumption, state, budget=budget or None)
+
+            def payback_text(months):
+                if months == 0:
+                    return "imediato"
+                return f"{months:.0f} meses" if np.isfinite(months) else "não se paga"
+
+            if actions:
+                st.dataframe([{"Ação": action.description, "kWh/mês": round(action.kwh, 1),
+                               "R$/mês": round(action.money, 2), "Investimento (R$)": round(action.cost, 2),
+                               "Retorno": payback_text(action.payback_months)} for action in actions],
+                             hide_index=True)
+                st.write(f"Fazendo {len(plan.actions)} dessas ações você economiza {plan.kwh:.1f} kWh e R$ {plan.money:.2f} por mês, "
+                         f"com investimento de R$ {plan.cost:.2f} (retorno: {payback_text(plan.payback_months)}).")
+            else:
+                st.write("Não encontramos trocas vantajosas para os aparelhos cadastrados.")
+        else:
+            st.write("Cadastre seus aparelhos na Calculadora Energética para receber recomendações.")
+
         dicas = {
             "Aquecedor de água (chuveiro elétrico)": [
                 "Limite o tempo de banho a 10-15 minutos para economizar energia.",
@@ -417,10 +615,27 @@ if st.session_state.get("logged_in"):
             ],
         }
 
-        
-        for aparelho, dicas_aparelho in dicas.items():
-            with st.expander(aparelho):
-                for dica in dicas_aparelho:
+        # aparelhos do catálogo a que cada grupo de dicas se refere
+        aparelhos_das_dicas = {
+            "Aquecedor de água (chuveiro elétrico)": ["Chuveiro Elétrico"],
+            "Ar-condicionado": ["Aparelho de Ar-condicionado"],
+            "Aparelho de aquecimento elétrico": ["Aquecedor Elétrico"],
+            "Máquina de lavar roupas": ["Máquina de lavar roupas"],
+            "Secadora de roupas": ["Máquina de secar roupas"],
+            "Ferro de passar roupa": ["Ferro de passar roupa"],
+            "Geladeira": ["Geladeira/Freezer"],
+            "Forno elétrico": ["Forno elétrico"],
+            "Televisão": ["Televisão"],
+            "Computador": ["Computador (Desktop/Notebook)"],
+            "Lâmpadas": ["Lâmpada Incandescente (Comum)", "Lâmpada Fluorescente", "Lâmpada LED"],
+        }
+        cadastrados = {appliance["nome"] for appliance in user_record["aparelhos"]}
+        # as dicas dos aparelhos cadastrados vêm primeiro, já abertas
+        ordem = sorted(dicas, key=lambda aparelho: cadastrados.isdisjoint(aparelhos_das_dicas.get(aparelho, [])))
+        for aparelho in ordem:
+            seus = not cadastrados.isdisjoint(aparelhos_das_dicas.get(aparelho, []))
+            with st.expander(aparelho + (" (você tem)" if seus else ""), expanded=seus):
+                for dica in dicas[aparelho]:
                     st.write(f"- {dica}")
 
 
@@ -431,70 +646,34 @@ if st.session_state.get("logged_in"):
         st.title("Potência Média de Aparelhos Elétricos")
 
    
-        potencia_aparelhos = {
-            "Eletrodomésticos": {
-                "Geladeira/Freezer": 150,
-                "Fogão elétrico": 2000,
-                "Micro-ondas": 1200,
-                "Máquina de lavar roupas": 500,
-                "Secadora de roupas": 1500,
-                "Máquina de lavar louça": 1300,
-                "Ferro de passar roupa": 1000,
-                "Aparelho de ar-condicionado": 1200,
-                "Ventiladores": 60,
-                "Aquecedor elétrico": 1500,
-                "Aquecedor de água (chuveiro elétrico)": 5500,
-                "Purificador de água elétrico": 100,
-                "Desumidificador": 300,
-                "Umidificador": 40
-            },
-            "Entretenimento e Eletrônicos": {
-                "Televisão": 100,
-                "Computadores (desktop, notebook)": 200,
-                "Vídeo game/consoles de jogos": 150,
-                "Home theater": 200,
-                "Caixas de som": 50,
-                "Roteador de internet": 10,
-                "Receptores de TV a cabo": 20,
-                "Carregadores de celular e tablets": 5
-            },
-            "Iluminação e Pequenos Aparelhos": {
-                "Lâmpada Incandescente (Comum)": 60,
-                "Lâmpada Fluorescente": 15,
-                "Lâmpada LED": 10,
-                "Abajures": 15,
-                "Luminárias": 20,
-                "Aspirador de pó": 600,
-                "Liquidificador": 350,
-                "Batedeira": 200,
-                "Processador de alimentos": 400,
-                "Cafeteira elétrica": 800,
-                "Chaleira elétrica": 1500,
-                "Torradeira": 800,
-                "Sanduicheira/Grill elétrico": 700,
-                "Forno elétrico": 1500
-            },
-            "Outros Equipamentos": {
-                "Máquina de secar cabelo": 1200,
-                "Máquina de barbear elétrica": 10,
-                "Escova de dentes elétrica": 5,
-                "Cortador de grama elétrico": 1000,
-                "Furadeira elétrica": 600,
-                "Portão automático": 100,
-                "Sistema de alarme e segurança (câmeras, sensores)": 10,
-                "Bombas de água para piscina ou poço": 750
-               
-            }
-        }
-
-      
-        for categoria, aparelhos in potencia_aparelhos.items():
+        catalog = load_catalog()
+        for categoria in catalog.areas:
             with st.expander(categoria):
-                for aparelho, potencia in aparelhos.items():
-                    st.write(f"{aparelho}: {potencia} W")
+                for aparelho in catalog.iter_area(categoria):
+                    st.write(f"{aparelho.nome}: {aparelho.potencia} W")
 
       
         st.info(
             "Os valores de potência são aproximados e podem variar conforme o modelo e a utilização de cada aparelho.")
 
-st.image('C:/Users/T-Gamer/Downloads/thekings.jpg')
+st.sidebar.caption(f"Carregamento de dados nesta execução: {timer.total('dados') * 1000:.1f} ms")
+chart_stats = get_chart_cache().stats()
+st.sidebar.caption(f"Cache de gráficos: {chart_stats['hit_rate']:.0%} de acertos, "
+                   f"{chart_stats['mean_render_ms']:.0f} ms por renderização")
+
+if st.sidebar.toggle("Painel de desempenho"):
+    with st.sidebar.expander("Desempenho", expanded=True):
+        st.write("Esta execução (ms):")
+        st.dataframe([{"Etapa": name, "ms": round(seconds * 1000, 2)} for name, seconds in timer.phases.items()], hide_index=True)
+        session_means = tracer.session(st.session_state.trace_session)
+        if session_means:
+            st.write("Média da sessão (ms):")
+            st.dataframe([{"Etapa": name, "ms": round(ms, 2)} for name, ms in session_means.items()], hide_index=True)
+        st.download_button("Exportar JSON", data=tracer.to_json(), file_name="desempenho.json", mime="application/json")
+        st.download_button("Exportar Prometheus", data=tracer.to_prometheus(), file_name="desempenho.prom", mime="text/plain")
+
+tracer.record(st.session_state.trace_session, timer, menu)
+
+# imagem local do autor; só aparece quando o arquivo existe
+if os.path.exists('C:/Users/T-Gamer/Downloads/thekings.jpg'):
+    st.image('C:/Users/T-Gamer/Downloads/thekings.jpg')
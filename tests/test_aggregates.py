@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from ecoenergy import aggregates
+from ecoenergy.catalog import load_catalog
+
+
+def appliance(rng):
+    model = rng.choice(load_catalog().models)
+    return {"nome": model.nome, "area": model.area, "potencia": model.potencia,
+            "horas": round(rng.uniform(0, 24), 1), "quantidade": rng.randint(1, 5)}
+
+
+def new_record():
+    record = {"password": "", "aparelhos": []}
+    aggregates.rebuild(record)
+    return record
+
+
+def test_empty_record_matches_recompute():
+    assert aggregates.verify(new_record()) == []
+
+
+def test_record_without_totals_is_reported():
+    assert aggregates.verify({"aparelhos": []}) == ["registro sem totais"]
+
+
+def test_add_remove_update_and_clear():
+    rng = random.Random(1)
+    record = new_record()
+    for _ in range(20):
+        aggregates.add_appliance(record, appliance(rng))
+    assert aggregates.verify(record) == []
+
+    aggregates.add_appliances(record, [appliance(rng) for _ in range(30)])
+    assert aggregates.verify(record) == []
+
+    fourth = record["aparelhos"][3]
+    assert aggregates.remove_appliance(record, 3) is fourth
+    assert len(record["aparelhos"]) == 49
+    assert aggregates.verify(record) == []
+
+    aggregates.update_appliance(record, 0, {**record["aparelhos"][0], "horas": 7.5, "quantidade": 3})
+    assert aggregates.verify(record) == []
+
+    aggregates.clear_appliances(record)
+    assert record["aparelhos"] == []
+    assert aggregates.verify(record) == []
+    assert aggregates.consumption(record) == (0.0, {})
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_edit_sequences(seed):
+    rng = random.Random(seed)
+    record = new_record()
+    for _ in range(300):
+        operation = rng.random()
+        if operation < 0.45 or not record["aparelhos"]:
+            aggregates.add_appliance(record, appliance(rng))
+        elif operation < 0.75:
+            aggregates.remove_appliance(record, rng.randrange(len(record["aparelhos"])))
+        elif operation < 0.98:
+            index = rng.randrange(len(record["aparelhos"]))
+            aggregates.update_appliance(record, index, appliance(rng))
+        else:
+            aggregates.clear_appliances(record)
+        assert aggregates.verify(record) == []
+
+
+def test_removing_every_appliance_leaves_exact_zero():
+    rng = random.Random(7)
+    record = new_record()
+    aggregates.add_appliances(record, [appliance(rng) for _ in range(50)])
+    while record["aparelhos"]:
+        aggregates.remove_appliance(record, rng.randrange(len(record["aparelhos"])))
+    assert record[aggregates.KEY]["consumo_kwh"] == 0.0
+    assert record[aggregates.KEY]["por_aparelho"] == {}
+    assert record[aggregates.KEY]["por_area"] == {}
+
+
+def test_bill_reads_stored_state_bills():
+    rng = random.Random(3)
+    record = new_record()
+    aggregates.add_appliances(record, [appliance(rng) for _ in range(10)])
+    state = next(iter(record[aggregates.KEY]["conta_por_estado"]))
+    assert aggregates.bill(record, state) == record[aggregates.KEY]["conta_por_estado"][state]
+
+
+def test_verify_detects_corrupted_totals():
+    rng = random.Random(5)
+    record = new_record()
+    aggregates.add_appliances(record, [appliance(rng) for _ in range(10)])
+    record[aggregates.KEY]["consumo_kwh"] += 1.0
+    assert aggregates.verify(record)
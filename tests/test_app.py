@@ -0,0 +1,127 @@
+"""Cenários do app dirigidos sem navegador (AppTest), com tempos do pytest-benchmark.
+
+Cada cenário falha se o script levantar exceção. Para acompanhar regressões
+de tempo, grave uma base e compare com ela:
+
+    python -m pytest tests/test_app.py --benchmark-autosave
+    python -m pytest tests/test_app.py --benchmark-compare --benchmark-compare-fail=median:25%
+
+ECOENERGY_BENCH_USERS muda o tamanho da base sintética (padrão 500 usuários);
+benchmarks/bench_app.py mede bases grandes com os tempos por etapa.
+"""
+import os
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks.app_dataset import PASSWORD, USERNAME, build_dataset
+from ecoenergy.timing import default_tracer
+
+APP = os.path.join(os.path.dirname(__file__), "..", "streamlit_app.py")
+ROUNDS = 3
+
+
+@pytest.fixture(scope="module", autouse=True)
+def dataset(tmp_path_factory):
+    """Base sintética no diretório de trabalho, onde o app abre user_data.db."""
+    directory = tmp_path_factory.mktemp("app")
+    previous = os.getcwd()
+    os.chdir(directory)
+    build_dataset(int(os.environ.get("ECOENERGY_BENCH_USERS", 500)), random.Random(42))
+    st.cache_resource.clear()
+    yield directory
+    st.cache_resource.clear()
+    os.chdir(previous)
+
+
+def check(at):
+    assert not at.exception, at.exception[0].value
+
+
+def new_app():
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    check(at)
+    return at
+
+
+def fill_login(at):
+    at.sidebar.selectbox[0].set_value("Login").run()
+    at.text_input[0].input(USERNAME)
+    at.text_input[1].input(PASSWORD)
+    return at
+
+
+def logged_in(menu=None):
+    at = fill_login(new_app())
+    at.button[0].click().run()
+    check(at)
+    if menu is not None:
+        at.sidebar.selectbox[0].set_value(menu).run()
+        check(at)
+    return at
+
+
+def button(at, label):
+    return next(item for item in [*at.button, *at.sidebar.button] if item.label == label)
+
+
+def run_scenario(benchmark, setup, action):
+    """Mede action(at) em ROUNDS execuções, cada uma com um app novo preparado por setup."""
+    apps = []
+
+    def target(at):
+        action(at)
+        apps.append(at)
+
+    benchmark.pedantic(target, setup=lambda: ((setup(),), {}), rounds=ROUNDS)
+    for at in apps:
+        check(at)
+    return apps[-1]
+
+
+def test_login(benchmark):
+    at = run_scenario(benchmark, lambda: fill_login(new_app()), lambda at: at.button[0].click().run())
+    assert [item.value for item in at.success] == ["Login realizado com sucesso! Agora você tem acesso às demais abas."]
+
+
+def test_open_calculator(benchmark):
+    at = run_scenario(benchmark, logged_in,
+                      lambda at: at.sidebar.selectbox[0].set_value("Calculadora Energética").run())
+    assert any(item.value.startswith("Consumo mensal estimado") for item in at.markdown)
+
+
+def test_calculator_rerun(benchmark):
+    run_scenario(benchmark, lambda: logged_in("Calculadora Energética"), lambda at: at.run())
+
+
+def test_add_appliance(benchmark):
+    def setup():
+        at = logged_in("Calculadora Energética")
+        at.number_input[0].set_value(100)
+        at.number_input[1].set_value(3.0)
+        return at
+
+    at = run_scenario(benchmark, setup, lambda at: at.button[0].click().run())
+    assert any("adicionado" in item.value for item in at.success)
+
+
+def test_statistics(benchmark):
+    at = run_scenario(benchmark, logged_in,
+                      lambda at: at.sidebar.selectbox[0].set_value("Estatísticas Gerais").run())
+    assert at.dataframe
+
+
+def test_run_ending_in_rerun_is_traced():
+    at = logged_in("Calculadora Energética")
+    session = at.session_state.trace_session
+    before = sum(run["sessao"] == session for run in default_tracer().runs())
+    # o logout termina a execução com st.rerun(); ela e a seguinte são registradas
+    button(at, "Sair").click().run()
+    check(at)
+    assert sum(run["sessao"] == session for run in default_tracer().runs()) == before + 2
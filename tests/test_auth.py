@@ -0,0 +1,38 @@
+import pytest
+
+from ecoenergy.auth import MAX_SCRYPT_P, MAX_SCRYPT_R, hash_password, is_password_hash, verify_password
+
+
+def with_cost(stored, n, r, p):
+    scheme, _, _, _, salt, key = stored.split("$")
+    return "$".join([scheme, str(n), str(r), str(p), salt, key])
+
+
+def test_current_hash_is_accepted():
+    stored = hash_password("senha")
+    assert is_password_hash(stored)
+    assert verify_password("senha", stored) == (True, False)
+    assert verify_password("outra", stored) == (False, False)
+
+
+@pytest.mark.parametrize("n, r, p", [
+    (2 ** 14, MAX_SCRYPT_R + 1, 1),
+    (2 ** 14, 8, MAX_SCRYPT_P + 1),
+    (2 ** 14, 10 ** 6, 1),
+    (2 ** 14, 8, 10 ** 6),
+    (2 ** 21, 8, 1),
+    (2 ** 20, 8, 1),
+    (2 ** 16, 1, 1),
+    (2 ** 14, 0, 1),
+    (3, 8, 1),
+])
+def test_costs_out_of_bounds_are_refused(n, r, p):
+    stored = with_cost(hash_password("senha"), n, r, p)
+    assert not is_password_hash(stored)
+    assert verify_password("senha", stored) == (False, False)
+
+
+@pytest.mark.parametrize("stored", [None, 42, "", "scrypt$", "scrypt$x$8$1$AA==$AA==", "g" * 64])
+def test_malformed_hash_never_matches(stored):
+    assert not is_password_hash(stored)
+    assert verify_password("senha", stored) == (False, False)
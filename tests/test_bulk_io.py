@@ -0,0 +1,54 @@
+import io
+
+import pytest
+
+from ecoenergy import aggregates
+from ecoenergy.auth import hash_password
+from ecoenergy.bulk_io import import_appliances, import_users
+from ecoenergy.catalog import load_catalog
+from ecoenergy.storage import CachedUserStore, ConflictError
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CachedUserStore(str(tmp_path / "users.db"))
+    record = {"password": "", "aparelhos": []}
+    aggregates.rebuild(record)
+    store.create("ana", record)
+    yield store
+    store.close()
+
+
+def csv_file(*lines):
+    return io.BytesIO("\n".join(lines).encode())
+
+
+def test_import_does_not_overwrite_and_is_not_overwritten(store):
+    model = load_catalog().models[0]
+    seen, version = store.get_with_version("ana")
+    report = import_appliances(store, csv_file(
+        "usuario,nome,area,potencia,horas,quantidade",
+        f"ana,{model.nome},{model.area},{model.potencia},2,1",
+        f"bia,{model.nome},{model.area},{model.potencia},2,1",
+    ), fmt="csv")
+    assert report["importadas"] == 1
+    assert report["erros"] == ["linha 3: usuário 'bia' não encontrado"]
+    # a sessão que leu antes da importação não grava por cima dela
+    with pytest.raises(ConflictError):
+        store.put("ana", seen, expected_version=version)
+    record = store.get("ana")
+    assert [appliance["nome"] for appliance in record["aparelhos"]] == [model.nome]
+    assert aggregates.verify(record) == []
+    assert seen["aparelhos"] == []
+
+
+def test_import_users_requires_a_password_hash(store):
+    report = import_users(store, csv_file(
+        "usuario,senha_hash",
+        f"bia,{hash_password('senha')}",
+        "caio,senha-em-texto",
+        "ana," + "0" * 64,
+    ), fmt="csv")
+    assert report["importadas"] == 1
+    assert len(report["erros"]) == 2
+    assert store.exists("bia") and not store.exists("caio")
@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pytest
+
+from ecoenergy.metering import (INTERVAL_MINUTES, MeterSummary, appliance_profiles, ingest, reconcile,
+                                suggested_hours)
+
+
+def csv(text):
+    return io.BytesIO(text.encode())
+
+
+@pytest.mark.parametrize("text, message", [
+    ("", "vazio"),
+    ("inicio,kwh\n", "não tem leituras"),
+    ("inicio,valor\n2024-01-01T00:00,1\n", "'kwh'"),
+    ("a,b\n1,2\n", "'inicio', 'kwh'"),
+    ("inicio,kwh\n2024-01-01T00:00,1\nontem,1\n", "'ontem'"),
+    ("inicio,kwh\n,1\n", "sem data"),
+    ("inicio,kwh\n2024-01-01T00:00,abc\n", "não numérico"),
+    ('inicio,kwh\n2024-01-01T00:00,1\n"aberto\n', "CSV válido"),
+])
+def test_invalid_files_raise_value_error(text, message):
+    with pytest.raises(ValueError, match=message):
+        ingest(csv(text), username="ana")
+
+
+def test_file_without_user_column_needs_username():
+    with pytest.raises(ValueError, match="usuario"):
+        ingest(csv("inicio,kwh\n2024-01-01T00:00,1\n"))
+
+
+def test_valid_file():
+    summaries = ingest(csv("inicio,kwh\n2024-01-01T00:00,1\n2024-01-01T00:15,2\n"), username="ana")
+    assert summaries["ana"].rows == 2
+    assert summaries["ana"].hourly_kwh.sum() == 3
+
+
+def test_appliances_sharing_a_name_keep_their_own_hours():
+    appliances = [
+        {"nome": "Lâmpada LED", "potencia": 9, "horas": 2, "quantidade": 4},
+        {"nome": "Lâmpada LED", "potencia": 9, "horas": 8, "quantidade": 2},
+    ]
+    _, profiles = appliance_profiles(appliances)
+    # um dia útil e um fim de semana medidos, com o dobro do consumo simulado
+    summary = MeterSummary("ana")
+    summary.hourly_kwh = 2 * profiles.sum(axis=0)
+    summary.hourly_intervals = np.full((2, 24), 60 / INTERVAL_MINUTES)
+    result = reconcile(summary, appliances)
+    [(name, factor)] = result.flagged
+    assert name == "Lâmpada LED"
+    assert factor == pytest.approx(2, rel=0.05)
+    assert [suggested_hours(appliance, factor) for appliance in appliances] == \
+        pytest.approx([2 * factor, 8 * factor])
+    assert suggested_hours(appliances[1], 4) == 24
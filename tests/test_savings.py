@@ -0,0 +1,136 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from ecoenergy import savings
+from ecoenergy.savings import (DEFAULT_PARAMS, INVERTER, LED, SHOWER, SOLAR, Plan, _classify, _name_words,
+                               _select, appliance_actions, rank_actions, savings_plan)
+
+STATE = "São Paulo"
+
+
+def appliance(nome, potencia, horas, quantidade=1):
+    return {"nome": nome, "potencia": potencia, "horas": horas, "quantidade": quantidade}
+
+
+def classify(name):
+    action = _classify(_name_words([name])[0], DEFAULT_PARAMS)
+    return action[0] if action else None
+
+
+@pytest.mark.parametrize("name, kind", [
+    ("Lâmpada Incandescente (Comum)", LED),
+    ("Lâmpadas Halogena", LED),
+    ("Lâmpada Fluorescente", LED),
+    ("Lâmpada LED", None),
+    ("Chuveiro Elétrico", SHOWER),
+    ("Aparelho de Ar-condicionado", INVERTER),
+    ("Ar-condicionado Inverter", None),
+    ("Chuveiro inverter", None),
+    ("Geladeira", None),
+    ("Incandescente", None),
+])
+def test_name_classification(name, kind):
+    assert classify(name) == kind
+
+
+def test_rows_with_the_same_name_become_one_action():
+    kinds, names, kwh, cost, units = appliance_actions([
+        appliance("Lâmpada Incandescente", 60, 5, 3),
+        appliance("Geladeira", 150, 24),
+        appliance("Lâmpada Incandescente", 60, 2, 2),
+        appliance("Chuveiro Elétrico", 5500, 1),
+    ])
+    assert kinds == [LED, SHOWER]
+    assert names == ["Lâmpada Incandescente", "Chuveiro Elétrico"]
+    assert units.tolist() == [5, 1]
+    assert cost.tolist() == [5 * DEFAULT_PARAMS.led_cost, 0]
+    # 60 W x (3 x 5 h + 2 x 2 h) x 30 dias, menos o consumo da LED
+    assert kwh[0] == pytest.approx(0.06 * 19 * 30 * (1 - DEFAULT_PARAMS.led_ratio["incandescente"]))
+
+
+def test_negligible_savings_are_dropped():
+    kinds, *_ = appliance_actions([appliance("Lâmpada Fluorescente", 9, 0.1)])
+    assert kinds == []
+
+
+def brute_force(weights, kwh, capacity):
+    best = 0.0
+    for size in range(len(weights) + 1):
+        for subset in itertools.combinations(range(len(weights)), size):
+            if sum(weights[i] for i in subset) <= capacity:
+                best = max(best, sum(kwh[i] for i in subset))
+    return best
+
+
+def check_selection(cost, kwh, budget, step=1.0):
+    chosen = _select(cost, kwh, budget)
+    assert chosen[cost <= 0].all()
+    assert cost[chosen].sum() <= budget
+    paid = np.flatnonzero(cost > 0)
+    # a programação dinâmica é exata para os custos arredondados para cima na grade
+    weights = np.ceil(cost[paid] / step).tolist()
+    expected = brute_force(weights, kwh[paid].tolist(), budget // step)
+    assert kwh[chosen & (cost > 0)].sum() == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_select_matches_brute_force(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 9)
+    cost = np.array([rng.choice([0, rng.randint(1, 300)]) for _ in range(n)], dtype=np.float64)
+    kwh = np.array([rng.uniform(1, 100) for _ in range(n)])
+    check_selection(cost, kwh, float(rng.randint(0, 900)))
+
+
+def test_select_with_zero_budget_takes_only_free_actions():
+    cost = np.array([0.0, 10.0, 20.0])
+    assert _select(cost, np.array([5.0, 50.0, 60.0]), 0.0).tolist() == [True, False, False]
+
+
+def test_select_takes_everything_that_fits():
+    cost = np.array([0.0, 10.0, 20.0, 500.0])
+    assert _select(cost, np.ones(4), 100.0).tolist() == [True, True, True, False]
+    assert _select(cost, np.ones(4), np.inf).all()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_select_on_a_coarse_grid(monkeypatch, seed):
+    rng = random.Random(seed)
+    n = rng.randint(2, 9)
+    cost = np.array([rng.uniform(1, 5000) for _ in range(n)])
+    kwh = np.array([rng.uniform(1, 100) for _ in range(n)])
+    # menos que o custo de tudo, para a escolha passar pela programação dinâmica
+    budget = float(int(cost.sum() * rng.uniform(0.2, 0.9)))
+    monkeypatch.setattr(savings, "MAX_KNAPSACK_CELLS", 50)
+    step = max(1.0, budget * n / 50)
+    assert step > 1
+    check_selection(cost, kwh, budget, step)
+
+
+def test_plan_without_choices_is_empty():
+    assert savings_plan([], 300, STATE) == Plan([], 0, 0, 0, 0.0)
+    recommendations = rank_actions([appliance("Aparelho de Ar-condicionado", 1500, 8)], STATE, solar=False)
+    plan = savings_plan(recommendations, 360, STATE, budget=0)
+    assert plan.actions == [] and plan.cost == 0
+
+
+def test_plan_with_solar_sizes_panels_for_the_reduced_consumption():
+    house = [appliance("Chuveiro Elétrico", 5500, 1, 2), appliance("Lâmpada Incandescente", 60, 5, 10),
+             appliance("Aparelho de Ar-condicionado", 1500, 8), appliance("Geladeira", 150, 24)]
+    consumption = sum(a["potencia"] * a["horas"] * a["quantidade"] for a in house) * 30 / 1000
+    recommendations = rank_actions(house, STATE)
+    alone = next(item for item in recommendations if item.kind == SOLAR)
+
+    plan = savings_plan(recommendations, consumption, STATE)
+    assert [item.kind for item in plan.actions] == [SHOWER, LED, INVERTER, SOLAR]
+    panels = plan.actions[-1]
+    assert panels.units < alone.units
+    assert plan.cost == pytest.approx(sum(item.cost for item in plan.actions))
+    assert plan.kwh <= consumption
+
+    limited = savings_plan(recommendations, consumption, STATE, budget=3000)
+    assert [item.kind for item in limited.actions] == [SHOWER, LED, INVERTER]
+    assert limited.cost <= 3000
@@ -0,0 +1,36 @@
+import math
+
+import pytest
+
+from ecoenergy.service import MAX_BATCH, BadRequest, _appliances, bill_batch, consumption_batch
+
+
+def appliance(**fields):
+    return {"nome": "Geladeira", "potencia": 150, "horas": 24, "quantidade": 1, **fields}
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -math.inf, -1])
+@pytest.mark.parametrize("field", ["potencia", "horas", "quantidade"])
+def test_appliance_numbers_must_be_finite_and_not_negative(field, value):
+    with pytest.raises(BadRequest, match=field):
+        consumption_batch([{"aparelhos": [appliance(**{field: value})]}])
+
+
+@pytest.mark.parametrize("value", [math.nan, math.inf, -5])
+def test_bill_consumption_must_be_finite_and_not_negative(value):
+    with pytest.raises(BadRequest, match="consumo_kwh"):
+        bill_batch([{"consumo_kwh": value, "estado": "São Paulo"}])
+
+
+def test_bill_rejects_unknown_state():
+    with pytest.raises(BadRequest, match="estado"):
+        bill_batch([{"consumo_kwh": 100, "estado": "SP"}])
+    assert len(bill_batch([{"consumo_kwh": 100}, {"consumo_kwh": 0, "estado": "São Paulo"}])) == 2
+
+
+def test_appliance_list_is_capped():
+    assert len(_appliances([appliance()] * 3, limit=3)) == 3
+    with pytest.raises(BadRequest, match="no máximo 3"):
+        _appliances([appliance()] * 4, limit=3)
+    with pytest.raises(BadRequest):
+        consumption_batch([{"aparelhos": [appliance()] * (MAX_BATCH + 1)}])
@@ -0,0 +1,54 @@
+import pytest
+
+from ecoenergy.auth import INVALID, OK, THROTTLED, Authenticator, hash_password
+from ecoenergy.sessions import CODE_TTL, LoginThrottle, SessionStore
+from ecoenergy.storage import UserStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = UserStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+def test_code_is_redeemed_once(store):
+    sessions = SessionStore(store, Authenticator(max_workers=1))
+    token = sessions.open("ana", now=1000)
+    code = sessions.issue_code(token, now=1000)
+    assert sessions.redeem_code(code, now=1001) == token
+    assert sessions.redeem_code(code, now=1001) is None
+    assert sessions.resume(token, now=1001) == "ana"
+
+
+def test_expired_code_is_refused(store):
+    sessions = SessionStore(store, Authenticator(max_workers=1))
+    code = sessions.issue_code(sessions.open("ana", now=1000), now=1000)
+    assert sessions.redeem_code(code, now=1000 + CODE_TTL + 1) is None
+    assert sessions.redeem_code("desconhecido") is None
+
+
+def test_throttle_is_shared_through_the_database(store):
+    first = LoginThrottle(store, max_attempts=3, window=60)
+    second = LoginThrottle(UserStore(store.path), max_attempts=3, window=60)
+    for now in (100, 101, 102):
+        first.failed("ana", now)
+    assert second.retry_after("ana", 110) == 50
+    assert second.retry_after("bia", 110) == 0
+    second.failed("ana", 130)
+    assert first.retry_after("ana", 130) == 30
+    # a primeira falha sai da janela; as outras três ainda bloqueiam
+    assert first.retry_after("ana", 160) == 1
+    first.succeeded("ana")
+    assert second.retry_after("ana", 160) == 0
+
+
+def test_authenticator_uses_the_given_throttle(store):
+    auth = Authenticator(max_workers=1, throttle=LoginThrottle(store, max_attempts=2, window=60))
+    stored = hash_password("certa")
+    assert auth.verify("ana", "errada", stored).status == INVALID
+    assert auth.verify("ana", "errada", stored).status == INVALID
+    assert auth.verify("ana", "certa", stored).status == THROTTLED
+    other = Authenticator(max_workers=1, throttle=LoginThrottle(store, max_attempts=2, window=60))
+    assert other.verify("ana", "certa", stored).status == THROTTLED
+    assert other.verify("bia", "certa", stored).status == OK
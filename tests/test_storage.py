@@ -0,0 +1,43 @@
+import pytest
+
+from ecoenergy.storage import CachedUserStore, ConflictError
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CachedUserStore(str(tmp_path / "users.db"))
+    yield store
+    store.close()
+
+
+def test_each_read_gets_its_own_copy(store):
+    store.create("ana", {"aparelhos": []})
+    first, version = store.get_with_version("ana")
+    first["aparelhos"].append({"nome": "Geladeira"})
+    second, _ = store.get_with_version("ana")
+    assert second == {"aparelhos": []}
+    assert store.hits == 2
+
+    store.put("ana", first, expected_version=version)
+    first["aparelhos"].clear()
+    assert store.get("ana") == {"aparelhos": [{"nome": "Geladeira"}]}
+
+
+def test_unsaved_edits_never_reach_the_cache(store):
+    store.create("ana", {"estado": "SP"})
+    record, version = store.get_with_version("ana")
+    record["estado"] = "RJ"
+    store.put("ana", {"estado": "MG"}, expected_version=version)
+    with pytest.raises(ConflictError):
+        store.put("ana", record, expected_version=version)
+    assert store.get("ana") == {"estado": "MG"}
+
+
+def test_write_rolled_back_with_outer_transaction_is_not_cached(store):
+    store.create("ana", {"estado": "SP"})
+    _, version = store.get_with_version("ana")
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            store.put("ana", {"estado": "RJ"}, expected_version=version)
+            raise RuntimeError
+    assert store.get_with_version("ana") == ({"estado": "SP"}, version)